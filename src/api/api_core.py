@@ -0,0 +1,275 @@
+from typing import Iterable
+from config.config_loader import byIDParams, APIConfig
+from api.retry_policy import RetryPolicy, CircuitBreaker
+import time
+import click
+import re
+import threading
+from urllib.parse import urlencode
+from codec.json_codec import codec
+
+
+class APIError(Exception):
+    """the API answered with an error status, carries its error wrapper fields."""
+
+    def __init__(self, status_code: int, error_data: dict) -> None:
+        self.status_code = status_code
+        self.error_id = error_data.get("error_id")
+        self.error_name = error_data.get("error_name")
+        self.error_message = error_data.get("error_message")
+        super().__init__(
+            f"API error {status_code} | error id:{self.error_id}"
+            f" | error name: {self.error_name} | {self.error_message}"
+        )
+
+
+class APICore:
+    """
+    I/O free part of the Stack Overflow API client.
+
+    Holds everything that does not touch the network or the cache: url and cache
+    key building, backoff bookkeeping, throttle parsing and response splitting.
+    StackOverflowAPI and AsyncStackOverflowAPI only add the transport on top.
+    """
+
+    _BASE_URL = "https://api.stackexchange.com/2.3"
+    # single flight lock, concurrent callers wait at most this long for the leader.
+    _FLIGHT_LOCK_TTL = 10.0
+    _FLIGHT_POLL_INTERVAL = 0.05
+
+    def __init__(self, config: APIConfig) -> None:
+        self._base_url = config.base_url or self._BASE_URL
+        self._backoff_expiry: float | None = None
+        # guards _backoff_expiry, shared by threads and coroutines alike since it
+        # is never held across a wait.
+        self._backoff_state_lock = threading.Lock()
+        self._backoff_desc = "API Backoff Timer"
+        self._use_cache = config.use_cache
+        self._retry_policy = RetryPolicy(config.retry)
+        self._breaker = CircuitBreaker(
+            failure_threshold=config.retry.breaker_threshold,
+            reset_timeout=config.retry.breaker_reset,
+        )
+
+    def _build_url(self, endpoint: str) -> str:
+        return f"{self._base_url}{endpoint}"
+
+    @staticmethod
+    def _build_cache_key(url: str, params: dict | None) -> str:
+        # canonical: sorted, url encoded and without the None params requests drops,
+        # so the same call always maps to the same key.
+        if params:
+            params_str = urlencode(
+                sorted((key, val) for key, val in params.items() if val is not None)
+            )
+            return f"{url}?{params_str}"
+        else:
+            return url
+
+    @staticmethod
+    def _is_user_endpoint(endpoint: str) -> bool:
+        # /users and /users/{ids} return user objects, sub resources do not.
+        return re.fullmatch(r"/users(/[\d;]+)?", endpoint) is not None
+
+    @staticmethod
+    def _user_scope(params: dict | None) -> str:
+        params = params or {}
+        return f"{params.get('site', '')}|{params.get('filter', '')}"
+
+    @staticmethod
+    def _decode_error(content: bytes) -> dict:
+        # error bodies from proxies or outages are not always the API json wrapper.
+        try:
+            error_data = codec.loads(content)
+        except ValueError:
+            return {}
+        return error_data if isinstance(error_data, dict) else {}
+
+    def _record_backoff(self, response_data: dict) -> None:
+        if "backoff" in response_data:
+            self._set_backoff(response_data["backoff"] + 1)
+
+    @staticmethod
+    def _is_throttle(error_data: dict) -> bool:
+        error_id = int(error_data.get("error_id") or 0)
+        return error_id == 502 and error_data.get("error_name") == "throttle_violation"
+
+    def _handle_throttle(self, error_data: dict) -> bool:
+        """returns True when the error is a throttle violation and a backoff is set."""
+        error_id = int(error_data.get("error_id") or 0)
+        error_name = error_data.get("error_name")
+        error_message = error_data.get("error_message")
+
+        if self._is_throttle(error_data):
+            click.secho(
+                f"error id:{error_id} | error name: {error_name}",
+                err=True,
+                color=True,
+                fg="red",
+            )
+            click.secho(f"{error_message}", err=True, color=True, fg="red")
+
+            self._set_throttle_timer(str(error_message))
+            self._backoff_desc = "Throttled by API"
+            return True
+        return False
+
+    def _background_result(self, status_code: int, content: bytes) -> dict | None:
+        """
+        Decodes the one response a background refresh gets.
+
+        Returns None when the refresh gives up: a throttle or an error response only
+        records its backoff for the foreground, nothing is printed, retried or
+        waited out, the stale entry is served until a later refresh.
+        """
+        if status_code < 400:
+            self._breaker.record_success()
+            return codec.loads(content)
+
+        error_data = self._decode_error(content)
+        if self._is_throttle(error_data):
+            try:
+                self._set_throttle_timer(str(error_data.get("error_message")))
+            except ValueError:
+                pass
+        else:
+            self._record_backoff(error_data)
+        return None
+
+    def _retry_delay(
+        self, error: Exception, attempt: int, retry_after: float | None = None
+    ) -> float:
+        """records the failure, returns the wait before the next attempt or re-raises."""
+        if self._retry_policy.is_transient(error):
+            self._breaker.record_failure()
+        else:
+            # the API answered, it is up even if it did not like the request.
+            self._breaker.record_success()
+
+        delay = self._retry_policy.next_delay(attempt, error, retry_after=retry_after)
+        if delay is None:
+            raise error
+
+        click.secho(
+            f"{error}, retrying in {delay:.1f}s"
+            f" ({attempt + 1}/{self._retry_policy.max_retries})",
+            err=True,
+            color=True,
+            fg="yellow",
+        )
+        return delay
+
+    def _check_throttle_retries(
+        self, throttles: int, status_code: int, error_data: dict
+    ) -> None:
+        # the API is up when it throttles us, only the retry count is bounded.
+        self._breaker.record_success()
+        if throttles > self._retry_policy.max_throttle_retries:
+            raise APIError(status_code, error_data)
+
+    def _set_backoff(self, backoff: int) -> None:
+        expiry = time.time() + backoff
+        with self._backoff_state_lock:
+            # never shorten a backoff another worker already recorded.
+            if self._backoff_expiry is None or expiry > self._backoff_expiry:
+                self._backoff_expiry = expiry
+
+    def _backoff_remaining(self) -> float | None:
+        """seconds left on the current backoff, clears it once it has expired."""
+        with self._backoff_state_lock:
+            if self._backoff_expiry is None:
+                return None
+            remaining_time = self._backoff_expiry - time.time()
+            if remaining_time <= 0:
+                self._backoff_expiry = None
+                return None
+            return remaining_time
+
+    def _set_throttle_timer(self, error_message: str) -> None:
+        search_result = re.search(r"\d+(?=\s+seconds)", error_message)
+        if search_result:
+            backoff = int(search_result.group())
+            self._set_backoff(backoff=backoff)
+            return
+        raise ValueError("No backoff time found in error message")
+
+    class UsersCore:
+
+        # the API accepts up to 100 semicolon delimited ids per /users/{ids} call.
+        _MAX_IDS_PER_REQUEST = 100
+
+        def __init__(self) -> None:
+            self.endpoint = "/users"
+
+        @staticmethod
+        def _split_meta(response_data: dict) -> tuple[list[dict], dict]:
+            items = response_data.get("items") or []
+            meta = {key: val for key, val in response_data.items() if key != "items"}
+            return items, meta
+
+        def _chunk_requests(
+            self, user_ids: Iterable[int], params: byIDParams
+        ) -> list[tuple[str, dict]]:
+            # dedupe while keeping the caller order, then pack ids into chunks of 100.
+            unique_ids = list(dict.fromkeys(user_ids))
+            requests = []
+
+            for start in range(0, len(unique_ids), self._MAX_IDS_PER_REQUEST):
+                chunk = unique_ids[start : start + self._MAX_IDS_PER_REQUEST]
+                endpoint = f"{self.endpoint}/{';'.join(map(str, chunk))}"
+
+                # default pagesize is 30, ask for the whole chunk in one page.
+                chunk_params = params.model_dump()
+                chunk_params.update({"pagesize": len(chunk)})
+                requests.append((endpoint, chunk_params))
+
+            return requests
+
+        @staticmethod
+        def _merge_meta(merged: dict, chunk_meta: dict) -> dict:
+            if not merged:
+                return {**chunk_meta, "requests": 1}
+
+            for key, val in chunk_meta.items():
+                match key:
+                    case "has_more":
+                        merged[key] = merged.get(key, False) or val
+                    case "cached":
+                        merged[key] = merged.get(key, True) and val
+                    case "quota_remaining":
+                        merged[key] = min(merged.get(key, val), val)
+                    case "backoff":
+                        merged[key] = max(merged.get(key, val), val)
+                    case _:
+                        merged[key] = val
+
+            merged["requests"] += 1
+            return merged
+
+        @staticmethod
+        def _with_cached_users(
+            user_ids: list[int], cached: dict[int, dict], users: list[dict], meta: dict
+        ) -> tuple[list[dict], dict]:
+            if not cached:
+                return users, meta
+
+            users_by_id = {user["user_id"]: user for user in users}
+            users_by_id.update(cached)
+            merged = [
+                users_by_id[user_id] for user_id in user_ids if user_id in users_by_id
+            ]
+
+            meta = meta or {"has_more": False, "cached": True, "requests": 0}
+            meta["entity_cache_hits"] = len(cached)
+            return merged, meta
+
+        def _merge_responses(
+            self, responses: Iterable[dict]
+        ) -> tuple[list[dict], dict]:
+            users: list[dict] = []
+            meta: dict = {}
+            for response_data in responses:
+                items, chunk_meta = self._split_meta(response_data)
+                users.extend(items)
+                meta = self._merge_meta(meta, chunk_meta)
+            return users, meta
@@ -0,0 +1,354 @@
+import asyncio
+import click
+import httpx
+from typing import AsyncIterator, Iterable
+from functools import cached_property
+from config.config_loader import APIParams, byIDParams, APIConfig, RedisConfig
+from caching.async_redis_client import AsyncRedisClient
+from caching.rate_limiter import (
+    AsyncRedisRateLimiter,
+    AsyncLocalRateLimiter,
+    QuotaExhaustedError,
+)
+from api.api_core import APICore, APIError
+from api.transport import AsyncTransport, HttpxTransport, TransportError
+from api.retry_policy import RetryPolicy, CircuitOpenError
+from codec.json_codec import codec
+
+
+class AsyncStackOverflowAPI(APICore):
+    """
+    asyncio client for the Stack Overflow API.
+
+    Mirrors StackOverflowAPI on top of httpx and redis.asyncio, so requests, cache
+    lookups and backoff waits never block the event loop. Use it as an async
+    context manager, or call aclose() when done.
+    """
+
+    # upper bound for concurrent requests sharing the client.
+    _POOL_SIZE = 100
+
+    def __init__(
+        self,
+        config: APIConfig,
+        transport: AsyncTransport | None = None,
+        cache_config: RedisConfig | None = None,
+    ) -> None:
+        super().__init__(config)
+        self.users = self.Users(self)
+        if transport is None:
+            transport = HttpxTransport(
+                httpx.AsyncClient(limits=httpx.Limits(max_connections=self._POOL_SIZE))
+            )
+        self.transport = transport
+        self._cache = AsyncRedisClient()
+        if cache_config is not None:
+            self._cache.configure(cache_config)
+        # single waiter sleeps on the backoff, the rest queue up behind it.
+        self._backoff_wait_lock = asyncio.Lock()
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self._requests_per_second = config.requests_per_second
+
+    @cached_property
+    def _limiter(self) -> AsyncRedisRateLimiter | AsyncLocalRateLimiter:
+        if self._cache.redis_available():
+            return AsyncRedisRateLimiter(
+                self._cache.api_cache, requests_per_second=self._requests_per_second
+            )
+        return AsyncLocalRateLimiter(requests_per_second=self._requests_per_second)
+
+    async def __aenter__(self) -> "AsyncStackOverflowAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._refresh_tasks:
+            await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        if hasattr(self.transport, "aclose"):
+            await self.transport.aclose()  # type: ignore[attr-defined]
+        await self._cache.aclose()
+
+    async def _get_request(self, endpoint: str, params: dict | None = None) -> dict:
+        # resolves redis or the disk fallback without blocking, _limiter picks by it.
+        await self._cache.aredis_available()
+        url = self._build_url(endpoint)
+
+        cache_key = self._build_cache_key(url, params)
+
+        lock_token = None
+        if self._use_cache:
+            cached_response = await self._check_cache(cache_key)
+            if cached_response:
+                if cached_response.get("stale"):
+                    await self._revalidate(endpoint, params, cache_key)
+                return cached_response
+
+            # single flight, only one caller across processes spends quota on a key.
+            lock_token = await self._cache.acquire_fetch_lock(
+                cache_key, self._FLIGHT_LOCK_TTL
+            )
+            if lock_token is None:
+                cached_response = await self._wait_for_flight(cache_key)
+                if cached_response:
+                    return cached_response
+
+        try:
+            response_data = await self._fetch(url, params)
+            await self._store_response(endpoint, params, cache_key, response_data)
+        finally:
+            if lock_token is not None:
+                await self._cache.release_fetch_lock(cache_key, lock_token)
+
+        response_data.update({"cached": False})
+        return response_data
+
+    async def _store_response(
+        self, endpoint: str, params: dict | None, cache_key: str, response_data: dict
+    ) -> None:
+        self._record_backoff(response_data)
+        await self._share_backoff()
+        await self._limiter.record_quota(response_data)
+
+        if self._is_user_endpoint(endpoint):
+            await self._cache.set_user_cache(
+                response_data.get("items") or [],
+                self._user_scope(params),
+                endpoint=endpoint,
+            )
+
+        # cache the response regardless of use cache.
+        await self._cache.set_api_cache(
+            cache_key, dict(response_data), endpoint=endpoint
+        )
+
+    async def _revalidate(
+        self, endpoint: str, params: dict | None, cache_key: str
+    ) -> None:
+        lock_token = await self._cache.acquire_fetch_lock(
+            cache_key, self._FLIGHT_LOCK_TTL
+        )
+        if lock_token is None:
+            return
+        task = asyncio.create_task(
+            self._refresh(endpoint, params, cache_key, lock_token)
+        )
+        # keep a reference until done, aclose waits for whatever is left.
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(
+        self, endpoint: str, params: dict | None, cache_key: str, lock_token: str
+    ) -> None:
+        try:
+            response_data = await self._fetch_in_background(
+                self._build_url(endpoint), params
+            )
+            if response_data is not None:
+                await self._store_response(endpoint, params, cache_key, response_data)
+        except Exception as e:
+            click.secho(
+                f"Background refresh failed: {e}", err=True, color=True, fg="yellow"
+            )
+        finally:
+            await self._cache.release_fetch_lock(cache_key, lock_token)
+
+    async def _fetch_in_background(self, url: str, params: dict | None) -> dict | None:
+        # one attempt without _check_backoff, so a refresh never holds the backoff
+        # lock the foreground waits on, a throttle aborts, see _background_result.
+        if not await self._acquire_in_background():
+            return None
+        try:
+            self._breaker.before_request()
+            response = await self.transport.get(url, params=params)
+        except CircuitOpenError:
+            return None
+        except TransportError:
+            self._breaker.record_failure()
+            return None
+        response_data = self._background_result(response.status_code, response.content)
+        await self._share_backoff()
+        return response_data
+
+    async def _acquire_in_background(self) -> bool:
+        """takes a rate limit token, False instead of waiting out a backoff."""
+        if self._backoff_remaining() is not None:
+            return False
+        while True:
+            try:
+                reason, wait_time = await self._limiter.acquire()
+            except QuotaExhaustedError:
+                return False
+            if wait_time <= 0:
+                return True
+            if reason == "backoff":
+                return False
+            await asyncio.sleep(wait_time)
+
+    async def _wait_for_flight(self, cache_key: str) -> dict | None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._FLIGHT_LOCK_TTL
+        while loop.time() < deadline:
+            await asyncio.sleep(self._FLIGHT_POLL_INTERVAL)
+            # lock first, the leader caches before it releases.
+            locked = await self._cache.fetch_locked(cache_key)
+            cached_response = await self._check_cache(cache_key)
+            if cached_response:
+                return cached_response
+            if not locked:
+                return None
+        return None
+
+    async def _fetch(self, url: str, params: dict | None = None) -> dict:
+        attempt = 0
+        throttles = 0
+
+        while True:
+            await self._check_backoff()
+            self._breaker.before_request()
+
+            try:
+                response = await self.transport.get(url, params=params)
+            except TransportError as e:
+                await asyncio.sleep(self._retry_delay(e, attempt))
+                attempt += 1
+                continue
+
+            if response.status_code < 400:
+                self._breaker.record_success()
+                # decoded once, everything after this works on the dict.
+                return codec.loads(response.content)
+
+            error_data = self._decode_error(response.content)
+            if self._handle_throttle(error_data):
+                await self._share_backoff()
+                throttles += 1
+                self._check_throttle_retries(
+                    throttles, response.status_code, error_data
+                )
+                continue
+
+            self._record_backoff(error_data)
+            await self._share_backoff()
+            retry_after = RetryPolicy.parse_retry_after(response.headers)
+            error = APIError(response.status_code, error_data)
+            await asyncio.sleep(
+                self._retry_delay(error, attempt, retry_after=retry_after)
+            )
+            attempt += 1
+
+    async def _get_cached_users(
+        self, user_ids: list[int], params: byIDParams
+    ) -> dict[int, dict]:
+        if not self._use_cache:
+            return {}
+        return await self._cache.get_user_cache(
+            user_ids, self._user_scope(params.model_dump())
+        )
+
+    async def _check_cache(self, cache_key: str) -> dict[str, str] | None:
+
+        cached_data = await self._cache.get_api_cache(cache_key)
+
+        if cached_data:
+            return cached_data
+        return None
+
+    async def _share_backoff(self) -> None:
+        # push the local deadline to redis so every other process waits on it too.
+        remaining_time = self._backoff_remaining()
+        if remaining_time is not None:
+            await self._limiter.set_backoff(remaining_time)
+
+    async def _check_backoff(self) -> None:
+        async with self._backoff_wait_lock:
+            # loop again in case a request extended the backoff while we waited.
+            while (remaining_time := self._backoff_remaining()) is not None:
+                await asyncio.sleep(remaining_time)
+
+            # shared deadline and requests per second limit across processes.
+            while True:
+                _, wait_time = await self._limiter.acquire()
+                if wait_time <= 0:
+                    return
+                await asyncio.sleep(wait_time)
+
+    class Users(APICore.UsersCore):
+
+        def __init__(self, api: "AsyncStackOverflowAPI") -> None:
+            super().__init__()
+            self.api = api
+
+        async def get_users(self, params: APIParams) -> tuple[list[dict], dict]:
+            response_data = await self.api._get_request(
+                self.endpoint, params=params.model_dump()
+            )
+            return self._split_meta(response_data)
+
+        async def iter_pages(
+            self, params: APIParams, max_pages: int | None = None
+        ) -> AsyncIterator[tuple[list[dict], dict]]:
+            # follows has_more from params.page, one page in memory at a time.
+            page = params.page
+            pages_fetched = 0
+
+            while max_pages is None or pages_fetched < max_pages:
+                users, meta = await self.get_users(
+                    params.model_copy(update={"page": page})
+                )
+                pages_fetched += 1
+                yield users, meta
+
+                if not meta.get("has_more", False):
+                    return
+                page += 1
+
+        async def iter_users(
+            self, params: APIParams, max_pages: int | None = None
+        ) -> AsyncIterator[dict]:
+            async for users, _ in self.iter_pages(params, max_pages=max_pages):
+                for user in users:
+                    yield user
+
+        async def get_users_pages(
+            self, params: APIParams, pages: Iterable[int], workers: int = 10
+        ) -> list[tuple[list[dict], dict]]:
+            # results are returned in the same order as pages.
+            semaphore = asyncio.Semaphore(max(1, min(workers, self.api._POOL_SIZE)))
+
+            async def get_page(page: int) -> tuple[list[dict], dict]:
+                async with semaphore:
+                    return await self.get_users(
+                        params.model_copy(update={"page": page})
+                    )
+
+            return list(await asyncio.gather(*(get_page(page) for page in pages)))
+
+        async def get_user_by_id(
+            self, user_id: int, params: byIDParams
+        ) -> tuple[list[dict], dict]:
+            endpoint = f"{self.endpoint}/{user_id}"
+            response_data = await self.api._get_request(
+                endpoint, params=params.model_dump()
+            )
+            return self._split_meta(response_data)
+
+        async def get_users_by_ids(
+            self, user_ids: Iterable[int], params: byIDParams
+        ) -> tuple[list[dict], dict]:
+            user_ids = list(dict.fromkeys(user_ids))
+            cached = await self.api._get_cached_users(user_ids, params)
+            # only the ids the entity cache does not have cost a request.
+            missing_ids = [user_id for user_id in user_ids if user_id not in cached]
+
+            responses = await asyncio.gather(
+                *(
+                    self.api._get_request(endpoint, params=chunk_params)
+                    for endpoint, chunk_params in self._chunk_requests(
+                        missing_ids, params
+                    )
+                )
+            )
+            users, meta = self._merge_responses(responses)
+            return self._with_cached_users(user_ids, cached, users, meta)
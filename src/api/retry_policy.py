@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+from config.config_loader import RetryConfig
+from api.transport import TransportError
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is retried and how long to wait first.
+
+    Transient failures are connection errors, 5xx statuses and the API's own
+    internal_error / temporarily_unavailable error ids. Waits use full jitter
+    exponential backoff, never shorter than a Retry-After the server asked for.
+    """
+
+    _RETRY_STATUSES = frozenset({500, 502, 503, 504})
+    # error_id values the API uses for transient failures, usually sent as HTTP 400.
+    _RETRY_ERROR_IDS = frozenset({500, 503})
+
+    def __init__(self, config: RetryConfig) -> None:
+        self.max_retries = config.max_retries
+        self.base_delay = config.base_delay
+        self.max_delay = config.max_delay
+        self.max_throttle_retries = config.max_throttle_retries
+
+    def is_transient(self, error: Exception) -> bool:
+        if isinstance(error, TransportError):
+            return True
+        status_code = getattr(error, "status_code", None)
+        error_id = getattr(error, "error_id", None)
+        return status_code in self._RETRY_STATUSES or error_id in self._RETRY_ERROR_IDS
+
+    def next_delay(
+        self, attempt: int, error: Exception, retry_after: float | None = None
+    ) -> float | None:
+        """seconds to wait before retry number attempt + 1, None when giving up."""
+        if attempt >= self.max_retries or not self.is_transient(error):
+            return None
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @staticmethod
+    def parse_retry_after(headers: dict[str, str]) -> float | None:
+        for key, val in headers.items():
+            if key.lower() == "retry-after":
+                try:
+                    return max(0.0, float(val))
+                except ValueError:
+                    # http dates are not worth the parsing, fall back to backoff.
+                    return None
+        return None
+
+
+class CircuitBreaker:
+    """
+    Fails fast once the API is clearly down.
+
+    After failure_threshold consecutive transient failures the circuit opens and
+    every request raises CircuitOpenError for reset_timeout seconds. Then a single
+    trial request is let through, closing the circuit on success or opening it
+    again on failure.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+
+            remaining_time = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining_time > 0 or self._trial_in_flight:
+                raise CircuitOpenError(
+                    f"API unavailable after {self._failures} failures,"
+                    f" failing fast for {max(remaining_time, 0):.1f}s"
+                )
+            # half open, this request is the trial.
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
@@ -1,70 +1,233 @@
 import requests
-from config.config_loader import APIParams, byIDParams, APIConfig
+from requests.adapters import HTTPAdapter
+from typing import Iterable, Iterator
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from config.config_loader import APIParams, byIDParams, APIConfig, RedisConfig
 from caching.redis_client import RedisClient
+from caching.rate_limiter import (
+    RedisRateLimiter,
+    LocalRateLimiter,
+    QuotaExhaustedError,
+)
 from ui.rich_builders import build_rich_timer_bar
-import time
+from api.api_core import APICore, APIError
+from api.transport import Transport, RequestsTransport, TransportError
+from api.retry_policy import RetryPolicy, CircuitOpenError
+from codec.json_codec import codec
 import click
-import re
+import time
+import threading
 
 
-class StackOverflowAPI:
+class StackOverflowAPI(APICore):
 
     # todo: add docstrings, type hints, error handling and logging.
 
-    _BASE_URL = "https://api.stackexchange.com/2.3"
-    _cache = RedisClient()
+    # upper bound for concurrent page workers sharing the session.
+    _POOL_SIZE = 10
 
-    def __init__(self, config: APIConfig) -> None:
+    def __init__(
+        self,
+        config: APIConfig,
+        transport: Transport | None = None,
+        cache_config: RedisConfig | None = None,
+        cache: RedisClient | None = None,
+        use_cache: bool | None = None,
+    ) -> None:
+        super().__init__(config)
+        # overrides config.use_cache, e.g. for fetch --no-cache.
+        if use_cache is not None:
+            self._use_cache = use_cache
         self.users = self.Users(self)
-        self.session = requests.Session()
-        self._backoff_expiry = None
-        self._backoff_desc = "API Backoff Timer"
-        self._use_cache = config.use_cache
+        self.transport = transport or self.default_transport()
+        # connects on first use, sof-file and bookmark view never touch redis.
+        self._cache = cache or RedisClient()
+        if cache_config is not None:
+            self._cache.configure(cache_config)
+        # makes sure only one worker shows the timer while the rest queue up behind it.
+        self._backoff_wait_lock = threading.Lock()
+        # stale cache entries are refreshed here, paced by the same rate limiter.
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="sof-refresh"
+        )
+        self._requests_per_second = config.requests_per_second
+
+    @cached_property
+    def _limiter(self) -> RedisRateLimiter | LocalRateLimiter:
+        # shared through redis when it is up, per process otherwise.
+        if self._cache.redis_available():
+            return RedisRateLimiter(
+                self._cache.api_cache, requests_per_second=self._requests_per_second
+            )
+        return LocalRateLimiter(requests_per_second=self._requests_per_second)
+
+    @classmethod
+    def default_transport(cls) -> RequestsTransport:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_maxsize=cls._POOL_SIZE))
+        session.mount("http://", HTTPAdapter(pool_maxsize=cls._POOL_SIZE))
+        return RequestsTransport(session)
 
     def _get_request(self, endpoint: str, params: dict | None = None) -> dict:
-        url = f"{self._BASE_URL}{endpoint}"
+        url = self._build_url(endpoint)
 
         cache_key = self._build_cache_key(url, params)
 
+        lock_token = None
         if self._use_cache:
             cached_response = self._check_cache(cache_key)
             if cached_response:
+                if cached_response.get("stale"):
+                    self._revalidate(endpoint, params, cache_key)
                 return cached_response
 
-        self._check_backoff()
+            # single flight, only one caller across processes spends quota on a key.
+            lock_token = self._cache.acquire_fetch_lock(
+                cache_key, self._FLIGHT_LOCK_TTL
+            )
+            if lock_token is None:
+                cached_response = self._wait_for_flight(cache_key)
+                if cached_response:
+                    return cached_response
 
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
-
-        except requests.exceptions.HTTPError as e:
-            error_id = int(e.response.json().get("error_id"))
-            error_name = e.response.json().get("error_name")
-            error_message = e.response.json().get("error_message")
-
-            if error_id == 502 and error_name == "throttle_violation":
-                click.secho(
-                    f"error id:{error_id} | error name: {error_name}",
-                    err=True,
-                    color=True,
-                    fg="red",
-                )
-                click.secho(f"{error_message}", err=True, color=True, fg="red")
+            response_data = self._fetch(url, params)
+            self._store_response(endpoint, params, cache_key, response_data)
+        finally:
+            if lock_token is not None:
+                self._cache.release_fetch_lock(cache_key, lock_token)
 
-                self._set_throttle_timer(error_message)
-                self._backoff_desc = "Throttled by API"
-                return self._get_request(endpoint, params)
-            else:
-                raise e
+        response_data.update({"cached": False})
+        return response_data
+
+    def _store_response(
+        self, endpoint: str, params: dict | None, cache_key: str, response_data: dict
+    ) -> None:
+        self._record_backoff(response_data)
+        self._limiter.record_quota(response_data)
 
-        if "backoff" in response.json():
-            self._set_backoff(response.json()["backoff"] + 1)
+        if self._is_user_endpoint(endpoint):
+            self._cache.set_user_cache(
+                response_data.get("items") or [],
+                self._user_scope(params),
+                endpoint=endpoint,
+            )
 
         # cache the response regardless of use cache.
-        self._cache.set_api_cache(cache_key, response.json())
-        response_data = response.json()
-        response_data.update({"cached": False})
-        return response_data
+        self._cache.set_api_cache(cache_key, dict(response_data), endpoint=endpoint)
+
+    def _revalidate(self, endpoint: str, params: dict | None, cache_key: str) -> None:
+        # the single flight lock doubles as the marker, one refresh per key at a time.
+        lock_token = self._cache.acquire_fetch_lock(cache_key, self._FLIGHT_LOCK_TTL)
+        if lock_token is None:
+            return
+        self._refresh_executor.submit(
+            self._refresh, endpoint, params, cache_key, lock_token
+        )
+
+    def _refresh(
+        self, endpoint: str, params: dict | None, cache_key: str, lock_token: str
+    ) -> None:
+        try:
+            response_data = self._fetch_in_background(self._build_url(endpoint), params)
+            if response_data is not None:
+                self._store_response(endpoint, params, cache_key, response_data)
+        except Exception as e:
+            click.secho(
+                f"Background refresh failed: {e}", err=True, color=True, fg="yellow"
+            )
+        finally:
+            self._cache.release_fetch_lock(cache_key, lock_token)
+
+    def _fetch_in_background(self, url: str, params: dict | None) -> dict | None:
+        # one attempt without _check_backoff: no backoff lock, no timer bar drawn
+        # over the interactive view, a throttle aborts, see _background_result.
+        if not self._acquire_in_background():
+            return None
+        try:
+            self._breaker.before_request()
+            response = self.transport.get(url, params=params)
+        except CircuitOpenError:
+            return None
+        except TransportError:
+            self._breaker.record_failure()
+            return None
+        return self._background_result(response.status_code, response.content)
+
+    def _acquire_in_background(self) -> bool:
+        """takes a rate limit token, False instead of waiting out a backoff."""
+        if self._backoff_remaining() is not None:
+            return False
+        while True:
+            try:
+                reason, wait_time = self._limiter.acquire()
+            except QuotaExhaustedError:
+                return False
+            if wait_time <= 0:
+                return True
+            if reason == "backoff":
+                return False
+            # only this worker sleeps for the next token, nothing is drawn.
+            time.sleep(wait_time)
+
+    def _wait_for_flight(self, cache_key: str) -> dict | None:
+        """waits for the caller holding the lock to cache its response."""
+        deadline = time.monotonic() + self._FLIGHT_LOCK_TTL
+        while time.monotonic() < deadline:
+            time.sleep(self._FLIGHT_POLL_INTERVAL)
+            # lock first, the leader caches before it releases.
+            locked = self._cache.fetch_locked(cache_key)
+            cached_response = self._check_cache(cache_key)
+            if cached_response:
+                return cached_response
+            if not locked:
+                # the leader failed without caching, fetch it ourselves.
+                return None
+        return None
+
+    def _fetch(self, url: str, params: dict | None = None) -> dict:
+        attempt = 0
+        throttles = 0
+
+        while True:
+            self._check_backoff()
+            self._breaker.before_request()
+
+            try:
+                response = self.transport.get(url, params=params)
+            except TransportError as e:
+                time.sleep(self._retry_delay(e, attempt))
+                attempt += 1
+                continue
+
+            if response.status_code < 400:
+                self._breaker.record_success()
+                # decoded once, everything after this works on the dict.
+                return codec.loads(response.content)
+
+            error_data = self._decode_error(response.content)
+            if self._handle_throttle(error_data):
+                throttles += 1
+                self._check_throttle_retries(
+                    throttles, response.status_code, error_data
+                )
+                continue
+
+            self._record_backoff(error_data)
+            retry_after = RetryPolicy.parse_retry_after(response.headers)
+            error = APIError(response.status_code, error_data)
+            time.sleep(self._retry_delay(error, attempt, retry_after=retry_after))
+            attempt += 1
+
+    def _get_cached_users(
+        self, user_ids: list[int], params: byIDParams
+    ) -> dict[int, dict]:
+        if not self._use_cache:
+            return {}
+        return self._cache.get_user_cache(
+            user_ids, self._user_scope(params.model_dump())
+        )
 
     def _check_cache(self, cache_key: str) -> dict[str, str] | None:
 
@@ -74,72 +237,95 @@ class StackOverflowAPI:
             return cached_data
         return None
 
-    @staticmethod
-    def _build_cache_key(url: str, params: dict | None) -> str:
-        if params:
-            params_str = "?" + "&".join(
-                [f"{key}={value}" for key, value in params.items()]
-            )
-            return f"{url}{params_str}"
-        else:
-            return url
-
     def _set_backoff(self, backoff: int) -> None:
-        self._backoff_expiry = time.time() + backoff
+        super()._set_backoff(backoff)
+        # push the deadline to redis so every other process waits on it too.
+        self._limiter.set_backoff(backoff)
 
     def _check_backoff(self):
-        if self._backoff_expiry:
-            remaining_time = self._backoff_expiry - time.time()
-            if remaining_time > 0:
-                self._backoff(int(remaining_time), self._backoff_desc)
-            else:
-                self._backoff_expiry = None
+        with self._backoff_wait_lock:
+            # loop again in case a worker extended the backoff while we waited.
+            while (remaining_time := self._backoff_remaining()) is not None:
+                self._backoff(remaining_time, self._backoff_desc)
+
+            # shared deadline and requests per second limit across processes.
+            while True:
+                reason, wait_time = self._limiter.acquire()
+                if wait_time <= 0:
+                    return
+                if reason == "backoff":
+                    self._backoff(wait_time, "Shared API Backoff")
+                else:
+                    time.sleep(wait_time)
 
     @staticmethod
-    def _backoff(backoff: int, desc: str) -> None:
+    def _backoff(backoff: float, desc: str) -> None:
         build_rich_timer_bar(total_time=backoff, desc=desc)
 
-    def _set_throttle_timer(self, error_message: str) -> None:
-        search_result = re.search(r"\d+(?=\s+seconds)", error_message)
-        if search_result:
-            backoff = int(search_result.group())
-            self._set_backoff(backoff=backoff)
-            return
-        raise ValueError("No backoff time found in error message")
+    class Users(APICore.UsersCore):
 
-    class Users:
         def __init__(self, api: "StackOverflowAPI") -> None:
-            self.endpoint = "/users"
+            super().__init__()
             self.api = api
-            self._max_retries = 3
 
         def get_users(self, params: APIParams) -> tuple[list[dict], dict]:
-            for i in range(self._max_retries):
-                try:
-                    resposne_data = self.api._get_request(
-                        self.endpoint, params=params.model_dump()
-                    )
-                    break
-                except requests.exceptions.HTTPError as e:
-                    raise e
-
-            # TODO: backoff handling, otherwise 502
-            users = resposne_data.get("items")
-            meta = {key: val for key, val in resposne_data.items() if key != "items"}
-            return users, meta
+            # retries and backoff are handled by the api, see StackOverflowAPI._fetch
+            response_data = self.api._get_request(
+                self.endpoint, params=params.model_dump()
+            )
+            return self._split_meta(response_data)
+
+        def iter_pages(
+            self, params: APIParams, max_pages: int | None = None
+        ) -> Iterator[tuple[list[dict], dict]]:
+            # follows has_more from params.page, one page in memory at a time.
+            page = params.page
+            pages_fetched = 0
+
+            while max_pages is None or pages_fetched < max_pages:
+                users, meta = self.get_users(params.model_copy(update={"page": page}))
+                pages_fetched += 1
+                yield users, meta
+
+                if not meta.get("has_more", False):
+                    return
+                page += 1
+
+        def iter_users(
+            self, params: APIParams, max_pages: int | None = None
+        ) -> Iterator[dict]:
+            for users, _ in self.iter_pages(params, max_pages=max_pages):
+                yield from users
+
+        def get_users_pages(
+            self, params: APIParams, pages: Iterable[int], workers: int = 1
+        ) -> list[tuple[list[dict], dict]]:
+            # results are returned in the same order as pages.
+            page_params = [params.model_copy(update={"page": page}) for page in pages]
+
+            if workers <= 1:
+                return [self.get_users(page_param) for page_param in page_params]
+
+            workers = min(workers, self.api._POOL_SIZE)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(self.get_users, page_params))
 
         def get_user_by_id(self, user_id: int, params: byIDParams) -> tuple[dict, dict]:
             endpoint = f"{self.endpoint}/{user_id}"
-            for i in range(self._max_retries):
-                try:
-                    response_data = self.api._get_request(
-                        endpoint, params=params.model_dump()
-                    )
-                    break
-                except requests.exceptions.HTTPError as e:
-
-                    raise e
-
-            user = response_data.get("items")
-            meta = {key: val for key, val in response_data.items() if key != "items"}
-            return user, meta
+            response_data = self.api._get_request(endpoint, params=params.model_dump())
+            return self._split_meta(response_data)
+
+        def get_users_by_ids(
+            self, user_ids: Iterable[int], params: byIDParams
+        ) -> tuple[list[dict], dict]:
+            user_ids = list(dict.fromkeys(user_ids))
+            cached = self.api._get_cached_users(user_ids, params)
+            # only the ids the entity cache does not have cost a request.
+            missing_ids = [user_id for user_id in user_ids if user_id not in cached]
+
+            responses = (
+                self.api._get_request(endpoint, params=chunk_params)
+                for endpoint, chunk_params in self._chunk_requests(missing_ids, params)
+            )
+            users, meta = self._merge_responses(responses)
+            return self._with_cached_users(user_ids, cached, users, meta)
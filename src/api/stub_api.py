@@ -0,0 +1,261 @@
+import asyncio
+import random
+import threading
+import time
+import click
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit, unquote
+from api.transport import TransportResponse
+from codec.json_codec import codec
+
+
+@dataclass
+class StubConfig:
+    # seconds added to every request, plus up to latency_jitter on top.
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    # every nth request is answered with a 400 throttle_violation.
+    throttle_every: int = 0
+    throttle_seconds: int = 2
+    # every nth successful response carries a backoff field.
+    backoff_every: int = 0
+    backoff_seconds: int = 1
+    # every nth request fails with a 503 temporarily_unavailable.
+    error_every: int = 0
+    quota_max: int = 10000
+    # users generated when no cassette is given.
+    synthetic_users: int = 1000
+
+
+class ReplayStub:
+    """
+    Offline stand in for the /users and /users/{ids} endpoints.
+
+    Requests that match a recorded exchange (see api.transport.RecordingTransport)
+    are answered with the recorded body. Anything else is served from the pool of
+    every user seen in the cassette, or a synthetic pool when there is none. On
+    top of that the stub injects latency, backoff fields and throttle violations
+    as configured, so throughput, retry and backoff can be measured without
+    touching api.stackexchange.com.
+    """
+
+    def __init__(
+        self, cassette_path: str | Path | None = None, config: StubConfig | None = None
+    ) -> None:
+        self.config = config or StubConfig()
+        self._recorded: dict[str, tuple[int, dict]] = {}
+        self._users: dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.quota_remaining = self.config.quota_max
+
+        if cassette_path:
+            self._load_cassette(Path(cassette_path))
+        if not self._users:
+            self._users = self._synthetic_users(self.config.synthetic_users)
+
+    def _load_cassette(self, cassette_path: Path) -> None:
+        with open(cassette_path, "rb") as cassette:
+            for line in cassette:
+                if not line.strip():
+                    continue
+                record = codec.loads(line)
+                endpoint = self._endpoint(record["endpoint"])
+                self._recorded[self._record_key(endpoint, record["params"])] = (
+                    record["status"],
+                    record["body"],
+                )
+                for user in record["body"].get("items") or []:
+                    if "user_id" in user:
+                        self._users[user["user_id"]] = user
+
+    @staticmethod
+    def _synthetic_users(count: int) -> dict[int, dict]:
+        return {
+            user_id: {
+                "user_id": user_id,
+                "account_id": user_id * 10,
+                "display_name": f"stub user {user_id}",
+                "reputation": (user_id * 7919) % 100000,
+                "user_type": "registered",
+                "last_access_date": 1700000000 + user_id,
+            }
+            for user_id in range(1, count + 1)
+        }
+
+    @staticmethod
+    def _endpoint(path: str) -> str:
+        # keeps everything from /users on, whatever base path the client used.
+        index = path.find("/users")
+        return unquote(path[index:]) if index != -1 else path
+
+    @staticmethod
+    def _record_key(endpoint: str, params: dict) -> str:
+        return endpoint + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+
+    def delay(self) -> float:
+        return self.config.latency + random.uniform(0, self.config.latency_jitter)
+
+    def respond(self, path: str, params: dict) -> tuple[int, bytes]:
+        with self._lock:
+            self.request_count += 1
+            request_number = self.request_count
+            self.quota_remaining = max(0, self.quota_remaining - 1)
+            quota_remaining = self.quota_remaining
+
+        if (
+            self.config.throttle_every
+            and request_number % self.config.throttle_every == 0
+        ):
+            return 400, codec.dumps(
+                {
+                    "error_id": 502,
+                    "error_name": "throttle_violation",
+                    "error_message": "too many requests from this IP, more requests "
+                    f"available in {self.config.throttle_seconds} seconds",
+                }
+            )
+
+        if self.config.error_every and request_number % self.config.error_every == 0:
+            return 503, codec.dumps(
+                {
+                    "error_id": 503,
+                    "error_name": "temporarily_unavailable",
+                    "error_message": "the service is temporarily unavailable",
+                }
+            )
+
+        endpoint = self._endpoint(path)
+        recorded = self._recorded.get(self._record_key(endpoint, params))
+        if recorded:
+            status, body = recorded
+            body = dict(body)
+        elif endpoint == "/users":
+            status, body = 200, self._users_page(params)
+        elif endpoint.startswith("/users/"):
+            status, body = 200, self._users_by_ids(endpoint, params)
+        else:
+            return 400, codec.dumps(
+                {
+                    "error_id": 404,
+                    "error_name": "no_method",
+                    "error_message": f"no method found with this name: {endpoint}",
+                }
+            )
+
+        if status == 200:
+            body.update(
+                {"quota_max": self.config.quota_max, "quota_remaining": quota_remaining}
+            )
+            if (
+                self.config.backoff_every
+                and request_number % self.config.backoff_every == 0
+            ):
+                body["backoff"] = self.config.backoff_seconds
+
+        return status, codec.dumps(body)
+
+    def _users_page(self, params: dict) -> dict:
+        page = int(params.get("page", 1))
+        pagesize = int(params.get("pagesize", 30))
+        sort_key = {
+            "reputation": lambda user: user.get("reputation", 0),
+            "name": lambda user: user.get("display_name", ""),
+        }.get(params.get("sort", "reputation"), lambda user: user["user_id"])
+
+        users = sorted(
+            self._users.values(), key=sort_key, reverse=params.get("order") != "asc"
+        )
+        start = (page - 1) * pagesize
+        return {
+            "items": users[start : start + pagesize],
+            "has_more": start + pagesize < len(users),
+        }
+
+    def _users_by_ids(self, endpoint: str, params: dict) -> dict:
+        ids = [int(user_id) for user_id in endpoint.split("/")[2].split(";") if user_id]
+        found = [self._users[user_id] for user_id in ids if user_id in self._users]
+        pagesize = int(params.get("pagesize", 30))
+        return {"items": found[:pagesize], "has_more": len(found) > pagesize}
+
+
+class ReplayTransport:
+    """sync transport answering from a ReplayStub in process, no sockets involved."""
+
+    def __init__(self, stub: ReplayStub) -> None:
+        self.stub = stub
+
+    def get(self, url: str, params: dict | None = None) -> TransportResponse:
+        time.sleep(self.stub.delay())
+        status, content = self.stub.respond(urlsplit(url).path, params or {})
+        return TransportResponse(status, content, {"content-type": "application/json"})
+
+
+class AsyncReplayTransport:
+
+    def __init__(self, stub: ReplayStub) -> None:
+        self.stub = stub
+
+    async def get(self, url: str, params: dict | None = None) -> TransportResponse:
+        await asyncio.sleep(self.stub.delay())
+        status, content = self.stub.respond(urlsplit(url).path, params or {})
+        return TransportResponse(status, content, {"content-type": "application/json"})
+
+    async def aclose(self) -> None:
+        pass
+
+
+def build_stub_server(
+    stub: ReplayStub, host: str = "127.0.0.1", port: int = 8080
+) -> ThreadingHTTPServer:
+    """http server over a ReplayStub, point api.base_url at http://host:port/2.3"""
+
+    class StubRequestHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self) -> None:
+            split_url = urlsplit(self.path)
+            time.sleep(stub.delay())
+            status, content = stub.respond(
+                split_url.path, dict(parse_qsl(split_url.query))
+            )
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return ThreadingHTTPServer((host, port), StubRequestHandler)
+
+
+@click.command()
+@click.option("--cassette", "-c", type=click.Path(exists=True), default=None)
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8080, show_default=True)
+@click.option("--latency", type=float, default=0.0, show_default=True)
+@click.option("--latency-jitter", type=float, default=0.0, show_default=True)
+@click.option("--throttle-every", type=int, default=0, show_default=True)
+@click.option("--throttle-seconds", type=int, default=2, show_default=True)
+@click.option("--backoff-every", type=int, default=0, show_default=True)
+@click.option("--backoff-seconds", type=int, default=1, show_default=True)
+@click.option("--error-every", type=int, default=0, show_default=True)
+def serve_stub(cassette: str | None, host: str, port: int, **stub_options) -> None:
+    """Serves recorded /users responses locally for offline benchmarking."""
+    stub = ReplayStub(cassette, StubConfig(**stub_options))
+    server = build_stub_server(stub, host=host, port=port)
+    click.secho(f"Stub API on http://{host}:{port}/2.3", fg="green")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        click.secho(f"Served {stub.request_count} requests", fg="blue")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve_stub()
@@ -0,0 +1,97 @@
+import requests
+import httpx
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Protocol
+from urllib.parse import urlsplit
+from codec.json_codec import codec
+
+
+@dataclass
+class TransportResponse:
+    status_code: int
+    content: bytes
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class TransportError(Exception):
+    """the request never got a response: connection refused, reset, timed out."""
+
+
+class Transport(Protocol):
+    def get(self, url: str, params: dict | None = None) -> TransportResponse: ...
+
+
+class AsyncTransport(Protocol):
+    async def get(self, url: str, params: dict | None = None) -> TransportResponse: ...
+
+
+class RequestsTransport:
+
+    def __init__(self, session: requests.Session, timeout: float = 30) -> None:
+        self.session = session
+        self.timeout = timeout
+
+    def get(self, url: str, params: dict | None = None) -> TransportResponse:
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise TransportError(f"{url}: {e}") from e
+        return TransportResponse(
+            response.status_code, response.content, dict(response.headers)
+        )
+
+
+class HttpxTransport:
+
+    def __init__(self, client: httpx.AsyncClient, timeout: float = 30) -> None:
+        self.client = client
+        self.timeout = timeout
+
+    async def get(self, url: str, params: dict | None = None) -> TransportResponse:
+        try:
+            response = await self.client.get(url, params=params, timeout=self.timeout)
+        except httpx.TransportError as e:
+            raise TransportError(f"{url}: {e}") from e
+        return TransportResponse(
+            response.status_code, response.content, dict(response.headers)
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class RecordingTransport:
+    """
+    Wraps a sync transport and appends every exchange to a cassette file.
+
+    The cassette is json lines of {"endpoint", "params", "status", "body"}, and is
+    what api.stub_api replays offline.
+    """
+
+    def __init__(self, inner: Transport, cassette_path: str | Path) -> None:
+        self.inner = inner
+        self.cassette_path = Path(cassette_path)
+        self.cassette_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: dict | None = None) -> TransportResponse:
+        response = self.inner.get(url, params=params)
+
+        try:
+            body = codec.loads(response.content)
+        except ValueError:
+            # non json bodies (proxy error pages and such) are not replayable.
+            return response
+
+        record = {
+            "endpoint": urlsplit(url).path,
+            "params": params or {},
+            "status": response.status_code,
+            "body": body,
+        }
+        with self._lock, open(self.cassette_path, "ab") as cassette:
+            cassette.write(codec.dumps(record) + b"\n")
+
+        return response
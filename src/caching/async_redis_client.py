@@ -0,0 +1,151 @@
+from redis.asyncio import Redis
+from redis.exceptions import (
+    ConnectionError as RedisConnectionError,
+    TimeoutError as RedisTimeoutError,
+)
+from uuid import uuid4
+from caching.redis_client import RedisClient, _RELEASE_LOCK_SCRIPT
+from caching.disk_cache import DiskCache, AsyncDiskCache
+from caching.payload_format import decode_payload
+
+
+class AsyncRedisClient(RedisClient):
+    """
+    asyncio counterpart of RedisClient, shares its key and payload format.
+
+    The availability ping is awaited, every cache method checks it first, so the
+    connect timeout never blocks the event loop.
+    """
+
+    async def aredis_available(self) -> bool:
+        """awaited redis_available, shares its once per process answer."""
+        reachable = self._known_reachable()
+        if reachable is not None:
+            return reachable
+
+        probe = Redis(
+            host=self._host,
+            port=self._port,
+            socket_connect_timeout=self._CONNECT_TIMEOUT,
+        )
+        try:
+            await probe.ping()
+            reachable = True
+        except (RedisConnectionError, RedisTimeoutError):
+            reachable = False
+        finally:
+            await probe.aclose()
+        return self._remember_reachable(reachable)
+
+    def redis_available(self) -> bool:
+        # a sync ping would block the loop, the answer comes from aredis_available.
+        reachable = self._known_reachable()
+        if reachable is None:
+            raise RuntimeError("await aredis_available() before using the cache")
+        return reachable
+
+    def _connect(self, db: int) -> Redis | AsyncDiskCache:  # type: ignore[override]
+        # asyncio pools are bound to their event loop, every client owns its own.
+        if self.redis_available():
+            return Redis(
+                host=self._host,
+                port=self._port,
+                db=db,
+                socket_connect_timeout=self._CONNECT_TIMEOUT,
+            )
+        return AsyncDiskCache(DiskCache(self.fallback_path, namespace=f"db{db}"))
+
+    async def acquire_fetch_lock(  # type: ignore[override]
+        self, url: str, ttl: float
+    ) -> str | None:
+        await self.aredis_available()
+        token = uuid4().hex
+        if await self.api_cache.set(
+            self._lock_string(url), token, nx=True, px=int(ttl * 1000)
+        ):
+            return token
+        return None
+
+    async def release_fetch_lock(self, url: str, token: str) -> None:  # type: ignore[override]
+        await self.aredis_available()
+        if isinstance(self.api_cache, AsyncDiskCache):
+            await self.api_cache.delete_if_equal(self._lock_string(url), token)
+            return
+        if self._release_lock_script is None:
+            self._release_lock_script = self.api_cache.register_script(
+                _RELEASE_LOCK_SCRIPT
+            )
+        await self._release_lock_script(keys=[self._lock_string(url)], args=[token])
+
+    async def fetch_locked(self, url: str) -> bool:  # type: ignore[override]
+        await self.aredis_available()
+        return bool(await self.api_cache.exists(self._lock_string(url)))
+
+    async def set_api_cache(  # type: ignore[override]
+        self, url: str, payload: dict, endpoint: str | None = None
+    ) -> bool:
+        await self.aredis_available()
+        url_key = self._api_url_string(url)
+        expiry = self.expiry_for(endpoint)
+
+        serialized_payload = self._serialize_payload(payload)
+        await self.api_cache.set(
+            url_key, serialized_payload, ex=expiry + self.stale_ttl
+        )
+        if self.local_cache is not None:
+            self.local_cache.set(url_key, serialized_payload, expiry)
+        return True
+
+    async def get_api_cache(self, url: str) -> dict | None:  # type: ignore[override]
+        await self.aredis_available()
+        url_key = self._api_url_string(url)
+
+        if self.local_cache is not None:
+            local_payload = self.local_cache.get(url_key)
+            if local_payload is not None:
+                return self._deserialize_payload(local_payload, tier="local")
+
+        pipe = self.api_cache.pipeline(transaction=False)
+        pipe.get(url_key)
+        pipe.pttl(url_key)
+        serialized_payload, ttl_ms = await pipe.execute()
+
+        if serialized_payload:
+            return self._from_redis(url_key, serialized_payload, ttl_ms)
+        return None
+
+    async def set_user_cache(  # type: ignore[override]
+        self, users: list[dict], scope: str = "", endpoint: str | None = None
+    ) -> None:
+        await self.aredis_available()
+        expiry = self.expiry_for(endpoint)
+        pipe = self.user_cache.pipeline(transaction=False)
+        for user in users:
+            if "user_id" in user:
+                pipe.set(
+                    self._user_id_string(user["user_id"], scope),
+                    self._serialize_payload(user),
+                    ex=expiry,
+                )
+        await pipe.execute()
+
+    async def get_user_cache(  # type: ignore[override]
+        self, user_ids: list[int], scope: str = ""
+    ) -> dict[int, dict]:
+        await self.aredis_available()
+        if not user_ids:
+            return {}
+        payloads = await self.user_cache.mget(
+            [self._user_id_string(user_id, scope) for user_id in user_ids]
+        )
+        return {
+            user_id: decode_payload(payload)[0]
+            for user_id, payload in zip(user_ids, payloads)
+            if payload
+        }
+
+    async def aclose(self) -> None:
+        # only what was actually opened.
+        for connection in (self._api_cache, self._user_cache):
+            if connection is not None:
+                await connection.aclose()
@@ -0,0 +1,271 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class DiskCache:
+    """
+    SQLite stand in for the few redis commands the cache uses.
+
+    Used when redis is not reachable. Keys carry the same TTL semantics as in
+    redis (expired keys read as missing, PTTL returns -2 / -1 / milliseconds left)
+    and each redis db maps to its own namespace, so RedisClient works unchanged on
+    top of it. The file is shared by every process on the machine.
+
+    Redis evicts expired keys itself, here they are purged on open and every
+    _PURGE_EVERY writes, so the file does not grow with keys nobody reads again.
+    """
+
+    _PURGE_EVERY = 1000
+
+    def __init__(self, path: str, namespace: str = "db0") -> None:
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._writes = 0
+        # autocommit, every statement is its own transaction like a redis command.
+        self._conn = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self.purge_expired()
+
+    @staticmethod
+    def _to_bytes(value: bytes | str | int | float) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    @staticmethod
+    def _expires_at(ex: float | None, px: int | None) -> float | None:
+        if ex is not None:
+            return time.time() + ex
+        if px is not None:
+            return time.time() + px / 1000
+        return None
+
+    def _row(self, name: str) -> tuple[bytes, float | None] | None:
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, name),
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] <= time.time():
+            return None
+        return row
+
+    def get(self, name: str) -> bytes | None:
+        with self._lock:
+            row = self._row(name)
+        return row[0] if row else None
+
+    def mget(self, names: list[str]) -> list[bytes | None]:
+        with self._lock:
+            rows = [self._row(name) for name in names]
+        return [row[0] if row else None for row in rows]
+
+    def strlen(self, name: str) -> int:
+        value = self.get(name)
+        return len(value) if value is not None else 0
+
+    def getrange(self, name: str, start: int, end: int) -> bytes:
+        value = self.get(name) or b""
+        # redis ranges are inclusive, -1 is the last byte.
+        return value[start : None if end == -1 else end + 1]
+
+    def scan_iter(self, match: str | None = None, count: int | None = None):
+        # GLOB follows the same *, ? and [] rules as redis patterns.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM cache WHERE namespace = ? AND key GLOB ?"
+                " AND (expires_at IS NULL OR expires_at > ?)",
+                (self.namespace, match or "*", time.time()),
+            ).fetchall()
+        for (key,) in rows:
+            yield key.encode()
+
+    def dbsize(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ?"
+                " AND (expires_at IS NULL OR expires_at > ?)",
+                (self.namespace, time.time()),
+            ).fetchone()[0]
+
+    def pttl(self, name: str) -> int:
+        with self._lock:
+            row = self._row(name)
+        if row is None:
+            return -2
+        if row[1] is None:
+            return -1
+        return max(0, int((row[1] - time.time()) * 1000))
+
+    def set(
+        self,
+        name: str,
+        value: bytes | str | int | float,
+        ex: float | None = None,
+        px: int | None = None,
+        nx: bool = False,
+    ) -> bool | None:
+        expires_at = self._expires_at(ex, px)
+        with self._lock:
+            if nx:
+                # an expired row is still in the table, clear it for the insert.
+                self._conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?"
+                    " AND expires_at <= ?",
+                    (self.namespace, name, time.time()),
+                )
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)",
+                    (self.namespace, name, self._to_bytes(value), expires_at),
+                )
+                self._count_write()
+                return True if cursor.rowcount == 1 else None
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                (self.namespace, name, self._to_bytes(value), expires_at),
+            )
+            self._count_write()
+        return True
+
+    def _count_write(self) -> None:
+        # called with the lock held.
+        self._writes += 1
+        if self._writes % self._PURGE_EVERY == 0:
+            self._delete_expired()
+
+    def exists(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._row(name) is not None for name in names)
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(
+                self._conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, name),
+                ).rowcount
+                for name in names
+            )
+
+    def delete_if_equal(self, name: str, value: bytes | str) -> int:
+        # the compare and delete the lock release script does in redis.
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ? AND value = ?",
+                (self.namespace, name, self._to_bytes(value)),
+            ).rowcount
+
+    def purge_expired(self) -> int:
+        """deletes the expired keys of every namespace, returns how many."""
+        with self._lock:
+            return self._delete_expired()
+
+    def _delete_expired(self) -> int:
+        return self._conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),),
+        ).rowcount
+
+    def pipeline(self, transaction: bool = True) -> "DiskPipeline":
+        return DiskPipeline(self)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class DiskPipeline:
+    """queues commands like a redis pipeline, execute runs them in order."""
+
+    def __init__(self, cache: DiskCache) -> None:
+        self._cache = cache
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def _queue(self, command: str, *args, **kwargs) -> "DiskPipeline":
+        self._commands.append((command, args, kwargs))
+        return self
+
+    def get(self, name: str) -> "DiskPipeline":
+        return self._queue("get", name)
+
+    def pttl(self, name: str) -> "DiskPipeline":
+        return self._queue("pttl", name)
+
+    def strlen(self, name: str) -> "DiskPipeline":
+        return self._queue("strlen", name)
+
+    def getrange(self, name: str, start: int, end: int) -> "DiskPipeline":
+        return self._queue("getrange", name, start, end)
+
+    def set(self, name: str, value, **kwargs) -> "DiskPipeline":
+        return self._queue("set", name, value, **kwargs)
+
+    def execute(self) -> list:
+        commands, self._commands = self._commands, []
+        return [
+            getattr(self._cache, command)(*args, **kwargs)
+            for command, args, kwargs in commands
+        ]
+
+
+class AsyncDiskCache:
+    """
+    awaitable face of DiskCache for AsyncRedisClient.
+
+    sqlite calls block, a busy database waits up to its timeout, so they run in a
+    worker thread instead of on the event loop. DiskCache serializes them itself.
+    """
+
+    def __init__(self, cache: DiskCache) -> None:
+        self.sync = cache
+
+    async def get(self, name: str) -> bytes | None:
+        return await asyncio.to_thread(self.sync.get, name)
+
+    async def mget(self, names: list[str]) -> list[bytes | None]:
+        return await asyncio.to_thread(self.sync.mget, names)
+
+    async def pttl(self, name: str) -> int:
+        return await asyncio.to_thread(self.sync.pttl, name)
+
+    async def set(self, name: str, value, **kwargs) -> bool | None:
+        return await asyncio.to_thread(self.sync.set, name, value, **kwargs)
+
+    async def exists(self, *names: str) -> int:
+        return await asyncio.to_thread(self.sync.exists, *names)
+
+    async def delete(self, *names: str) -> int:
+        return await asyncio.to_thread(self.sync.delete, *names)
+
+    async def delete_if_equal(self, name: str, value: bytes | str) -> int:
+        return await asyncio.to_thread(self.sync.delete_if_equal, name, value)
+
+    def pipeline(self, transaction: bool = True) -> "AsyncDiskPipeline":
+        return AsyncDiskPipeline(self.sync)
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.sync.close)
+
+
+class AsyncDiskPipeline(DiskPipeline):
+
+    async def execute(self) -> list:  # type: ignore[override]
+        return await asyncio.to_thread(super().execute)
@@ -0,0 +1,82 @@
+import struct
+import time
+import zlib
+from datetime import datetime
+from codec.json_codec import codec
+
+# magic, format version, flags, unix time the payload was cached at.
+_HEADER = struct.Struct(">3sBBd")
+_MAGIC = b"SOF"
+FORMAT_VERSION = 1
+_FLAG_ZLIB = 0x01
+HEADER_SIZE = _HEADER.size
+
+
+def encode_payload(
+    payload: dict, compress_min_bytes: int | None = 1024, cached_at: float | None = None
+) -> bytes:
+    """
+    Packs a payload into the versioned cache format.
+
+    Args:
+        payload (dict): the response or user to cache.
+        compress_min_bytes (int | None): bodies at least this large are zlib
+            compressed, None never compresses.
+        cached_at (float | None): unix time to stamp, defaults to now.
+
+    Returns:
+        bytes: fixed size header followed by the codec encoded body.
+    """
+    body = codec.dumps(payload)
+    flags = 0
+    if compress_min_bytes is not None and len(body) >= compress_min_bytes:
+        compressed = zlib.compress(body, 1)
+        # small or random bodies can grow, keep whichever is smaller.
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= _FLAG_ZLIB
+
+    if cached_at is None:
+        cached_at = time.time()
+    return _HEADER.pack(_MAGIC, FORMAT_VERSION, flags, cached_at) + body
+
+
+def decode_payload(serialized_payload: bytes | str) -> tuple[dict, float | None]:
+    """
+    Unpacks a cache entry.
+
+    Returns:
+        tuple[dict, float | None]: the payload and the unix time it was cached at.
+
+    errors:
+        ValueError: if the entry was written by a newer, unknown format version.
+    """
+    if isinstance(serialized_payload, str):
+        serialized_payload = serialized_payload.encode()
+
+    if not serialized_payload.startswith(_MAGIC):
+        # plain json written before the format was versioned.
+        payload: dict = codec.loads(serialized_payload)
+        cache_timestamp = payload.pop("cache_timestamp", None)
+        if cache_timestamp is None:
+            return payload, None
+        return payload, datetime.fromisoformat(cache_timestamp).timestamp()
+
+    _, version, flags, cached_at = _HEADER.unpack_from(serialized_payload)
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unknown cache payload version {version}")
+
+    body = serialized_payload[_HEADER.size :]
+    if flags & _FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return codec.loads(body), cached_at
+
+
+def read_header(serialized_payload: bytes) -> tuple[int, bool, float] | None:
+    """version, compressed flag and cache time, None for legacy plain json entries."""
+    if len(serialized_payload) < _HEADER.size or not serialized_payload.startswith(
+        _MAGIC
+    ):
+        return None
+    _, version, flags, cached_at = _HEADER.unpack_from(serialized_payload)
+    return version, bool(flags & _FLAG_ZLIB), cached_at
@@ -0,0 +1,262 @@
+import threading
+import time
+from redis import Redis
+from redis import asyncio as aioredis
+from datetime import datetime, timedelta, timezone
+
+# all scripts take the clock from redis TIME, so every process agrees on "now".
+_NOW = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+"""
+
+# KEYS: bucket, backoff, quota | ARGV: requests_per_second, burst
+# returns {reason, seconds to wait}, a wait of 0 means a token was taken.
+_ACQUIRE_SCRIPT = (
+    _NOW
+    + """
+local quota = redis.call('GET', KEYS[3])
+if quota and tonumber(quota) <= 0 then
+    return {'quota', tostring(redis.call('PTTL', KEYS[3]) / 1000)}
+end
+
+local deadline = tonumber(redis.call('GET', KEYS[2]) or '0')
+if deadline > now then
+    return {'backoff', tostring(deadline - now)}
+end
+
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {'rate', tostring(wait)}
+"""
+)
+
+# KEYS: backoff | ARGV: backoff seconds
+# only ever pushes the shared deadline forward, returns seconds until it.
+_BACKOFF_SCRIPT = (
+    _NOW
+    + """
+local deadline = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if deadline > current then
+    redis.call('SET', KEYS[1], tostring(deadline), 'PX', math.max(1, math.ceil(tonumber(ARGV[1]) * 1000)))
+    return tostring(deadline - now)
+end
+return tostring(current - now)
+"""
+)
+
+
+class QuotaExhaustedError(Exception):
+    pass
+
+
+class RateLimiterBase:
+    """
+    Token bucket and backoff deadline shared by every process through redis.
+
+    The bucket enforces the requests per second limit of the API, the backoff key
+    holds the latest deadline any process got from a `backoff` field or a throttle
+    violation, and the quota key mirrors the last `quota_remaining` seen until the
+    daily reset at UTC midnight.
+    """
+
+    _BUCKET_KEY = "ratelimit:bucket"
+    _BACKOFF_KEY = "ratelimit:backoff"
+    _QUOTA_KEY = "ratelimit:quota_remaining"
+
+    def __init__(self, requests_per_second: float, burst: int | None = None) -> None:
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be greater than 0")
+
+        self.requests_per_second = requests_per_second
+        self.burst = burst or max(1, int(requests_per_second))
+
+    @staticmethod
+    def _seconds_to_quota_reset() -> int:
+        now = datetime.now(timezone.utc)
+        reset = (now + timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        return max(1, int((reset - now).total_seconds()))
+
+    def _parse_acquire(self, result: list) -> tuple[str, float]:
+        reason, wait = result
+        reason = reason.decode() if isinstance(reason, bytes) else reason
+        wait = float(wait)
+
+        if reason == "quota":
+            hours, rest = divmod(int(wait), 3600)
+            raise QuotaExhaustedError(
+                f"API quota exhausted, resets in {hours}h {rest // 60}m"
+            )
+        return reason, wait
+
+
+class RedisRateLimiter(RateLimiterBase):
+
+    def __init__(
+        self, connection: Redis, requests_per_second: float, burst: int | None = None
+    ) -> None:
+        super().__init__(requests_per_second, burst)
+        self.connection = connection
+        self._acquire_script = connection.register_script(_ACQUIRE_SCRIPT)
+        self._backoff_script = connection.register_script(_BACKOFF_SCRIPT)
+
+    def acquire(self) -> tuple[str, float]:
+        """
+        Try to take a token.
+
+        Returns:
+            tuple[str, float]: why the caller has to wait ("rate" or "backoff") and
+            for how many seconds, 0 when the token was taken.
+
+        errors:
+            QuotaExhaustedError: if the last response reported no quota left.
+        """
+        result = self._acquire_script(
+            keys=[self._BUCKET_KEY, self._BACKOFF_KEY, self._QUOTA_KEY],
+            args=[self.requests_per_second, self.burst],
+        )
+        return self._parse_acquire(result)
+
+    def set_backoff(self, backoff: float) -> float:
+        result = self._backoff_script(keys=[self._BACKOFF_KEY], args=[backoff])
+        return float(result)
+
+    def record_quota(self, response_data: dict) -> None:
+        if "quota_remaining" in response_data:
+            self.connection.set(
+                self._QUOTA_KEY,
+                int(response_data["quota_remaining"]),
+                ex=self._seconds_to_quota_reset(),
+            )
+
+    def quota_remaining(self) -> int | None:
+        quota = self.connection.get(self._QUOTA_KEY)
+        return int(quota) if quota is not None else None
+
+
+class AsyncRedisRateLimiter(RateLimiterBase):
+
+    def __init__(
+        self,
+        connection: aioredis.Redis,
+        requests_per_second: float,
+        burst: int | None = None,
+    ) -> None:
+        super().__init__(requests_per_second, burst)
+        self.connection = connection
+        self._acquire_script = connection.register_script(_ACQUIRE_SCRIPT)
+        self._backoff_script = connection.register_script(_BACKOFF_SCRIPT)
+
+    async def acquire(self) -> tuple[str, float]:
+        result = await self._acquire_script(
+            keys=[self._BUCKET_KEY, self._BACKOFF_KEY, self._QUOTA_KEY],
+            args=[self.requests_per_second, self.burst],
+        )
+        return self._parse_acquire(result)
+
+    async def set_backoff(self, backoff: float) -> float:
+        result = await self._backoff_script(keys=[self._BACKOFF_KEY], args=[backoff])
+        return float(result)
+
+    async def record_quota(self, response_data: dict) -> None:
+        if "quota_remaining" in response_data:
+            await self.connection.set(
+                self._QUOTA_KEY,
+                int(response_data["quota_remaining"]),
+                ex=self._seconds_to_quota_reset(),
+            )
+
+    async def quota_remaining(self) -> int | None:
+        quota = await self.connection.get(self._QUOTA_KEY)
+        return int(quota) if quota is not None else None
+
+
+class LocalRateLimiter(RateLimiterBase):
+    """
+    In process token bucket used when redis is not reachable.
+
+    Same interface as RedisRateLimiter, but the bucket, backoff deadline and quota
+    are only shared by the threads of this process.
+    """
+
+    def __init__(self, requests_per_second: float, burst: int | None = None) -> None:
+        super().__init__(requests_per_second, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._backoff_until = 0.0
+        self._quota: tuple[int, float] | None = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple[str, float]:
+        with self._lock:
+            now = time.monotonic()
+            if self._quota is not None:
+                quota, reset_at = self._quota
+                if reset_at <= now:
+                    self._quota = None
+                elif quota <= 0:
+                    return self._parse_acquire(["quota", reset_at - now])
+
+            if self._backoff_until > now:
+                return "backoff", self._backoff_until - now
+
+            elapsed = max(0.0, now - self._updated)
+            self._tokens = min(
+                self.burst, self._tokens + elapsed * self.requests_per_second
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return "rate", 0.0
+            return "rate", (1 - self._tokens) / self.requests_per_second
+
+    def set_backoff(self, backoff: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._backoff_until = max(self._backoff_until, now + backoff)
+            return self._backoff_until - now
+
+    def record_quota(self, response_data: dict) -> None:
+        if "quota_remaining" in response_data:
+            with self._lock:
+                self._quota = (
+                    int(response_data["quota_remaining"]),
+                    time.monotonic() + self._seconds_to_quota_reset(),
+                )
+
+    def quota_remaining(self) -> int | None:
+        with self._lock:
+            return self._quota[0] if self._quota is not None else None
+
+
+class AsyncLocalRateLimiter(LocalRateLimiter):
+    # the bucket math never blocks, only the interface turns awaitable.
+
+    async def acquire(self) -> tuple[str, float]:  # type: ignore[override]
+        return super().acquire()
+
+    async def set_backoff(self, backoff: float) -> float:  # type: ignore[override]
+        return super().set_backoff(backoff)
+
+    async def record_quota(self, response_data: dict) -> None:  # type: ignore[override]
+        super().record_quota(response_data)
+
+    async def quota_remaining(self) -> int | None:  # type: ignore[override]
+        return super().quota_remaining()
@@ -1,57 +1,399 @@
-from redis import Redis
+import click
+import threading
+import time
+from typing import Iterator
+from redis import Redis, ConnectionPool
+from redis.exceptions import (
+    ConnectionError as RedisConnectionError,
+    ResponseError,
+    TimeoutError as RedisTimeoutError,
+)
 from os import getenv
-import json
+from pathlib import Path
 from datetime import datetime
+from uuid import uuid4
+from caching.local_cache import LocalLRUCache
+from caching.disk_cache import DiskCache
+from caching.payload_format import (
+    encode_payload,
+    decode_payload,
+    read_header,
+    HEADER_SIZE,
+)
+from config.config_loader import LocalCacheConfig, RedisConfig
+
+# KEYS: lock | ARGV: token, only the holder may release the lock.
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# relative fallback paths are resolved like sof_handler.default_path, against the
+# project root, so the cache is the same file wherever the cli is run from.
+_ROOT_PATH = Path(__file__).parent.parent.parent
 
 
 class RedisClient:
+    """
+    Response and user cache on redis, db 0 for responses and db 1 for users.
+
+    Connections are opened lazily from a ConnectionPool shared by every client in
+    the process, so importing or constructing the client costs nothing. When redis
+    cannot be reached the client falls back to a DiskCache at fallback_path, with
+    the same keys and TTLs.
+    """
+
+    _pools: dict[tuple[str, int, int], ConnectionPool] = {}
+    # ping result per host and port, redis is checked once per process.
+    _reachable: dict[tuple[str, int], bool] = {}
+    _pools_lock = threading.Lock()
+    # keeps startup snappy when nothing listens on the redis port.
+    _CONNECT_TIMEOUT = 0.5
 
     def __init__(self) -> None:
 
-        if getenv("host") is not None and getenv("port") is not None:
-            redis_host = str(getenv("host"))
-            redis_port = int(str(getenv("port")))
-        else:
-            redis_host = "localhost"
-            redis_port = 6379
+        self._host, self._port = self._get_host_port()
+        self._api_cache = None
+        self._user_cache = None
+        self._release_lock_script = None
+        self.fallback_path = self._resolve_fallback_path("./data/cache.sqlite3")
 
-        self.api_cache = Redis(host=redis_host, port=redis_port, db=0)
-        self.user_cache = Redis(host=redis_host, port=redis_port, db=1)
         self.default_expiry = 60
+        self.endpoint_expiry: dict[str, int] = {}
+        self.compress_min_bytes: int | None = 1024
+        # seconds an entry is kept and served as stale once its TTL is up.
+        self.stale_ttl = 0
+        self.configure_local_cache(LocalCacheConfig())
+
+    @classmethod
+    def _shared_pool(cls, host: str, port: int, db: int) -> ConnectionPool:
+        with cls._pools_lock:
+            pool = cls._pools.get((host, port, db))
+            if pool is None:
+                pool = ConnectionPool(
+                    host=host,
+                    port=port,
+                    db=db,
+                    socket_connect_timeout=cls._CONNECT_TIMEOUT,
+                )
+                cls._pools[(host, port, db)] = pool
+            return pool
+
+    def redis_available(self) -> bool:
+        """pings redis once per process, later calls return the first answer."""
+        reachable = self._known_reachable()
+        if reachable is not None:
+            return reachable
+
+        try:
+            Redis(connection_pool=self._shared_pool(self._host, self._port, 0)).ping()
+            reachable = True
+        except (RedisConnectionError, RedisTimeoutError):
+            # a firewalled host times out on connect instead of refusing it.
+            reachable = False
+        return self._remember_reachable(reachable)
+
+    def _known_reachable(self) -> bool | None:
+        with self._pools_lock:
+            return self._reachable.get((self._host, self._port))
+
+    def _remember_reachable(self, reachable: bool) -> bool:
+        # the first answer wins when clients race, and only it is reported.
+        with self._pools_lock:
+            if (self._host, self._port) not in self._reachable and not reachable:
+                click.secho(
+                    f"Redis unreachable at {self._host}:{self._port},"
+                    f" caching to {self.fallback_path}",
+                    err=True,
+                    color=True,
+                    fg="yellow",
+                )
+            self._reachable.setdefault((self._host, self._port), reachable)
+            return self._reachable[(self._host, self._port)]
+
+    def _connect(self, db: int) -> Redis | DiskCache:
+        if self.redis_available():
+            return Redis(connection_pool=self._shared_pool(self._host, self._port, db))
+        return DiskCache(self.fallback_path, namespace=f"db{db}")
+
+    @property
+    def api_cache(self) -> Redis | DiskCache:
+        if self._api_cache is None:
+            self._api_cache = self._connect(db=0)
+        return self._api_cache
+
+    @property
+    def user_cache(self) -> Redis | DiskCache:
+        if self._user_cache is None:
+            self._user_cache = self._connect(db=1)
+        return self._user_cache
+
+    def configure(self, config: RedisConfig) -> None:
+        self.default_expiry = config.cache_expire
+        self.endpoint_expiry = dict(config.endpoint_expire)
+        self.compress_min_bytes = config.compress_min_bytes
+        self.stale_ttl = config.stale_while_revalidate
+        self.fallback_path = self._resolve_fallback_path(config.fallback_path)
+        self.configure_local_cache(config.local_cache)
+
+    def expiry_for(self, endpoint: str | None) -> int:
+        """TTL for an endpoint, the longest matching endpoint_expire prefix wins."""
+        if endpoint:
+            matches = [
+                prefix for prefix in self.endpoint_expiry if endpoint.startswith(prefix)
+            ]
+            if matches:
+                return self.endpoint_expiry[max(matches, key=len)]
+        return self.default_expiry
+
+    def configure_local_cache(self, config: LocalCacheConfig) -> None:
+        self.local_cache = (
+            LocalLRUCache(config.max_entries, config.max_bytes)
+            if config.enabled
+            else None
+        )
 
     @staticmethod
-    def _user_id_string(user_id: int) -> str:
+    def _resolve_fallback_path(fallback_path: str | None) -> str:
+        if not fallback_path or fallback_path == ":memory:":
+            return ":memory:"
+        return str(_ROOT_PATH / fallback_path)
+
+    @staticmethod
+    def _get_host_port() -> tuple[str, int]:
+        if getenv("host") is not None and getenv("port") is not None:
+            return str(getenv("host")), int(str(getenv("port")))
+        return "localhost", 6379
+
+    @staticmethod
+    def _user_id_string(user_id: int, scope: str = "") -> str:
+        # the same id differs per site and filter, scope keeps them apart.
+        if scope:
+            return f"userId:{str(user_id)}|{scope}"
         return f"userId:{str(user_id)}"
 
     @staticmethod
     def _api_url_string(url: str) -> str:
         return f"api:{url}"
 
-    def set_api_cache(self, url: str, payload: dict) -> bool:
-        # TODO: remove hard coded expiry
+    @staticmethod
+    def _lock_string(url: str) -> str:
+        return f"lock:api:{url}"
+
+    def acquire_fetch_lock(self, url: str, ttl: float) -> str | None:
+        """returns a token when this caller should fetch url, None if another is."""
+        token = uuid4().hex
+        if self.api_cache.set(
+            self._lock_string(url), token, nx=True, px=int(ttl * 1000)
+        ):
+            return token
+        return None
+
+    def release_fetch_lock(self, url: str, token: str) -> None:
+        if isinstance(self.api_cache, DiskCache):
+            self.api_cache.delete_if_equal(self._lock_string(url), token)
+            return
+        if self._release_lock_script is None:
+            self._release_lock_script = self.api_cache.register_script(
+                _RELEASE_LOCK_SCRIPT
+            )
+        self._release_lock_script(keys=[self._lock_string(url)], args=[token])
+
+    def fetch_locked(self, url: str) -> bool:
+        return bool(self.api_cache.exists(self._lock_string(url)))
+
+    def set_api_cache(
+        self, url: str, payload: dict, endpoint: str | None = None
+    ) -> bool:
         url_key = self._api_url_string(url)
+        expiry = self.expiry_for(endpoint)
 
-        payload.update({"cache_timestamp": datetime.now().isoformat()})
-        serialized_payload = json.dumps(payload)
-        self.api_cache.set(url_key, serialized_payload)
-        self.api_cache.expire(url_key, self.default_expiry)
+        serialized_payload = self._serialize_payload(payload)
+        # SET with EX, one round trip and no window without a TTL. redis keeps the
+        # entry for the stale window on top, the local copy only while fresh.
+        self.api_cache.set(url_key, serialized_payload, ex=expiry + self.stale_ttl)
+        if self.local_cache is not None:
+            self.local_cache.set(url_key, serialized_payload, expiry)
         return True
 
     def get_api_cache(self, url: str) -> dict | None:
+        """
+        Looks up a cached response, local tier first.
+
+        Returns:
+            dict | None: the payload with cached, cache_age and cache_tier set, and
+            stale set to True once it is past its TTL but inside the stale window.
+        """
         url_key = self._api_url_string(url)
-        serialized_payload = self.api_cache.get(url_key)
+
+        if self.local_cache is not None:
+            local_payload = self.local_cache.get(url_key)
+            if local_payload is not None:
+                return self._deserialize_payload(local_payload, tier="local")
+
+        # one round trip for the payload and its remaining TTL, so the local copy
+        # expires together with the redis key and stale entries are told apart.
+        pipe = self.api_cache.pipeline(transaction=False)
+        pipe.get(url_key)
+        pipe.pttl(url_key)
+        serialized_payload, ttl_ms = pipe.execute()
+
         if serialized_payload:
-            payload: dict = json.loads(serialized_payload)
-            cache_timestamp = payload["cache_timestamp"]
-            age = self._get_cache_age(cache_timestamp)
-            payload.update({"cached": True, "cache_age": age})
-            payload.pop("cache_timestamp")
-            return payload
+            return self._from_redis(url_key, serialized_payload, ttl_ms)
         return None
 
+    def _from_redis(self, url_key: str, serialized_payload: bytes, ttl_ms: int) -> dict:
+        # keys without a TTL (-1) never go stale.
+        fresh_ttl = ttl_ms / 1000 - self.stale_ttl if ttl_ms >= 0 else None
+        tier = "redis" if self.redis_available() else "disk"
+        payload = self._deserialize_payload(serialized_payload, tier=tier)
+
+        if fresh_ttl is not None and fresh_ttl <= 0:
+            payload["stale"] = True
+        elif self.local_cache is not None:
+            self.local_cache.set(
+                url_key, serialized_payload, fresh_ttl or self.default_expiry
+            )
+        return payload
+
+    def set_user_cache(
+        self, users: list[dict], scope: str = "", endpoint: str | None = None
+    ) -> None:
+        # one pipelined round trip for the whole page.
+        expiry = self.expiry_for(endpoint)
+        pipe = self.user_cache.pipeline(transaction=False)
+        for user in users:
+            if "user_id" in user:
+                pipe.set(
+                    self._user_id_string(user["user_id"], scope),
+                    self._serialize_payload(user),
+                    ex=expiry,
+                )
+        pipe.execute()
+
+    def get_user_cache(self, user_ids: list[int], scope: str = "") -> dict[int, dict]:
+        if not user_ids:
+            return {}
+        payloads = self.user_cache.mget(
+            [self._user_id_string(user_id, scope) for user_id in user_ids]
+        )
+        return {
+            user_id: decode_payload(payload)[0]
+            for user_id, payload in zip(user_ids, payloads)
+            if payload
+        }
+
+    def _connection(self, users: bool = False) -> Redis | DiskCache:
+        return self.user_cache if users else self.api_cache
+
+    def scan_keys(self, pattern: str = "*", users: bool = False) -> Iterator[str]:
+        """full api (or user) cache keys whose url matches a redis glob pattern."""
+        prefix = "userId:" if users else "api:"
+        for key in self._connection(users).scan_iter(
+            match=f"{prefix}{pattern}", count=500
+        ):
+            yield key.decode() if isinstance(key, bytes) else key
+
+    def describe_keys(self, keys: list[str], users: bool = False) -> list[dict]:
+        """size, TTL, age and format of each entry, without decoding the bodies."""
+        pipe = self._connection(users).pipeline(transaction=False)
+        for key in keys:
+            pipe.getrange(key, 0, HEADER_SIZE - 1)
+            pipe.strlen(key)
+            pipe.pttl(key)
+        results = pipe.execute()
+
+        now = time.time()
+        entries = []
+        for index, key in enumerate(keys):
+            header, size, ttl_ms = results[index * 3 : index * 3 + 3]
+            if ttl_ms == -2:
+                # expired between the scan and now.
+                continue
+            version, compressed, cached_at = read_header(header) or (0, False, None)
+            ttl = ttl_ms / 1000 if ttl_ms >= 0 else None
+            entries.append(
+                {
+                    "key": key,
+                    "size": size,
+                    "ttl": ttl,
+                    "age": now - cached_at if cached_at is not None else None,
+                    "cache_age": (
+                        self._get_cache_age(cached_at)
+                        if cached_at is not None
+                        else "N/A"
+                    ),
+                    # only responses have a stale window, users just expire.
+                    "stale": not users
+                    and ttl is not None
+                    and self.stale_ttl > 0
+                    and ttl <= self.stale_ttl,
+                    "version": version,
+                    "compressed": compressed,
+                }
+            )
+        return entries
+
+    def purge(self, pattern: str = "*", users: bool = False) -> int:
+        """deletes matching entries in batches, returns how many were removed."""
+        connection = self._connection(users)
+        deleted = 0
+        batch: list[str] = []
+        for key in self.scan_keys(pattern, users=users):
+            batch.append(key)
+            if len(batch) >= 500:
+                deleted += connection.delete(*batch)
+                batch = []
+        if batch:
+            deleted += connection.delete(*batch)
+
+        if self.local_cache is not None:
+            self.local_cache.clear()
+        return deleted
+
+    def server_stats(self) -> dict:
+        if not self.redis_available():
+            return {
+                "backend": "disk",
+                "path": self.fallback_path,
+                "keys db 0": self.api_cache.dbsize(),
+                "keys db 1": self.user_cache.dbsize(),
+            }
+
+        try:
+            info = self.api_cache.info()
+        except ResponseError:
+            # some hosted redis plans disable INFO.
+            info = {}
+        hits = info.get("keyspace_hits", 0)
+        misses = info.get("keyspace_misses", 0)
+        return {
+            "backend": f"redis {self._host}:{self._port}",
+            "keys db 0": self.api_cache.dbsize(),
+            "keys db 1": self.user_cache.dbsize(),
+            "memory": info.get("used_memory_human", "N/A"),
+            # server wide, counted since redis started.
+            "hit ratio": f"{hits / (hits + misses):.1%}" if hits + misses else "N/A",
+        }
+
+    def _serialize_payload(self, payload: dict) -> bytes:
+        return encode_payload(payload, compress_min_bytes=self.compress_min_bytes)
+
+    @classmethod
+    def _deserialize_payload(
+        cls, serialized_payload: bytes | str, tier: str = "redis"
+    ) -> dict:
+        payload, cached_at = decode_payload(serialized_payload)
+        age = cls._get_cache_age(cached_at) if cached_at is not None else "0s"
+        payload.update({"cached": True, "cache_age": age, "cache_tier": tier})
+        return payload
+
     @staticmethod
-    def _get_cache_age(cache_timestamp: str) -> str:
-        cache_time = datetime.fromisoformat(cache_timestamp)
+    def _get_cache_age(cached_at: float) -> str:
+        cache_time = datetime.fromtimestamp(cached_at)
         age = datetime.now() - cache_time
 
         if age.days > 0:
@@ -10,15 +10,30 @@ import click
     help="""disables caching,
               always fetches data from the source""",
 )
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="""appends every API response to a cassette file,
+              replay it offline with: python -m api.stub_api -c <file>""",
+)
 @click.pass_context
-def fetch(ctx, no_cache: bool):
+def fetch(ctx, no_cache: bool, record: str | None):
+    transport = None
+    if record:
+        from api.transport import RecordingTransport
 
+        transport = RecordingTransport(StackOverflowAPI.default_transport(), record)
+
+    config = ctx.obj["config"]
     if no_cache:
         click.secho("Cache disabled", fg="blue")
-        ctx.obj["config"].api.use_cache = False
-        ctx.obj["api"] = StackOverflowAPI(ctx.obj["config"].api)
-    else:
-        ctx.obj["api"] = StackOverflowAPI(ctx.obj["config"].api)
+    ctx.obj["api"] = StackOverflowAPI(
+        config.api,
+        transport=transport,
+        cache_config=config.redis,
+        use_cache=config.api.use_cache and not no_cache,
+    )
 
 
 @click.group()
@@ -32,7 +47,9 @@ def fetch(ctx, no_cache: bool):
 @click.pass_context
 def bookmark(ctx, database_url: str):
 
-    ctx.obj["api"] = StackOverflowAPI(ctx.obj["config"].api)
+    ctx.obj["api"] = StackOverflowAPI(
+        ctx.obj["config"].api, cache_config=ctx.obj["config"].redis
+    )
     try:
         from db.database import DatabaseManager
 
@@ -58,6 +75,20 @@ def sof_file(ctx):
         raise click.ClickException(f"File handler failed: {e}")
 
 
+@click.group()
+@click.pass_context
+def cache(ctx):
+    from caching.redis_client import RedisClient
+
+    config = ctx.obj["config"]
+    redis_client = RedisClient()
+    redis_client.configure(config.redis)
+    ctx.obj["cache"] = redis_client
+    # warm goes through the api so it keeps to the rate limit, on the same client.
+    ctx.obj["api"] = StackOverflowAPI(config.api, cache=redis_client)
+
+
 from cli.sub_commands.bookmark_commands import *
 from cli.sub_commands.fetch_commands import *
 from cli.sub_commands.sof_file_commands import *
+from cli.sub_commands.cache_commands import *
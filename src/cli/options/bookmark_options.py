@@ -93,3 +93,40 @@ def remove_options(func: Callable) -> Callable[..., Any]:
     ]
 
     return wrap_options(func=func, options=options)
+
+
+def sync_options(func: Callable) -> Callable[..., Any]:
+    options = [
+        click.option(
+            "--stale-after",
+            "-sa",
+            type=click.FloatRange(min=0),
+            default=24,
+            help="hours since the last refresh before a bookmark is synced, default: 24",
+            required=False,
+        ),
+        click.option(
+            "--limit",
+            "-l",
+            type=click.IntRange(min=1),
+            default=None,
+            help="max bookmarks to refresh this run, the next run picks up the rest",
+            required=False,
+        ),
+        click.option(
+            "--batch-size",
+            "-bs",
+            type=click.IntRange(min=1),
+            default=500,
+            help="bookmarks refreshed per database commit, default: 500",
+            required=False,
+        ),
+        click.option(
+            "--restart",
+            is_flag=True,
+            default=False,
+            help="ignore an unfinished sync and start from a new watermark",
+            required=False,
+        ),
+    ]
+    return wrap_options(func, options=options)
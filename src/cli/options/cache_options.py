@@ -0,0 +1,123 @@
+import click
+from typing import Any, Callable
+from cli.utility import wrap_options
+
+
+def warm_options(func: Callable) -> Callable[..., Any]:
+    options = [
+        click.option(
+            "--page",
+            "-p",
+            type=click.IntRange(1, 24),
+            help="first page to warm, default: config page",
+            required=False,
+        ),
+        click.option(
+            "--page-range",
+            "-pr",
+            type=click.IntRange(min=1),
+            default=1,
+            help="""Number of pages to warm, default: 1
+    example: --page 1 --page-range 5, warms pages 1 to 5""",
+            required=False,
+        ),
+        click.option(
+            "--pagesize",
+            "-ps",
+            type=int,
+            help="Number of users per page, default: config pagesize",
+            required=False,
+        ),
+        click.option(
+            "--workers",
+            "-w",
+            type=click.IntRange(1, 10),
+            default=1,
+            help="Number of pages to fetch concurrently, default: 1",
+            required=False,
+        ),
+        click.option(
+            "--filter",
+            type=str,
+            help="Filter to apply, default: config filter",
+            required=False,
+        ),
+        click.option(
+            "--order",
+            type=click.Choice(["asc", "desc"]),
+            help="Order to apply, default: config order",
+            required=False,
+        ),
+        click.option(
+            "--sort",
+            type=click.Choice(["creation", "reputation", "name"]),
+            help="Sort to apply, default: config sort",
+            required=False,
+        ),
+        click.option(
+            "--user-id",
+            "-id",
+            multiple=True,
+            type=int,
+            help="warm these user ids instead of pages",
+            required=False,
+        ),
+    ]
+    return wrap_options(func, options=options)
+
+
+def inspect_options(func: Callable) -> Callable[..., Any]:
+    options = [
+        click.option(
+            "--pattern",
+            type=str,
+            default="*",
+            help="""redis glob matched against the cached url, default: *
+    example: --pattern '*page=2*'""",
+            required=False,
+        ),
+        click.option(
+            "--users",
+            is_flag=True,
+            default=False,
+            help="inspect the per user cache instead of api responses",
+            required=False,
+        ),
+        click.option(
+            "--limit",
+            "-l",
+            type=click.IntRange(min=1),
+            default=20,
+            help="max entries to display, default: 20",
+            required=False,
+        ),
+    ]
+    return wrap_options(func, options=options)
+
+
+def purge_options(func: Callable) -> Callable[..., Any]:
+    options = [
+        click.option(
+            "--pattern",
+            type=str,
+            required=True,
+            help="""redis glob matched against the cached url, * purges everything
+    example: --pattern '*/users/*'""",
+        ),
+        click.option(
+            "--users",
+            is_flag=True,
+            default=False,
+            help="purge the per user cache instead of api responses",
+            required=False,
+        ),
+        click.option(
+            "--yes",
+            "-y",
+            is_flag=True,
+            default=False,
+            help="skip the confirmation prompt",
+            required=False,
+        ),
+    ]
+    return wrap_options(func, options=options)
@@ -66,6 +66,15 @@ def bulk_options(func: Callable) -> Callable[..., Any]:
     example: --page-range 5, will fetch 5 pages of users data, starting from page 1, useful for piping""",
             required=False,
         ),
+        click.option(
+            "--workers",
+            "-w",
+            type=click.IntRange(1, 10),
+            default=1,
+            help="""Number of pages to fetch concurrently when piping, default: 1
+    example: --page-range 10 --workers 4, pages are still piped in order""",
+            required=False,
+        ),
         click.option(
             "--filter",
             type=str,
@@ -6,7 +6,21 @@ from cli.utility import (
     get_users_from_pipe,
     user_pagination_prompt,
 )
-from db.dal.bookmark_dal import create_bookmarks, delete_bookmarks, delete_all_bookmarks
+from db.dal.bookmark_dal import (
+    create_bookmarks,
+    delete_bookmarks,
+    delete_all_bookmarks,
+    update_bookmarks,
+    get_stale_bookmark_ids,
+    touch_bookmarks,
+)
+from db.dal.sync_state_dal import (
+    get_sync_state,
+    start_sync_state,
+    complete_sync_state,
+)
+from db.database import DatabaseManager
+from datetime import datetime, timedelta
 from models.bookmark_model import Bookmark
 from models.sof_models import SOFUser
 from sqlalchemy.orm import Session
@@ -19,7 +33,12 @@ from ui.rich_builders import (
 )
 from api.stackoverflow_api import StackOverflowAPI
 from config.config_loader import APIConfig, byIDParams
-from cli.options.bookmark_options import add_options, view_options, remove_options
+from cli.options.bookmark_options import (
+    add_options,
+    view_options,
+    remove_options,
+    sync_options,
+)
 
 
 @view_options
@@ -163,6 +182,26 @@ def add(ctx, user_id: list[int]):
             )
 
 
+@sync_options
+@bookmark.command()
+@click.pass_context
+def sync(ctx, stale_after: float, limit: int | None, batch_size: int, restart: bool):
+    sof_api = ctx.obj.get("api")
+    api_config: APIConfig = ctx.obj.get("config").api
+    params = api_config.params
+
+    by_id_params = byIDParams(site=params.site, filter=params.filter)
+    sync_bookmarks_option(
+        ctx.obj["db_manager"],
+        sof_api=sof_api,
+        by_id_params=by_id_params,
+        stale_after=timedelta(hours=stale_after),
+        limit=limit,
+        batch_size=batch_size,
+        restart=restart,
+    )
+
+
 def create_bookmarks_option(
     db: Session,
     users: list[Bookmark] | None = None,
@@ -174,10 +213,8 @@ def create_bookmarks_option(
         if user_ids and not users:
             if sof_api and by_id_params:
                 user_api = sof_api.users
-                bookmarks = []
-                for user_id in user_ids:
-                    users_list, _ = user_api.get_user_by_id(user_id, by_id_params)
-                    bookmarks.extend([Bookmark(**user) for user in users_list])
+                users_list, _ = user_api.get_users_by_ids(user_ids, by_id_params)
+                bookmarks = [Bookmark(**user) for user in users_list]
                 try:
                     create_bookmarks(db, bookmark=bookmarks)
                 except ValueError as e:
@@ -206,3 +243,65 @@ def nuke_bookmarks_option(db: Session):
             click.secho("nuke launch aborted", fg="yellow")
     except ValueError as e:
         click.secho(f"{e}", err=True, color=True, fg="red")
+
+
+def sync_bookmarks_option(
+    db_manager: DatabaseManager,
+    sof_api: StackOverflowAPI,
+    by_id_params: byIDParams,
+    stale_after: timedelta,
+    limit: int | None = None,
+    batch_size: int = 500,
+    restart: bool = False,
+    sync_name: str = "bookmarks",
+):
+    # the watermark is the cutoff of the current sync, bookmarks refreshed after it
+    # are done. an unfinished sync keeps its cutoff so the next run resumes it.
+    with db_manager.get_session() as db:
+        state = get_sync_state(db, sync_name)
+        if restart or state is None or state.completed:
+            state = start_sync_state(db, sync_name, datetime.now() - stale_after)
+        else:
+            click.secho(f"Resuming sync from {state.cutoff:%Y-%m-%d %H:%M}", fg="blue")
+
+        user_ids = get_stale_bookmark_ids(db, cutoff=state.cutoff, limit=limit)
+
+    refreshed = 0
+    missing = 0
+    # each batch is committed on its own, so an interrupted run loses at most one.
+    for start in range(0, len(user_ids), batch_size):
+        batch_ids = user_ids[start : start + batch_size]
+        users, meta = sof_api.users.get_users_by_ids(batch_ids, by_id_params)
+
+        bookmarks = [Bookmark(**user) for user in users]
+        missing_ids = list(
+            set(batch_ids) - {bookmark.user_id for bookmark in bookmarks}
+        )
+
+        with db_manager.get_session() as db:
+            if bookmarks:
+                update_bookmarks(bookmarks, db)
+            # users the API no longer returns are marked as checked for this sync.
+            touch_bookmarks(db, missing_ids)
+
+        refreshed += len(bookmarks)
+        missing += len(missing_ids)
+        click.secho(
+            f"{start + len(batch_ids)}/{len(user_ids)} bookmarks synced"
+            f" | quota remaining: {meta.get('quota_remaining', 'N/A')}",
+            fg="blue",
+        )
+
+    with db_manager.get_session() as db:
+        if not get_stale_bookmark_ids(db, cutoff=state.cutoff, limit=1):
+            complete_sync_state(db, sync_name)
+            click.secho(
+                f"Sync complete, {refreshed} bookmarks refreshed, {missing} not found",
+                fg="green",
+            )
+        else:
+            click.secho(
+                f"{refreshed} bookmarks refreshed, {missing} not found,"
+                " run sync again to continue",
+                fg="yellow",
+            )
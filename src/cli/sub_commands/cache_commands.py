@@ -0,0 +1,185 @@
+import click
+from cli.commands import cache
+from ui.rich_builders import (
+    build_rich_table,
+    add_rich_row,
+    add_rich_panel,
+    build_rich_view,
+)
+from api.stackoverflow_api import StackOverflowAPI
+from caching.redis_client import RedisClient
+from config.config_loader import APIConfig, APIParams, byIDParams
+from cli.options.cache_options import warm_options, inspect_options, purge_options
+
+# upper bound in seconds and label of each age bucket in cache stats.
+_AGE_BUCKETS = [
+    (60, "< 1m"),
+    (5 * 60, "1m - 5m"),
+    (15 * 60, "5m - 15m"),
+    (60 * 60, "15m - 1h"),
+    (float("inf"), ">= 1h"),
+]
+
+
+@warm_options
+@cache.command()
+@click.pass_context
+def warm(ctx, user_id: tuple[int], page_range: int, workers: int, **kwargs):
+    sof_api: StackOverflowAPI = ctx.obj.get("api")
+    api_config: APIConfig = ctx.obj.get("config").api
+
+    # same params as fetch users-bulk, so the warmed keys are the ones it reads.
+    user_options = {
+        key: val
+        for key, val in kwargs.items()
+        if key in APIParams.model_fields.keys() and val is not None
+    }
+    params = APIParams.model_validate(
+        {**api_config.params.model_dump(), **user_options}
+    )
+
+    if user_id:
+        by_id_params = byIDParams(site=params.site, filter=params.filter)
+        warm_users_option(sof_api, list(user_id), by_id_params)
+    else:
+        pages = range(params.page, params.page + page_range)
+        warm_pages_option(sof_api, params, pages, workers)
+
+
+@cache.command()
+@click.pass_context
+def stats(ctx):
+    cache_client: RedisClient = ctx.obj.get("cache")
+
+    server_stats = cache_client.server_stats()
+    entries = describe_cache_option(cache_client, "*")
+
+    buckets = {label: {"entries": 0, "bytes": 0} for _, label in _AGE_BUCKETS}
+    unknown_age = 0
+    for entry in entries:
+        if entry["age"] is None:
+            unknown_age += 1
+            continue
+        label = next(label for limit, label in _AGE_BUCKETS if entry["age"] < limit)
+        buckets[label]["entries"] += 1
+        buckets[label]["bytes"] += entry["size"]
+
+    summary = {
+        "entries": len(entries),
+        "bytes": sum(entry["size"] for entry in entries),
+        "stale": sum(entry["stale"] for entry in entries),
+        "compressed": sum(entry["compressed"] for entry in entries),
+        "unknown age": unknown_age,
+    }
+
+    view = [
+        add_rich_panel(panel_data=server_stats, title="Backend"),
+        add_rich_panel(panel_data=summary, title="API Responses"),
+    ]
+    if entries:
+        columns = ("age", "entries", "bytes")
+        table = build_rich_table(
+            table_title="Age Distribution", display_columns=columns
+        )
+        add_rich_row(
+            table=table,
+            table_data=[{"age": label, **val} for label, val in buckets.items()],
+            display_columns=list(columns),
+        )
+        view.insert(0, table)
+    build_rich_view(view)
+
+
+@inspect_options
+@cache.command()
+@click.pass_context
+def inspect(ctx, pattern: str, users: bool, limit: int):
+    cache_client: RedisClient = ctx.obj.get("cache")
+
+    entries = describe_cache_option(cache_client, pattern, users=users, limit=limit)
+    if not entries:
+        click.secho(f"No cache entries match {pattern}", err=True, fg="yellow")
+        return
+
+    columns = ("key", "size", "ttl", "cache_age", "stale", "compressed")
+    for entry in entries:
+        entry["ttl"] = f"{entry['ttl']:.0f}s" if entry["ttl"] is not None else "none"
+
+    table = build_rich_table(table_title="Cache Entries", display_columns=columns)
+    add_rich_row(table=table, table_data=entries, display_columns=list(columns))
+    build_rich_view(
+        [
+            table,
+            add_rich_panel(
+                panel_data={"pattern": pattern, "shown": len(entries)}, title="Query"
+            ),
+        ]
+    )
+
+
+@purge_options
+@cache.command()
+@click.pass_context
+def purge(ctx, pattern: str, users: bool, yes: bool):
+    cache_client: RedisClient = ctx.obj.get("cache")
+    purge_cache_option(cache_client, pattern, users=users, confirm=not yes)
+
+
+def warm_pages_option(
+    sof_api: StackOverflowAPI, params: APIParams, pages: range, workers: int = 1
+):
+    fetched_pages = sof_api.users.get_users_pages(params, pages, workers=workers)
+
+    fetched = sum(1 for _, meta in fetched_pages if not meta.get("cached"))
+    click.secho(
+        f"{len(fetched_pages)} pages warmed, {fetched} fetched from the API,"
+        f" {len(fetched_pages) - fetched} already cached",
+        fg="green",
+    )
+
+
+def warm_users_option(
+    sof_api: StackOverflowAPI, user_ids: list[int], by_id_params: byIDParams
+):
+    users, meta = sof_api.users.get_users_by_ids(user_ids, by_id_params)
+
+    click.secho(
+        f"{len(users)}/{len(set(user_ids))} users warmed,"
+        f" {meta.get('entity_cache_hits', 0)} already cached,"
+        f" {meta.get('requests', 0)} API requests",
+        fg="green",
+    )
+
+
+def describe_cache_option(
+    cache_client: RedisClient,
+    pattern: str,
+    users: bool = False,
+    limit: int | None = None,
+    batch_size: int = 500,
+) -> list[dict]:
+    entries: list[dict] = []
+    batch: list[str] = []
+
+    for key in cache_client.scan_keys(pattern, users=users):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            entries.extend(cache_client.describe_keys(batch, users=users))
+            batch = []
+        if limit is not None and len(entries) + len(batch) >= limit:
+            break
+    if batch:
+        entries.extend(cache_client.describe_keys(batch, users=users))
+
+    return entries[:limit] if limit is not None else entries
+
+
+def purge_cache_option(
+    cache_client: RedisClient, pattern: str, users: bool = False, confirm: bool = True
+):
+    target = "user" if users else "api"
+    if confirm:
+        click.confirm(f"Purge {target} cache entries matching {pattern}?", abort=True)
+
+    deleted = cache_client.purge(pattern, users=users)
+    click.secho(f"{deleted} {target} cache entries purged", fg="green")
@@ -4,6 +4,7 @@ from cli.utility import (
     is_piped_out,
     create_pipe_data,
     serialize_to_stdout,
+    stream_to_stdout,
     user_pagination_prompt,
 )
 from ui.rich_builders import (
@@ -32,10 +33,7 @@ def users_by_id(ctx, user_id: list[int], **kwargs):
 
     by_id_params = byIDParams(site=params.site, filter=params.filter)
     user_api = sof_api.users
-    users = []
-    for id in user_id:
-        users_list, _ = user_api.get_user_by_id(id, by_id_params)
-        users.extend([user for user in users_list])
+    users, _ = user_api.get_users_by_ids(user_id, by_id_params)
 
     if not is_piped_out():
         unordered_columns: set = set(kwargs.get("display_columns"))
@@ -120,12 +118,25 @@ def users_bulk(ctx, **kwargs):
             api_config.params.page = user_input
 
     if is_piped_out():
-        all_users = []
+        api_config.params.page = 1
+        page_range = kwargs.get("page_range")
+        workers = kwargs.get("workers", 1)
 
-        for page in range(1, kwargs.get("page_range") + 1):
-            api_config.params.page = page
-            users, _ = api.get_users(api_config.params)
-            all_users.extend(users)
+        if workers > 1:
+            all_users = []
 
-        pipe_data = {"users": all_users, "meta": api_config.params.model_dump()}
-        serialize_to_stdout(create_pipe_data("fetch", pipe_data))
+            fetched_pages = api.get_users_pages(
+                api_config.params, range(1, page_range + 1), workers=workers
+            )
+            for users, _ in fetched_pages:
+                all_users.extend(users)
+
+            pipe_data = {"users": all_users, "meta": api_config.params.model_dump()}
+            serialize_to_stdout(create_pipe_data("fetch", pipe_data))
+        else:
+            # stream users downstream as each page arrives.
+            stream_to_stdout(
+                "fetch",
+                api.iter_users(api_config.params, max_pages=page_range),
+                api_config.params.model_dump(),
+            )
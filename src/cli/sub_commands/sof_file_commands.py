@@ -1,13 +1,13 @@
 import click
+from datetime import datetime
+from typing import Iterator
 from cli.commands import sof_file
 from cli.utility import (
     is_piped_in,
     is_piped_out,
-    create_pipe_data,
-    get_users_from_pipe,
+    iter_users_from_stdin,
     user_pagination_prompt,
-    deserialize_from_stdin,
-    serialize_to_stdout,
+    stream_to_stdout,
 )
 from cli.options.sof_file_options import soffile_options
 from ui.rich_builders import (
@@ -18,26 +18,47 @@ from ui.rich_builders import (
 )
 from models.sof_models import SOFUser, SOFFile
 from handlers.sof_filehandler import SOFFileHandler
+from handlers.sof_query import parse_predicate
+from handlers.sof_columnar import COLUMNS
 from pydantic import ValidationError
 
 
+@click.option(
+    "--append",
+    "-a",
+    is_flag=True,
+    default=False,
+    help="append the users to the file instead of replacing it, text files only,"
+    " compressed ones are rewritten whole",
+    required=False,
+)
+@click.option(
+    "--binary",
+    "-b",
+    is_flag=True,
+    default=False,
+    help="write the binary columnar format, faster to load and index by user id",
+    required=False,
+)
 @soffile_options
 @sof_file.command()
 @click.pass_context
-def save(ctx, path: str | None):
+def save(ctx, path: str | None, append: bool, binary: bool):
     file_handler: SOFFileHandler = ctx.obj["sof_handler"]
 
     if not is_piped_in():
         raise click.UsageError("No data piped in, pipe data from fetch command")
 
-    sof_users, meta = get_users_from_pipe("fetch", deserialize_from_stdin())
-
-    file_handler.save(sof_users, meta, path)
+    # users are written as they come off the pipe, meta follows the last one.
+    meta: dict = {}
+    sof_users = map(SOFUser.model_validate, iter_users_from_stdin("fetch", meta))
 
-    click.secho(
-        f"Saved {len(sof_users)} users to {file_handler.resolved_path}", fg="green"
+    saved = file_handler.save(
+        sof_users, meta, path, mode="a" if append else "w", binary=binary
     )
 
+    click.secho(f"Saved {saved} users to {file_handler.resolved_path}", fg="green")
+
 
 @click.option(
     "--display-columns",
@@ -62,45 +83,310 @@ def save(ctx, path: str | None):
         profile_image""",
     required=False,
 )
+@click.option(
+    "--user-id",
+    "-id",
+    multiple=True,
+    type=int,
+    help="only load these user ids, binary files look them up in their index",
+    required=False,
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    help="processes parsing a text file, default: every core for files over 64 MiB",
+    required=False,
+)
 @soffile_options
 @sof_file.command()
 @click.pass_context
-def load(ctx, path: str | None, display_columns: list[str] | None) -> None:
+def load(
+    ctx,
+    path: str | None,
+    display_columns: list[str] | None,
+    user_id: tuple[int],
+    jobs: int | None,
+) -> None:
 
     file_handler: SOFFileHandler = ctx.obj["sof_handler"]
-    sof_file = file_handler.load(path)
+    sof_meta = file_handler.read_meta(path)
+    user_ids = list(user_id) or None
+
+    if is_piped_out():
+        # stream user by user, memory stays flat whatever the file size.
+        stream_to_stdout(
+            "sof_file",
+            file_handler.iter_rows(sof_meta["file_path"], user_ids=user_ids, jobs=jobs),
+            sof_meta,
+            flush_every=1000,
+        )
+        return
+
+    unordered_columns: set = set(display_columns)  # type: ignore
+    if not unordered_columns.issubset(SOFUser.model_fields.keys()):
+        raise ValueError(
+            f"Invalid column name, must be one of {SOFUser.model_fields.keys()}"
+        )
+    ordered_columns: tuple[str] = display_columns  # type: ignore
 
+    # only the displayed columns are read from binary files.
     try:
-        sof_users: list[SOFUser] = sof_file.users
-        sof_meta: dict = sof_file.meta
+        sof_users: list[dict] = list(
+            file_handler.iter_rows(
+                sof_meta["file_path"],
+                columns=ordered_columns,
+                user_ids=user_ids,
+                jobs=jobs,
+            )
+        )
     except ValidationError as e:
         raise click.ClickException(f"Deserialization failed: {e}")
 
     if not sof_users:
         raise ValueError("No users found in file")
 
-    if not is_piped_out():
-        unordered_columns: set = set(display_columns)  # type: ignore
-        if not unordered_columns.issubset(SOFUser.model_fields.keys()):
-            raise ValueError(
-                f"Invalid column name, must be one of {SOFUser.model_fields.keys()}"
-            )
-        ordered_columns: tuple[str] = display_columns  # type: ignore
+    table = build_rich_table(table_title="SOF File", display_columns=ordered_columns)
+
+    panel = add_rich_panel(sof_meta, "SOF File Meta")
+
+    add_rich_row(
+        table=table,
+        table_data=sof_users,
+        display_columns=ordered_columns,
+    )
+    build_rich_view([table, panel])
 
-        table = build_rich_table(
-            table_title="SOF File", display_columns=ordered_columns
+
+@click.option(
+    "--user-id",
+    "-id",
+    type=int,
+    help="only list the files holding this user id",
+    required=False,
+)
+@click.option(
+    "--rebuild",
+    is_flag=True,
+    default=False,
+    help="re-index the data folder first, picks up files saved before the catalog",
+    required=False,
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    default=False,
+    help="re-index by checksum, reads every file, catches what size and mtime miss",
+    required=False,
+)
+@sof_file.command()
+@click.pass_context
+def catalog(ctx, user_id: int | None, rebuild: bool, verify: bool) -> None:
+    file_handler: SOFFileHandler = ctx.obj["sof_handler"]
+
+    if rebuild or verify:
+        indexed = file_handler.rebuild_catalog(verify=verify)
+        click.secho(f"{indexed} files indexed", err=True, fg="green")
+
+    if user_id is not None:
+        entries = file_handler.find_files(user_id)
+    else:
+        entries = file_handler.catalog.entries()
+
+    if not entries:
+        click.secho("No catalogued files found", err=True, fg="yellow")
+        return
+
+    for entry in entries:
+        entry["created_at"] = datetime.fromtimestamp(entry["created_at"]).strftime(
+            "%Y-%m-%d %H:%M:%S"
         )
+        # only verified files have one.
+        entry["checksum"] = (entry["checksum"] or "-")[:12]
+
+    columns = (
+        "name",
+        "created_at",
+        "users",
+        "pages",
+        "min_user_id",
+        "max_user_id",
+        "format",
+        "checksum",
+    )
+    table = build_rich_table(table_title="SOF Catalog", display_columns=columns)
+    add_rich_row(table=table, table_data=entries, display_columns=list(columns))
+    build_rich_view(
+        [
+            table,
+            add_rich_panel(
+                {
+                    "folder": str(file_handler.default_data_folder),
+                    "files": len(entries),
+                },
+                "Data Folder",
+            ),
+        ]
+    )
+
+
+@click.argument("inputs", nargs=-1, required=True)
+@click.option(
+    "--policy",
+    type=click.Choice(["newest", "last", "first"]),
+    default="newest",
+    help="""user kept when a user_id appears more than once, default: newest
+    newest: latest last_access_date
+    last: later input file
+    first: earlier input file""",
+    required=False,
+)
+@click.option(
+    "--run-size",
+    type=click.IntRange(min=1),
+    default=100_000,
+    help="users sorted in memory before spilling to a temp file, default: 100000",
+    required=False,
+)
+@click.option(
+    "--binary",
+    "-b",
+    is_flag=True,
+    default=False,
+    help="write the binary columnar format",
+    required=False,
+)
+@soffile_options
+@sof_file.command()
+@click.pass_context
+def merge(
+    ctx,
+    inputs: tuple[str],
+    path: str | None,
+    policy: str,
+    run_size: int,
+    binary: bool,
+) -> None:
+    file_handler: SOFFileHandler = ctx.obj["sof_handler"]
+
+    merge_stats = file_handler.merge(
+        list(inputs), path, policy=policy, run_size=run_size, binary=binary
+    )
+    click.secho(
+        f"Merged {merge_stats['users read']} users from {merge_stats['inputs']} files"
+        f" into {merge_stats['users written']} users"
+        f" ({merge_stats['duplicates']} duplicates dropped)"
+        f" at {file_handler.resolved_path}",
+        fg="green",
+    )
 
-        panel = add_rich_panel(sof_meta, "SOF File Meta")
 
-        add_rich_row(
-            table=table,
-            table_data=[user.model_dump() for user in sof_users],
-            display_columns=ordered_columns,
+@click.option(
+    "--where",
+    "-w",
+    multiple=True,
+    help="""filter as column op value, repeat to require several:
+    usage: -w "reputation>10000" -w "location~germany"
+
+    operators: = != > >= < <= and ~ (contains, case insensitive)
+    null matches missing values: -w "location!=null\"""",
+    required=False,
+)
+@click.option(
+    "--sort-by",
+    "-s",
+    type=click.Choice(COLUMNS),
+    metavar="COLUMN",
+    help="column to sort by, file order when not given",
+    required=False,
+)
+@click.option(
+    "--desc",
+    is_flag=True,
+    default=False,
+    help="sort from the highest value down",
+    required=False,
+)
+@click.option(
+    "--limit",
+    "-n",
+    type=click.IntRange(min=0),
+    help="at most this many users, with --sort-by only the top n are kept",
+    required=False,
+)
+@click.option(
+    "--display-columns",
+    "-dc",
+    multiple=True,
+    type=click.Choice(COLUMNS),
+    metavar="COLUMN",
+    default=["display_name", "user_id", "reputation", "last_access_date"],
+    help="columns to display, every column is piped out",
+    required=False,
+)
+@soffile_options
+@sof_file.command()
+@click.pass_context
+def query(
+    ctx,
+    path: str | None,
+    where: tuple[str],
+    sort_by: str | None,
+    desc: bool,
+    limit: int | None,
+    display_columns: tuple[str],
+) -> None:
+    file_handler: SOFFileHandler = ctx.obj["sof_handler"]
+    sof_meta = file_handler.read_meta(path)
+
+    try:
+        predicates = [parse_predicate(expression) for expression in where]
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--where'")
+
+    if is_piped_out():
+        matched = 0
+
+        def counted(rows: Iterator[dict]) -> Iterator[dict]:
+            nonlocal matched
+            for matched, row in enumerate(rows, start=1):
+                yield row
+            # meta is written after the users, so it can carry the match count.
+            sof_meta["total_users_fetched"] = matched
+
+        stream_to_stdout(
+            "sof_file",
+            counted(
+                file_handler.query(
+                    sof_meta["file_path"],
+                    where=predicates,
+                    order_by=sort_by,
+                    descending=desc,
+                    limit=limit,
+                )
+            ),
+            sof_meta,
+            flush_every=1000,
         )
-        build_rich_view([table, panel])
-    else:
-        all_users = [user.model_dump() for user in sof_users]
+        return
+
+    sof_users = list(
+        file_handler.query(
+            sof_meta["file_path"],
+            where=predicates,
+            columns=display_columns,
+            order_by=sort_by,
+            descending=desc,
+            limit=limit,
+        )
+    )
+    if not sof_users:
+        click.secho("No users match the query", err=True, fg="yellow")
+        return
 
-        pipe_data = {"users": all_users, "meta": sof_meta}
-        serialize_to_stdout(create_pipe_data("sof_file", pipe_data))
+    table = build_rich_table(table_title="SOF Query", display_columns=display_columns)
+    add_rich_row(
+        table=table, table_data=sof_users, display_columns=list(display_columns)
+    )
+    panel = add_rich_panel({**sof_meta, "matched": len(sof_users)}, "SOF File Meta")
+    build_rich_view([table, panel])
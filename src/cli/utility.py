@@ -1,15 +1,17 @@
+import json
 import os
+import re
 import sys
-import json
 from rich.console import Console, Group
 from rich.panel import Panel
 from rich.table import Table
-from typing import Any, Callable
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
 import codecs
 import click
 import readchar
 from time import sleep
 from models.sof_models import SOFUser
+from codec.json_codec import codec
 import stat
 
 
@@ -29,22 +31,173 @@ def create_pipe_data(source, data) -> dict[str, Any]:
 
 def serialize_to_stdout(pipe_data: dict[str, Any]) -> None:
     try:
-        sys.stdout.reconfigure(encoding="utf-8", errors="strict")  # type: ignore
-        json.dump(pipe_data, sys.stdout, ensure_ascii=False)
+        # write encoded bytes straight to the buffer, codec output is utf-8.
         sys.stdout.flush()
+        sys.stdout.buffer.write(codec.dumps(pipe_data))
+        sys.stdout.buffer.flush()
     except Exception as e:
         raise e
 
 
+def stream_to_stdout(
+    source: str,
+    users: Iterable[dict[str, Any]],
+    meta: dict[str, Any],
+    flush_every: int = 1,
+) -> None:
+    """writes the same payload as serialize_to_stdout, one user at a time."""
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+    out.write(b'{"source":' + codec.dumps(source) + b',"data":{"users":[')
+
+    for index, user in enumerate(users):
+        if index:
+            out.write(b",")
+        out.write(codec.dumps(user))
+        # let the downstream command start reading as soon as a page lands.
+        if (index + 1) % flush_every == 0:
+            out.flush()
+
+    out.write(b'],"meta":' + codec.dumps(meta) + b"}}")
+    out.flush()
+
+
 def deserialize_from_stdin() -> dict[str, Any]:
     try:
+        payload = sys.stdin.buffer.read()
         # without this BOM character breaks the json load...
-        reader = codecs.getreader("utf-8-sig")(sys.stdin.buffer)
-        return json.load(reader)
+        if payload.startswith(codecs.BOM_UTF8):
+            payload = payload[len(codecs.BOM_UTF8) :]
+        return codec.loads(payload)
     except Exception as e:
         raise e
 
 
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class _PipeReader:
+    """reads json values off a byte stream one at a time, as the bytes arrive."""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        # utf-8-sig drops the BOM powershell puts in front of piped text.
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._text = ""
+        self._at = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        # read1 returns whatever is buffered, no waiting for a full chunk.
+        chunk = self._stream.read1(self._chunk_size)  # type: ignore[attr-defined]
+        self._eof = not chunk
+        self._text = self._text[self._at :] + self._decoder.decode(
+            chunk, final=self._eof
+        )
+        self._at = 0
+        return True
+
+    def peek(self) -> str:
+        """next character that is not whitespace, "" at the end of the stream."""
+        while True:
+            self._at = _WHITESPACE.match(self._text, self._at).end()  # type: ignore
+            if self._at < len(self._text):
+                return self._text[self._at]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError("Invalid pipe data")
+        self._at += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._text, self._at)
+            except json.JSONDecodeError:
+                end = None
+            # a value running up to the end of the buffer, e.g. a number, may go on.
+            if end is not None and (end < len(self._text) or self._eof):
+                self._at = end
+                return value
+            if not self._fill():
+                raise ValueError("Invalid pipe data")
+
+    def keys(self) -> Iterator[str]:
+        """keys of the object at the cursor, the caller reads each value."""
+        self.expect("{")
+        closing = "}"
+        while self.peek() != closing:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Invalid pipe data")
+            self.expect(":")
+            yield key
+            if self.peek() != closing:
+                self.expect(",")
+        self._at += 1
+
+    def items(self) -> Iterator[Any]:
+        self.expect("[")
+        while self.peek() != "]":
+            yield self.value()
+            if self.peek() != "]":
+                self.expect(",")
+        self._at += 1
+
+
+def iter_users_from_stdin(
+    source: str,
+    meta: dict[str, Any],
+    stream: BinaryIO | None = None,
+    chunk_size: int = 1 << 16,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yields the users of a piped payload as they are read, memory stays flat.
+
+    Reads what serialize_to_stdout and stream_to_stdout write, "source" comes
+    before "data" and its users before its meta, a live fetch is saved page by
+    page while it runs.
+
+    Args:
+        source (str): command the payload must come from, e.g. "fetch".
+        meta (dict[str, Any]): updated with the payload meta, which follows the
+        users, so it is filled in once the last user is yielded.
+        stream (BinaryIO | None): where the payload is read from, stdin when None.
+        chunk_size (int): most bytes read at once.
+
+    errors:
+        ValueError: if the payload is malformed or comes from another source.
+    """
+    reader = _PipeReader(stream or sys.stdin.buffer, chunk_size)
+    pipe_source = None
+
+    for key in reader.keys():
+        if key == "source":
+            pipe_source = reader.value()
+        elif key == "data" and pipe_source == source:
+            for data_key in reader.keys():
+                if data_key == "users":
+                    yield from reader.items()
+                elif data_key == "meta":
+                    meta.update(reader.value() or {})
+                else:
+                    reader.value()
+        elif key == "data":
+            raise ValueError("Invalid or empty pipe data")
+        else:
+            reader.value()
+
+    if pipe_source != source or reader.peek():
+        raise ValueError("Invalid or empty pipe data")
+
+
 def user_pagination_prompt(
     page: int, max_depth: int | None = None, input_delay: float = 0.1
 ) -> int:
@@ -0,0 +1,68 @@
+import json
+from os import getenv
+from typing import Any, Protocol
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is the fallback.
+    orjson = None
+
+
+class JSONCodec(Protocol):
+    name: str
+
+    def dumps(self, obj: Any) -> bytes: ...
+
+    def loads(self, data: bytes | str) -> Any: ...
+
+
+class StdlibCodec:
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)  # type: ignore[union-attr]
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)  # type: ignore[union-attr]
+
+
+_CODECS: dict[str, type] = {"json": StdlibCodec, "orjson": OrjsonCodec}
+
+
+def get_codec(name: str | None = None) -> JSONCodec:
+    """
+    Picks the json codec used for api responses, cache payloads and pipes.
+
+    Args:
+        name (str | None): "json" or "orjson", defaults to the SOF_JSON_CODEC env
+        variable, then orjson when it is installed.
+
+    Returns:
+        JSONCodec: codec with dumps() -> bytes and loads(bytes | str).
+
+    errors:
+        ValueError: if the codec is unknown or orjson is requested but missing.
+    """
+    name = name or getenv("SOF_JSON_CODEC") or ("orjson" if orjson else "json")
+
+    if name not in _CODECS:
+        raise ValueError(f"Unknown json codec: {name}, must be one of {list(_CODECS)}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("orjson codec requested but orjson is not installed")
+
+    return _CODECS[name]()
+
+
+codec = get_codec()
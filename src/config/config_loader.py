@@ -17,14 +17,48 @@ class byIDParams(BaseModel):
     site: str
 
 
+class RetryConfig(BaseModel):
+    # retries for connection errors and 5xx, throttle violations are counted apart.
+    max_retries: int = Field(3, ge=0)
+    base_delay: float = Field(0.5, gt=0)
+    max_delay: float = Field(30, gt=0)
+    max_throttle_retries: int = Field(5, ge=0)
+    # consecutive transient failures before failing fast, and for how long.
+    breaker_threshold: int = Field(5, ge=1)
+    breaker_reset: float = Field(30, gt=0)
+
+
 class APIConfig(BaseModel):
     params: APIParams
     use_cache: bool
+    # shared across processes through redis, the API drops anything above 30/s.
+    requests_per_second: float = Field(25, gt=0, le=30)
+    # None means api.stackexchange.com, point it at api.stub_api for offline runs.
+    base_url: str | None = None
+    retry: RetryConfig = Field(default_factory=RetryConfig)
+
+
+class LocalCacheConfig(BaseModel):
+    # in-process LRU in front of redis, entries share the redis TTL.
+    enabled: bool = True
+    max_entries: int = Field(256, ge=1)
+    max_bytes: int = Field(16 * 1024 * 1024, ge=1)
 
 
 class RedisConfig(BaseModel):
     decode_responses: bool
-    cache_expire: int
+    cache_expire: int = Field(..., ge=1)
+    # per endpoint TTLs, the longest matching prefix wins over cache_expire.
+    endpoint_expire: dict[str, int] = Field(default_factory=dict)
+    # cache payloads at least this large are zlib compressed, null disables it.
+    compress_min_bytes: int | None = Field(1024, ge=0)
+    # seconds past the TTL an entry is still served while it is refreshed in the
+    # background, 0 turns stale-while-revalidate off.
+    stale_while_revalidate: int = Field(0, ge=0)
+    # sqlite cache used when redis is unreachable, null keeps it in memory. relative
+    # paths are resolved against the project root, like sof_handler.default_path.
+    fallback_path: str | None = "./data/cache.sqlite3"
+    local_cache: LocalCacheConfig = Field(default_factory=LocalCacheConfig)
 
 
 class SOFConfig(BaseModel):
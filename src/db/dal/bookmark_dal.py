@@ -1,8 +1,9 @@
 from db.models.models import BookmarkORM
 from models.bookmark_model import Bookmark, BookmarkDB
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete, update, insert
+from sqlalchemy import select, delete, update, insert, or_
 from typing import List, Tuple
+from datetime import datetime
 from click import secho, confirm
 
 
@@ -95,8 +96,38 @@ def delete_all_bookmarks(session: Session):
 def update_bookmarks(bookmarks: List[Bookmark], session: Session) -> int:
     if not bookmarks:
         raise ValueError("No bookmark data provided")
-    affected_rows = session.execute(
-        update(BookmarkORM), [bookmark.model_dump() for bookmark in bookmarks]
+    # created_at belongs to the original bookmark, never overwrite it on update.
+    # bulk update by primary key does not report a rowcount, one row per bookmark.
+    session.execute(
+        update(BookmarkORM),
+        [bookmark.model_dump(exclude={"created_at"}) for bookmark in bookmarks],
     )
 
-    return affected_rows.rowcount
+    return len(bookmarks)
+
+
+def get_stale_bookmark_ids(
+    session: Session, cutoff: datetime, limit: int | None = None
+) -> list[int]:
+    # recently active users are the most likely to have changed, refresh them first.
+    query = (
+        select(BookmarkORM.user_id)
+        .filter(or_(BookmarkORM.updated_at.is_(None), BookmarkORM.updated_at < cutoff))
+        .order_by(
+            BookmarkORM.last_access_date.desc().nulls_last(),
+            BookmarkORM.updated_at.asc().nulls_first(),
+        )
+        .limit(limit)
+    )
+    return list(session.scalars(query).all())
+
+
+def touch_bookmarks(session: Session, user_ids: List[int]) -> int:
+    if not user_ids:
+        return 0
+    touch_query = (
+        update(BookmarkORM)
+        .where(BookmarkORM.user_id.in_(user_ids))
+        .values(updated_at=datetime.now())
+    )
+    return session.execute(touch_query).rowcount
@@ -0,0 +1,32 @@
+from db.models.models import SyncStateORM
+from models.sync_state_model import SyncState
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+
+def get_sync_state(session: Session, name: str) -> SyncState | None:
+    state = session.get(SyncStateORM, name)
+    if state:
+        return SyncState.model_validate(state)
+    return None
+
+
+def start_sync_state(session: Session, name: str, cutoff: datetime) -> SyncState:
+    state = session.get(SyncStateORM, name)
+    if state is None:
+        state = SyncStateORM(name=name)
+        session.add(state)
+
+    state.cutoff = cutoff  # type: ignore
+    state.completed = False  # type: ignore
+    session.flush()
+    return SyncState.model_validate(state)
+
+
+def complete_sync_state(session: Session, name: str) -> None:
+    state = session.get(SyncStateORM, name)
+    if state is None:
+        raise ValueError(f"No sync state found for {name}")
+
+    state.completed = True  # type: ignore
+    state.last_completed_at = datetime.now()  # type: ignore
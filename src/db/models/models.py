@@ -1,5 +1,6 @@
 from db.database import DatabaseManager
 from db.models.bookmarks_model import BookmarkORM
+from db.models.sync_state_model import SyncStateORM
 
 engine = DatabaseManager().engine
 
@@ -0,0 +1,15 @@
+from db.models import Base
+from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy.sql import func
+
+
+class SyncStateORM(Base):
+    # one row per sync job, holds the watermark the next run resumes from.
+    __tablename__ = "sync_state"
+
+    name = Column(String, primary_key=True)
+    cutoff = Column(DateTime, nullable=False)
+    completed = Column(Boolean, default=False)
+    last_completed_at = Column(DateTime, nullable=True)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
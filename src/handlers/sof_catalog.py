@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+CATALOG_NAME = ".sofcatalog.sqlite3"
+_FIELDS = (
+    "name",
+    "created_at",
+    "users",
+    "pages",
+    "min_user_id",
+    "max_user_id",
+    "size",
+    "mtime",
+    "checksum",
+    "format",
+)
+_CREATE_FILES = (
+    "CREATE TABLE IF NOT EXISTS files ("
+    " name TEXT PRIMARY KEY,"
+    " created_at REAL NOT NULL,"
+    " users INTEGER NOT NULL,"
+    " pages INTEGER NOT NULL,"
+    " min_user_id INTEGER,"
+    " max_user_id INTEGER,"
+    " size INTEGER,"
+    " mtime REAL,"
+    " checksum TEXT,"
+    " format TEXT NOT NULL)"
+)
+
+
+class SOFCatalog:
+    """
+    Index of the .sofusers files in a data folder.
+
+    Kept in a SQLite file inside the folder and updated by every save, so finding
+    the latest file or the files that may hold a user is an index lookup instead
+    of a directory scan. Files are stored by name, relative to the folder, so the
+    catalog stays valid when the folder is mounted elsewhere.
+
+    Staleness is told by size and mtime. A checksum is only stored when a verify
+    asks for it, hashing a large snapshot on every save is a full extra read.
+    """
+
+    def __init__(self, folder: Path) -> None:
+        folder.mkdir(parents=True, exist_ok=True)
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            folder / CATALOG_NAME,
+            timeout=5,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._migrate()
+        self._conn.execute(_CREATE_FILES)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS files_user_range"
+            " ON files (min_user_id, max_user_id)"
+        )
+
+    def _migrate(self) -> None:
+        # catalogs from before size and mtime: checksums were required and there
+        # was nothing cheaper to tell staleness by. rows are kept, with no size
+        # the next rebuild re-indexes them and keeps their created_at.
+        columns = [
+            row[1] for row in self._conn.execute("PRAGMA table_info(files)").fetchall()
+        ]
+        if not columns or "size" in columns:
+            return
+        self._conn.execute("BEGIN")
+        self._conn.execute("ALTER TABLE files RENAME TO files_v1")
+        self._conn.execute(_CREATE_FILES)
+        self._conn.execute(
+            "INSERT INTO files"
+            " SELECT name, created_at, users, pages, min_user_id, max_user_id,"
+            " NULL, NULL, checksum, format FROM files_v1"
+        )
+        self._conn.execute("DROP TABLE files_v1")
+        self._conn.execute("COMMIT")
+
+    def record(
+        self,
+        path: Path,
+        created_at: float,
+        users: int,
+        pages: int,
+        min_user_id: int | None,
+        max_user_id: int | None,
+        size: int,
+        mtime: float,
+        file_format: str,
+        checksum: str | None = None,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO files ({', '.join(_FIELDS)})"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path.name,
+                    created_at,
+                    users,
+                    pages,
+                    min_user_id,
+                    max_user_id,
+                    size,
+                    mtime,
+                    checksum,
+                    file_format,
+                ),
+            )
+
+    def get(self, path: Path) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM files WHERE name = ?", (path.name,)
+            ).fetchone()
+        return self._to_entry(row) if row else None
+
+    def remove(self, *names: str) -> int:
+        with self._lock:
+            return sum(
+                self._conn.execute("DELETE FROM files WHERE name = ?", (name,)).rowcount
+                for name in names
+            )
+
+    def latest(self, pattern: str = "*") -> Path | None:
+        """newest file whose name matches the glob pattern, None when there is none."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM files WHERE name GLOB ? ORDER BY created_at DESC",
+                (pattern,),
+            )
+            for (name,) in rows:
+                path = self.folder / name
+                # deleted behind our back, skip it, a rebuild drops the entry.
+                if path.exists():
+                    return path
+        return None
+
+    def files_containing(self, user_id: int) -> list[dict]:
+        """files whose user_id range covers user_id, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM files"
+                " WHERE min_user_id <= ? AND max_user_id >= ?"
+                " ORDER BY created_at DESC",
+                (user_id, user_id),
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM files ORDER BY created_at DESC"
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def _to_entry(self, row: tuple) -> dict:
+        entry = dict(zip(_FIELDS, row))
+        entry["path"] = str(self.folder / entry["name"])
+        return entry
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,412 @@
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator
+from models.sof_models import SOFUser
+from handlers.sof_compression import (
+    detect_compression,
+    open_binary,
+    open_compressed_writer,
+    require_compression,
+)
+
+# v2 .sofusers layout, all little endian:
+#   header   magic, version, rows, total pages, heap offset, index offset
+#   columns  one fixed width column per field, in _INT_COLUMNS + _STR_COLUMNS order
+#   heap     utf-8 bytes of every string cell, addressed by (offset, length)
+#   index    (user_id, row) pairs sorted by user_id
+MAGIC = b"SOFFILE2"
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<8sHQQQQ")
+_INT_CELL = struct.Struct("<q")
+_STR_CELL = struct.Struct("<QI")
+_INDEX_ENTRY = struct.Struct("<qQ")
+# a real 0 is a valid count, nulls get a sentinel and a string length of its own.
+_NULL_INT = -(2**63)
+_NULL_LENGTH = 2**32 - 1
+# bytes a column buffers before spilling to its temp file.
+_SPILL_BYTES = 64 * 1024
+# user_id cells read at once when the index is streamed from the column.
+_INDEX_BATCH = 8192
+
+_INT_COLUMNS = (
+    "user_id",
+    "account_id",
+    "user_age",
+    "reputation",
+    "last_access_date",
+    "view_count",
+    "question_count",
+    "answer_count",
+)
+_STR_COLUMNS = ("display_name", "location", "user_type", "profile_image")
+COLUMNS = tuple(SOFUser.model_fields.keys())
+
+
+def is_columnar(path: Path) -> bool:
+    with open_binary(path) as sof_file:
+        return sof_file.read(len(MAGIC)) == MAGIC
+
+
+class _ColumnSpill:
+    """cells of one column, buffered and spilled to an anonymous temp file."""
+
+    def __init__(self, folder: Path) -> None:
+        self._file = tempfile.TemporaryFile(dir=folder)
+        self._buffer = bytearray()
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.size += len(data)
+        if len(self._buffer) >= _SPILL_BYTES:
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.write(self._buffer)
+        self._buffer.clear()
+
+    def rewind(self) -> BinaryIO:
+        self.flush()
+        self._file.seek(0)
+        return self._file  # type: ignore[return-value]
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SOFColumnarWriter:
+    """
+    Writes users into a v2 binary .sofusers file.
+
+    A column layout needs the row count before the first column, so cells are
+    packed per column into small buffers that spill to anonymous temp files, and
+    the file is stitched together from them on close. Memory stays flat whatever
+    the row count when users come in user_id order, as merge writes them, the
+    index is then streamed from the user_id column. Otherwise sorting the index
+    holds the user_ids. Like SOFFileWriter it goes through a temp file and an
+    atomic rename.
+
+    There is no append mode: adding rows means rewriting every column, so an
+    append would cost the whole file in memory and I/O. Append to a text file or
+    merge files instead.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = "w",
+        compression: str | None = None,
+        background: bool = True,
+        on_close: Callable[["SOFColumnarWriter"], None] | None = None,
+    ) -> None:
+        if mode != "w":
+            raise ValueError(
+                "binary .sofusers files are written whole and cannot be appended to,"
+                " append to a text file or merge files instead"
+            )
+
+        self.path = path
+        self.mode = mode
+        self.users_written = 0
+        self.pages_written = 0
+        self.total_pages: int | None = None
+        self.min_user_id: int | None = None
+        self.max_user_id: int | None = None
+        self.meta: dict | None = None
+        self._on_close = on_close
+        self._rows = 0
+        self._closed = False
+        self._compression = compression
+        self._background = background
+        # rows came in user_id order so far, the index needs no sort.
+        self._sorted = True
+        require_compression(compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._columns = {
+            name: _ColumnSpill(path.parent) for name in _INT_COLUMNS + _STR_COLUMNS
+        }
+        self._heap = _ColumnSpill(path.parent)
+
+    def _append_row(self, row: dict) -> None:
+        user_id = row["user_id"]
+        if self.max_user_id is not None and user_id < self.max_user_id:
+            self._sorted = False
+        if self.min_user_id is None or user_id < self.min_user_id:
+            self.min_user_id = user_id
+        if self.max_user_id is None or user_id > self.max_user_id:
+            self.max_user_id = user_id
+
+        for name in _INT_COLUMNS:
+            val = row[name]
+            self._columns[name].write(_INT_CELL.pack(_NULL_INT if val is None else val))
+
+        for name in _STR_COLUMNS:
+            val = row[name]
+            if val is None:
+                self._columns[name].write(_STR_CELL.pack(0, _NULL_LENGTH))
+                continue
+            encoded = val.encode()
+            self._columns[name].write(_STR_CELL.pack(self._heap.size, len(encoded)))
+            self._heap.write(encoded)
+        self._rows += 1
+
+    def write(self, sof_user: SOFUser) -> None:
+        if self._closed:
+            raise ValueError("write to a closed SOFColumnarWriter")
+        self._append_row(sof_user.model_dump())
+        self.users_written += 1
+
+    def write_page(self, sof_users: Iterable[SOFUser]) -> int:
+        """writes one page of users, returns how many were written."""
+        written = self.users_written
+        for sof_user in sof_users:
+            self.write(sof_user)
+        self.pages_written += 1
+        return self.users_written - written
+
+    def close(self) -> None:
+        """lays out the file in a temp file and renames it over the target."""
+        if self._closed:
+            return
+        self._closed = True
+
+        total_pages = (
+            self.total_pages if self.total_pages is not None else self.pages_written
+        )
+        heap_offset = _HEADER.size + sum(
+            column.size for column in self._columns.values()
+        )
+        index_offset = heap_offset + self._heap.size
+        self.meta = {"total_users_fetched": self._rows, "total_pages": total_pages}
+
+        fd, temp_path = tempfile.mkstemp(
+            prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent
+        )
+        try:
+            with self._open_temp(fd) as sof_file:
+                sof_file.write(
+                    _HEADER.pack(
+                        MAGIC,
+                        FORMAT_VERSION,
+                        self._rows,
+                        total_pages,
+                        heap_offset,
+                        index_offset,
+                    )
+                )
+                for name in _INT_COLUMNS + _STR_COLUMNS:
+                    shutil.copyfileobj(self._columns[name].rewind(), sof_file)
+                shutil.copyfileobj(self._heap.rewind(), sof_file)
+                self._write_index(sof_file)
+            with open(temp_path, "rb") as sof_file:
+                os.fsync(sof_file.fileno())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        finally:
+            self._close_spills()
+
+        if self._on_close is not None:
+            self._on_close(self)
+
+    def _write_index(self, sof_file: BinaryIO) -> None:
+        user_id_column = self._columns["user_id"].rewind()
+        if self._sorted:
+            # already in user_id order, row i is the i-th index entry.
+            row = 0
+            while cells := user_id_column.read(_INDEX_BATCH * _INT_CELL.size):
+                user_ids = array("q", cells)
+                if sys.byteorder == "big":
+                    user_ids.byteswap()
+                entries = array("q", bytes(2 * len(cells)))
+                entries[0::2] = user_ids
+                entries[1::2] = array("q", range(row, row + len(user_ids)))
+                if sys.byteorder == "big":
+                    entries.byteswap()
+                sof_file.write(entries)
+                row += len(user_ids)
+            return
+
+        user_ids = array("q")
+        user_ids.frombytes(user_id_column.read())
+        if sys.byteorder == "big":
+            user_ids.byteswap()
+        for row in sorted(range(self._rows), key=user_ids.__getitem__):
+            sof_file.write(_INDEX_ENTRY.pack(user_ids[row], row))
+
+    def _close_spills(self) -> None:
+        for column in self._columns.values():
+            column.close()
+        self._heap.close()
+
+    def _open_temp(self, fd: int):
+        if self._compression is None:
+            return os.fdopen(fd, "wb")
+        return open_compressed_writer(
+            os.fdopen(fd, "wb"), self._compression, background=self._background
+        )
+
+    def abort(self) -> None:
+        # the spills are anonymous temp files, closing them drops them.
+        self._closed = True
+        self._close_spills()
+
+    def __enter__(self) -> "SOFColumnarWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class SOFColumnarReader:
+    """
+    Reads a v2 binary .sofusers file through mmap.
+
+    Only the pages a read touches are loaded: a projection reads just its columns
+    and find binary searches the user_id index instead of scanning the rows.
+    Compressed files cannot be mapped, they are decompressed into memory instead.
+
+    errors:
+        ValueError: if the file is not a v2 .sofusers file or a newer version.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._mm: mmap.mmap | bytes
+        if detect_compression(path) is not None:
+            with open_binary(path) as sof_file:
+                self._mm = sof_file.read()
+        else:
+            with open(path, "rb") as sof_file:
+                self._mm = mmap.mmap(sof_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < _HEADER.size:
+            self.close()
+            raise ValueError("invalid file format or bad header")
+
+        magic, version, rows, total_pages, heap_offset, index_offset = (
+            _HEADER.unpack_from(self._mm)
+        )
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("invalid file format or bad header")
+        if version > FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unknown .sofusers version {version}")
+
+        self.rows = rows
+        self.total_pages = total_pages
+        self._heap_offset = heap_offset
+        self._index_offset = index_offset
+
+        self._column_offsets: dict[str, int] = {}
+        offset = _HEADER.size
+        for name in _INT_COLUMNS:
+            self._column_offsets[name] = offset
+            offset += rows * _INT_CELL.size
+        for name in _STR_COLUMNS:
+            self._column_offsets[name] = offset
+            offset += rows * _STR_CELL.size
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def meta(self) -> dict:
+        return {
+            "total_users_fetched": self.rows,
+            "total_pages": self.total_pages,
+            "file_path": str(self.path),
+        }
+
+    def column(self, name: str, start: int = 0, stop: int | None = None) -> list:
+        """values of one column for rows start to stop, None for nulls."""
+        if name not in self._column_offsets:
+            raise ValueError(f"Invalid column name, must be one of {COLUMNS}")
+
+        stop = self.rows if stop is None else min(stop, self.rows)
+        offset = self._column_offsets[name]
+
+        if name in _INT_COLUMNS:
+            cells = array("q")
+            cells.frombytes(
+                self._mm[
+                    offset + start * _INT_CELL.size : offset + stop * _INT_CELL.size
+                ]
+            )
+            if sys.byteorder == "big":
+                cells.byteswap()
+            return [None if val == _NULL_INT else val for val in cells]
+
+        heap = self._heap_offset
+        return [
+            (
+                None
+                if length == _NULL_LENGTH
+                else self._mm[heap + start_at : heap + start_at + length].decode()
+            )
+            for start_at, length in _STR_CELL.iter_unpack(
+                self._mm[
+                    offset + start * _STR_CELL.size : offset + stop * _STR_CELL.size
+                ]
+            )
+        ]
+
+    def row(self, row: int, columns: Iterable[str] | None = None) -> dict:
+        return {name: self.column(name, row, row + 1)[0] for name in columns or COLUMNS}
+
+    def iter_rows(
+        self, columns: Iterable[str] | None = None, batch_size: int = 65536
+    ) -> Iterator[dict]:
+        """rows in file order, columns are read batch_size rows at a time."""
+        names = list(columns or COLUMNS)
+        for start in range(0, self.rows, batch_size):
+            stop = start + batch_size
+            values = [self.column(name, start, stop) for name in names]
+            for row_values in zip(*values):
+                yield dict(zip(names, row_values))
+
+    def find(self, user_id: int) -> list[int]:
+        """rows holding user_id, a binary search over the sorted footer index."""
+        low, high = 0, self.rows
+        while low < high:
+            mid = (low + high) // 2
+            if self._index_entry(mid)[0] < user_id:
+                low = mid + 1
+            else:
+                high = mid
+
+        rows = []
+        while low < self.rows:
+            found_id, row = self._index_entry(low)
+            if found_id != user_id:
+                break
+            rows.append(row)
+            low += 1
+        return rows
+
+    def _index_entry(self, position: int) -> tuple[int, int]:
+        return _INDEX_ENTRY.unpack_from(
+            self._mm, self._index_offset + position * _INDEX_ENTRY.size
+        )
+
+    def close(self) -> None:
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def __enter__(self) -> "SOFColumnarReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,186 @@
+import gzip
+import io
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, TextIO
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for .sofusers.zst files.
+    zstandard = None
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+# fast levels, exports are repetitive enough that higher ones barely help.
+_GZIP_LEVEL = 6
+_ZSTD_LEVEL = 3
+
+
+def compression_for_suffix(path: Path) -> str | None:
+    return SUFFIXES.get(path.suffix)
+
+
+def detect_compression(path: Path) -> str | None:
+    """gzip, zstd or None, from the magic bytes of an existing file or the suffix."""
+    if path.exists() and path.stat().st_size > 0:
+        with open(path, "rb") as sof_file:
+            magic = sof_file.read(len(_ZSTD_MAGIC))
+        if magic.startswith(_GZIP_MAGIC):
+            return "gzip"
+        if magic.startswith(_ZSTD_MAGIC):
+            return "zstd"
+        return None
+    return compression_for_suffix(path)
+
+
+def require_compression(compression: str | None) -> None:
+    """raises ImportError when compression needs a package that is not installed."""
+    if compression == "zstd" and zstandard is None:
+        raise ImportError(".sofusers.zst files need zstandard, pip install zstandard")
+
+
+def open_binary(path: Path) -> BinaryIO:
+    """opens a .sofusers file for reading, decompressing it on the fly."""
+    match detect_compression(path):
+        case "gzip":
+            return gzip.open(path, "rb")  # type: ignore[return-value]
+        case "zstd":
+            require_compression("zstd")
+            decompressor = zstandard.ZstdDecompressor()  # type: ignore[union-attr]
+            # frames are concatenated by the writer, read them as one stream.
+            return decompressor.stream_reader(
+                open(path, "rb"), read_across_frames=True, closefd=True
+            )
+        case _:
+            return open(path, "rb")
+
+
+def open_text(path: Path) -> TextIO:
+    if detect_compression(path) is None:
+        return open(path, "r")
+    return io.TextIOWrapper(open_binary(path))
+
+
+def compress_bytes(data: bytes, compression: str) -> bytes:
+    """one complete gzip member or zstd frame, concatenated streams read as one."""
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=_GZIP_LEVEL)
+    require_compression("zstd")
+    compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)  # type: ignore[union-attr]
+    return compressor.compress(data)
+
+
+def open_compressed_writer(
+    raw_file: BinaryIO, compression: str, background: bool = True
+) -> BinaryIO:
+    """
+    Wraps raw_file in a compressing stream, closing it closes raw_file.
+
+    Args:
+        raw_file (BinaryIO): where the compressed bytes go.
+        compression (str): "gzip" or "zstd".
+        background (bool): compress in a worker thread, writes only queue the data.
+    """
+    if compression == "gzip":
+        writer: BinaryIO = gzip.GzipFile(  # type: ignore[assignment]
+            fileobj=raw_file, mode="wb", compresslevel=_GZIP_LEVEL
+        )
+    else:
+        require_compression("zstd")
+        writer = zstandard.ZstdCompressor(  # type: ignore[union-attr]
+            level=_ZSTD_LEVEL
+        ).stream_writer(raw_file, closefd=False)
+
+    stream = _ClosingWriter(writer, raw_file)
+    if background:
+        return _BackgroundWriter(stream)  # type: ignore[return-value]
+    return stream  # type: ignore[return-value]
+
+
+class _ClosingWriter(io.BufferedIOBase):
+    """finishes the compressed stream, then closes the file under it."""
+
+    def __init__(self, writer: BinaryIO, raw_file: BinaryIO) -> None:
+        self._writer = writer
+        self._raw_file = raw_file
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        return self._writer.write(data)
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            super().close()
+        finally:
+            try:
+                self._writer.close()
+            finally:
+                self._raw_file.close()
+
+
+class _BackgroundWriter(io.BufferedIOBase):
+    """
+    Hands writes to a thread that compresses them.
+
+    zlib and zstd release the GIL, so compression overlaps with the caller. The
+    queue is bounded, a caller that outruns the compressor waits instead of
+    buffering without limit. Errors from the thread are raised on the next write
+    or on close.
+    """
+
+    _STOP = None
+
+    def __init__(self, stream: io.BufferedIOBase, max_chunks: int = 16) -> None:
+        self._stream = stream
+        self._chunks: queue.Queue = queue.Queue(maxsize=max_chunks)
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(
+            target=self._run, name="sofusers-compress", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while (chunk := self._chunks.get()) is not self._STOP:
+            if self._error is None:
+                try:
+                    self._stream.write(chunk)
+                except BaseException as e:
+                    # keep draining so a blocked put in write does not hang.
+                    self._error = e
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        self._raise_error()
+        chunk = bytes(data)
+        self._chunks.put(chunk)
+        return len(chunk)
+
+    def flush(self) -> None:
+        # the data is with the worker, close waits for it to be written.
+        pass
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._chunks.put(self._STOP)
+        self._thread.join()
+        try:
+            self._stream.close()
+        finally:
+            super().close()
+        self._raise_error()
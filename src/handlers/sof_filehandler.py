@@ -1,16 +1,40 @@
+import hashlib
+import tempfile
+import time
+from functools import cached_property
+from itertools import islice, repeat
 from pathlib import Path
 from models.sof_models import SOFUser, SOFFile
 from config.config_loader import Config
-from typing import List
+from typing import List, Iterator, Iterable, TextIO
 from handlers.utility import get_epoch_time
+from handlers.sof_filewriter import SOFFileWriter, parse_header
+from handlers.sof_columnar import (
+    SOFColumnarWriter,
+    SOFColumnarReader,
+    is_columnar,
+    COLUMNS,
+)
+from handlers.sof_compression import (
+    SUFFIXES,
+    compression_for_suffix,
+    detect_compression,
+    open_text,
+)
+from handlers.sof_catalog import SOFCatalog
+from handlers import sof_merge, sof_parallel, sof_query
+from handlers.sof_query import Predicate
 
 
 class SOFFileHandler:
 
     _EXTENSION = ".sofusers"
-    _MODES = ("w", "r")
-    _MARKER = "SOFFILE"
-    _PATTERN = "user_data_*.sofusers"
+    # plain, .gz and .zst files.
+    _PATTERN = "user_data_*.sofusers*"
+    # text files this big are parsed by every core unless told otherwise.
+    _PARALLEL_THRESHOLD = 64 * 2**20
+    # lines of a text file converted at once.
+    _BATCH_SIZE = 4096
 
     def __init__(self, config: Config) -> None:
 
@@ -21,82 +45,590 @@ class SOFFileHandler:
 
     def save(
         self,
-        sof_users: list[SOFUser],
+        sof_users: Iterable[SOFUser],
         meta: dict,
         sof_path: str | None = None,
         mode: str = "w",
-    ) -> None:
-        # multiple mode support?, maybe later.
-
-        if not sof_users:
-            raise ValueError("No users to save")
-
-        if mode not in self._MODES:
+        binary: bool = False,
+    ) -> int:
+        # mode "a" adds the users to the end of an existing file.
+        # sof_users can be a generator, e.g. users parsed off a pipe as they arrive,
+        # meta is only read once they are all written. returns the users saved.
+
+        with self.open_writer(sof_path, mode, binary=binary) as writer:
+            writer.write_page(sof_users)
+            if not writer.users_written:
+                raise ValueError("No users to save")
+            writer.total_pages = meta.get("total_pages", 1)
+        return writer.users_written
+
+    def merge(
+        self,
+        file_paths: list[str],
+        sof_path: str | None = None,
+        policy: str = "newest",
+        run_size: int = 100_000,
+        binary: bool = False,
+        temp_dir: str | None = None,
+    ) -> dict:
+        """
+        Merges .sofusers files into a new file, one user per user_id, sorted by it.
+
+        An external merge sort: the inputs are streamed into sorted runs of at most
+        run_size users, spilled to temp files when there is more than one, then the
+        runs are k-way merged straight into the output writer. Memory stays bounded
+        by run_size whatever the size of the inputs.
+
+        Args:
+            file_paths (list[str]): the files to merge, later files count as newer.
+            sof_path (str | None): output file, a new file in the default data
+            folder when None. It may be one of the inputs.
+            policy (str): which duplicate to keep, "newest" last_access_date,
+            "last" or "first" file it appears in.
+            run_size (int): users sorted in memory at once.
+            binary (bool): write the output in the binary columnar format.
+            temp_dir (str | None): where runs are spilled, the system temp folder
+            when None.
+
+        Returns:
+            dict: inputs, users read, users written and duplicates dropped.
+
+        errors:
+            ValueError: if no files are given or the policy is unknown.
+            FileNotFoundError: if an input does not exist.
+        """
+        if not file_paths:
+            raise ValueError("No files to merge")
+        if run_size < 1:
+            raise ValueError("run_size must be at least 1")
+
+        key = sof_merge.sort_key(policy)
+        input_paths = [self._resolve_existing(file_path) for file_path in file_paths]
+        total_pages = sum(
+            self.read_meta(str(path))["total_pages"] for path in input_paths
+        )
+
+        users_read = 0
+
+        def records() -> Iterator[str]:
+            nonlocal users_read
+            for input_index, path in enumerate(input_paths):
+                for sof_user in self.iter_users(path):
+                    yield sof_merge.make_record(
+                        input_index, users_read, sof_user.serialize_sofuser()
+                    )
+                    users_read += 1
+
+        with tempfile.TemporaryDirectory(prefix="sofmerge.", dir=temp_dir) as run_dir:
+            runs = sof_merge.sorted_runs(records(), key, run_size, run_dir)
+            winners = map(sof_merge.record_user, sof_merge.merge_runs(runs, key))
+
+            with self.open_writer(sof_path, "w", binary=binary) as writer:
+                for sof_user in SOFUser.deserialize_many(winners):
+                    writer.write(sof_user)
+                writer.total_pages = total_pages
+
+        return {
+            "inputs": len(input_paths),
+            "users read": users_read,
+            "users written": writer.users_written,
+            "duplicates": users_read - writer.users_written,
+        }
+
+    def open_writer(
+        self,
+        sof_path: str | None = None,
+        mode: str = "w",
+        flush_every: int = 1000,
+        binary: bool = False,
+        background: bool = True,
+    ) -> SOFFileWriter | SOFColumnarWriter:
+        """
+        Opens a writer to stream users into a .sofusers file.
+
+        Args:
+            sof_path (str | None): path to the file, a new file in the default data
+            folder when None ("w"), the latest one in it ("a").
+            mode (str): "w" replaces the file, "a" appends to it, in place for a
+            plain text file, compressed ones are copied over, see SOFFileWriter.
+            flush_every (int): number of buffered users written at once.
+            binary (bool): write the v2 binary columnar format. Appending keeps
+            the format of an existing text file, binary files cannot be appended
+            to.
+            background (bool): compress in a background thread, for .sofusers.gz
+            and .sofusers.zst paths.
+
+        errors:
+            ValueError: if the mode or the file extension is invalid, or if
+            appending to a binary file.
+        """
+        if mode not in ("w", "a"):
             raise ValueError(f"Invalid mode: {mode}")
 
         self.resolved_path = self._resolve_path(sof_path, mode)
         # saved to instance so i can resuse whenever i need to save again.
 
-        if not self.resolved_path.exists():
-            self.resolved_path.touch()
+        if mode == "a" and self._has_content(self.resolved_path):
+            binary = is_columnar(self.resolved_path)
+        if mode == "a" and binary:
+            # a columnar append rewrites every column, O(file size) per save.
+            raise ValueError(
+                f"cannot append to {self.resolved_path} in the binary format, binary"
+                " files are written whole: append to a text file, or save a new file"
+                " and merge them"
+            )
 
-        total_users_fetched = len(sof_users)
-        total_pages = meta.get("total_pages", 1)
+        compression = compression_for_suffix(self.resolved_path)
+        if binary:
+            return SOFColumnarWriter(
+                self.resolved_path,
+                mode=mode,
+                compression=compression,
+                background=background,
+                on_close=self._record_in_catalog,
+            )
+        return SOFFileWriter(
+            self.resolved_path,
+            mode=mode,
+            flush_every=flush_every,
+            compression=compression,
+            background=background,
+            on_close=self._record_in_catalog,
+        )
+
+    @cached_property
+    def catalog(self) -> SOFCatalog:
+        return SOFCatalog(self.default_data_folder)
+
+    def find_files(self, user_id: int, verify: bool = True) -> list[dict]:
+        """
+        Catalog entries of the data folder files holding user_id, newest first.
+
+        The catalog narrows the files down by their user_id range, verify then
+        checks each candidate, an index lookup for binary files and a scan for text.
+        """
+        entries = self.catalog.files_containing(user_id)
+        if not verify:
+            return entries
+        return [
+            entry
+            for entry in entries
+            if Path(entry["path"]).exists() and self._holds_user(entry["path"], user_id)
+        ]
+
+    def _holds_user(self, file_path: str, user_id: int) -> bool:
+        rows = self.iter_rows(file_path, columns=["user_id"], user_ids=[user_id])
+        return next(rows, None) is not None
+
+    def rebuild_catalog(self, verify: bool = False) -> int:
+        """
+        Re-indexes every .sofusers file in the data folder, e.g. files copied in or
+        saved before the catalog existed, and drops entries of deleted files.
+        Files whose size and mtime did not change are skipped.
+
+        Args:
+            verify (bool): hash every file instead, and only skip the files whose
+            checksum did not change. Catches changes that kept size and mtime, at
+            the cost of reading every file.
+
+        Returns:
+            int: number of files indexed.
+        """
+        files = [
+            path
+            for path in self.default_data_folder.glob(f"*{self._EXTENSION}*")
+            if not path.name.startswith(".")
+        ]
+        for path in files:
+            file_stat = path.stat()
+            previous = self.catalog.get(path)
+            if verify:
+                checksum = self._checksum(path)
+                unchanged = previous is not None and previous["checksum"] == checksum
+            else:
+                checksum = None
+                unchanged = (
+                    previous is not None
+                    and previous["size"] == file_stat.st_size
+                    and previous["mtime"] == file_stat.st_mtime
+                )
+
+            if previous is not None and unchanged:
+                if verify:
+                    # unchanged, but size and mtime may be new, e.g. after a copy.
+                    self.catalog.record(
+                        path,
+                        **self._catalog_fields(previous),
+                        size=file_stat.st_size,
+                        mtime=file_stat.st_mtime,
+                        checksum=checksum,
+                    )
+                continue
 
-        sof_header = self._get_sofheader(total_users_fetched, total_pages)
-        sofuser_strings = self._format_users(sof_users)
+            meta = self.read_meta(str(path))
+            user_ids = [row["user_id"] for row in self.iter_rows(path, ["user_id"])]
+            self.catalog.record(
+                path,
+                created_at=(
+                    previous["created_at"]
+                    if previous
+                    else self._get_file_birthtime(path)
+                ),
+                users=meta["total_users_fetched"],
+                pages=meta["total_pages"],
+                min_user_id=min(user_ids, default=None),
+                max_user_id=max(user_ids, default=None),
+                size=file_stat.st_size,
+                mtime=file_stat.st_mtime,
+                file_format="binary" if is_columnar(path) else "text",
+                checksum=checksum,
+            )
 
-        try:
-            with open(self.resolved_path, mode) as sof_file:
-                sof_file.write(sof_header)
-                sof_file.write("\n")
-                sof_file.writelines(sofuser_strings)
-        except Exception as e:
-            raise e
+        names = {path.name for path in files}
+        deleted = [
+            entry["name"]
+            for entry in self.catalog.entries()
+            if entry["name"] not in names
+        ]
+        self.catalog.remove(*deleted)
+        return len(files)
+
+    @staticmethod
+    def _catalog_fields(entry: dict) -> dict:
+        return {
+            "created_at": entry["created_at"],
+            "users": entry["users"],
+            "pages": entry["pages"],
+            "min_user_id": entry["min_user_id"],
+            "max_user_id": entry["max_user_id"],
+            "file_format": entry["format"],
+        }
+
+    def _record_in_catalog(self, writer: SOFFileWriter | SOFColumnarWriter) -> None:
+        # the catalog only covers the data folder, like the latest file lookup.
+        if writer.path.parent.resolve() != self.default_data_folder.resolve():
+            return
+
+        meta: dict = writer.meta  # type: ignore[assignment]
+        previous = self.catalog.get(writer.path) if writer.mode == "a" else None
+        user_ids = [writer.min_user_id, writer.max_user_id]
+        if isinstance(writer, SOFFileWriter) and writer.in_place:
+            # an in place append only saw the new users, widen by the old range.
+            if previous is not None:
+                user_ids += [previous["min_user_id"], previous["max_user_id"]]
+            else:
+                user_ids += [
+                    row["user_id"] for row in self.iter_rows(writer.path, ["user_id"])
+                ]
+        user_ids = [user_id for user_id in user_ids if user_id is not None]
+        # no checksum, hashing the file would read it all again, see rebuild_catalog.
+        file_stat = writer.path.stat()
+        self.catalog.record(
+            writer.path,
+            created_at=previous["created_at"] if previous else time.time(),
+            users=meta["total_users_fetched"],
+            pages=meta["total_pages"],
+            min_user_id=min(user_ids, default=None),
+            max_user_id=max(user_ids, default=None),
+            size=file_stat.st_size,
+            mtime=file_stat.st_mtime,
+            file_format="binary" if isinstance(writer, SOFColumnarWriter) else "text",
+        )
 
-    def load(self, file_path: str | None = None, mode: str = "r") -> SOFFile:
+    @staticmethod
+    def _checksum(file_path: Path) -> str:
+        with open(file_path, "rb") as sof_file:
+            return hashlib.file_digest(sof_file, "sha256").hexdigest()
+
+    def load(
+        self,
+        file_path: str | None = None,
+        mode: str = "r",
+        strict: bool = False,
+        jobs: int | None = None,
+    ) -> SOFFile:
+        # every user is validated, strict has pydantic convert the raw strings itself.
+        # jobs > 1 parses text files in that many processes, None decides by size.
 
         resolved_path = self._resolve_path(file_path, mode=mode)
         if not resolved_path.exists():
             raise FileNotFoundError(f"file not found: {resolved_path}")
 
+        if is_columnar(resolved_path):
+            with SOFColumnarReader(resolved_path) as reader:
+                sof_users = list(
+                    SOFUser.construct_many(reader.iter_rows(), strict=strict)
+                )
+                return SOFFile.model_construct(users=sof_users, meta=reader.meta)
+
+        jobs = self._jobs_for(resolved_path, jobs)
         try:
-            with open(resolved_path, "r") as sof_file:
-                marker, header = sof_file.readline().split("%")
-                total_users_fetched, total_pages = header.split("\t")
-
-                if marker != self._MARKER:
-                    raise ValueError("invalid file format or bad header")
-
-                total_users_fetched, total_pages = header.split("\t")
-                serialized_users = sof_file.readlines()
-                sof_users = self._parse_users(serialized_users)
-            return SOFFile(
-                users=sof_users,
-                meta={
-                    "total_users_fetched": int(total_users_fetched),
-                    "total_pages": int(total_pages),
-                    "file_path": str(resolved_path),
-                },
-            )
+            with open_text(resolved_path) as sof_file:
+                meta = self._read_header(sof_file, resolved_path)
+                if jobs > 1:
+                    sof_users = list(
+                        SOFUser.construct_many(
+                            self._parallel_dicts(resolved_path, jobs), strict=strict
+                        )
+                    )
+                else:
+                    sof_users = self._parse_users(sof_file, strict=strict)
+            # the users are already validated, validating the list again is waste.
+            return SOFFile.model_construct(users=sof_users, meta=meta)
         except Exception as e:
             raise e
 
+    def read_meta(self, file_path: str | None = None) -> dict:
+        """header of a .sofusers file, the body is not read."""
+        resolved_path = self._resolve_existing(file_path)
+        if is_columnar(resolved_path):
+            with SOFColumnarReader(resolved_path) as reader:
+                return reader.meta
+
+        with open_text(resolved_path) as sof_file:
+            return self._read_header(sof_file, resolved_path)
+
+    def iter_users(
+        self,
+        file_path: str | None = None,
+        strict: bool = False,
+        jobs: int | None = 1,
+        ordered: bool = True,
+    ) -> Iterator[SOFUser]:
+        """
+        Streams the users of a .sofusers file one at a time.
+
+        Only the current line is held in memory, so memory stays flat whatever the
+        file size. The header is validated before the first user is yielded. With
+        jobs > 1 text files are parsed in chunks by as many processes, a few chunks
+        are held in memory at a time.
+
+        Args:
+            file_path (str | None): path to the file, the latest file in the default
+            data folder when None.
+            strict (bool): have pydantic convert the raw values, see
+            SOFUser.deserialize_many.
+            jobs (int | None): processes parsing a text file, None uses every core
+            for files over the parallel threshold.
+            ordered (bool): keep file order when parsing in parallel, otherwise
+            chunks are yielded as they are parsed.
+
+        errors:
+            FileNotFoundError: if the file does not exist.
+            ValueError: if the header is not a valid SOFFILE header.
+        """
+        resolved_path = self._resolve_existing(file_path)
+        if is_columnar(resolved_path):
+            with SOFColumnarReader(resolved_path) as reader:
+                yield from SOFUser.construct_many(reader.iter_rows(), strict=strict)
+            return
+
+        jobs = self._jobs_for(resolved_path, jobs)
+        with open_text(resolved_path) as sof_file:
+            self._read_header(sof_file, resolved_path)
+            if jobs > 1:
+                yield from SOFUser.construct_many(
+                    self._parallel_dicts(resolved_path, jobs, ordered), strict=strict
+                )
+                return
+            yield from SOFUser.deserialize_many(sof_file, strict=strict)
+
+    def _jobs_for(self, file_path: Path, jobs: int | None) -> int:
+        # only plain text files can be split by byte offset, binary files are
+        # read by column already and compressed streams have to be read in order.
+        if jobs is not None and jobs < 1:
+            raise ValueError("jobs must be at least 1")
+        if jobs == 1 or detect_compression(file_path) or is_columnar(file_path):
+            return 1
+        if jobs is None:
+            if file_path.stat().st_size < self._PARALLEL_THRESHOLD:
+                return 1
+            return sof_parallel.default_jobs()
+        return jobs
+
+    @staticmethod
+    def _parse_parallel(
+        file_path: Path, jobs: int, ordered: bool = True
+    ) -> Iterator[list]:
+        with open(file_path, "rb") as sof_file:
+            body_start = len(sof_file.readline())
+        yield from sof_parallel.parse_chunks(file_path, body_start, jobs, ordered)
+
+    def _parallel_dicts(
+        self, file_path: Path, jobs: int, ordered: bool = True
+    ) -> Iterator[dict]:
+        for columns in self._parse_parallel(file_path, jobs, ordered):
+            yield from SOFUser.columns_to_dicts(columns)
+
+    def _text_columns(self, file_path: Path, jobs: int | None) -> Iterator[list]:
+        # the users of a text file as batches of columns, in file order.
+        jobs = self._jobs_for(file_path, jobs)
+        with open_text(file_path) as sof_file:
+            self._read_header(sof_file, file_path)
+            if jobs > 1:
+                yield from self._parse_parallel(file_path, jobs)
+                return
+            while batch := list(islice(sof_file, self._BATCH_SIZE)):
+                yield SOFUser.deserialize_columns(batch)
+
+    def iter_rows(
+        self,
+        file_path: str | None = None,
+        columns: Iterable[str] | None = None,
+        user_ids: Iterable[int] | None = None,
+        jobs: int | None = 1,
+    ) -> Iterator[dict]:
+        """
+        Streams the users of a .sofusers file as plain dicts.
+
+        Binary files only read the requested columns and look user_ids up in their
+        index. Text files are converted a batch of lines at a time into columns and
+        filtered, no SOFUser is built, which is several times faster than
+        iter_users.
+
+        Args:
+            file_path (str | None): path to the file, the latest file in the default
+            data folder when None.
+            columns (Iterable[str] | None): fields to keep, every field when None.
+            user_ids (Iterable[int] | None): only yield these users, in this order
+            for binary files and in file order for text files.
+            jobs (int | None): processes parsing a text file, see iter_users.
+
+        errors:
+            ValueError: if a column is not a SOFUser field.
+        """
+        names = list(columns or COLUMNS)
+        if not set(names).issubset(COLUMNS):
+            raise ValueError(f"Invalid column name, must be one of {COLUMNS}")
+
+        resolved_path = self._resolve_existing(file_path)
+        if is_columnar(resolved_path):
+            with SOFColumnarReader(resolved_path) as reader:
+                if user_ids is None:
+                    yield from reader.iter_rows(names)
+                    return
+                for user_id in dict.fromkeys(user_ids):
+                    for row in reader.find(user_id):
+                        yield reader.row(row, names)
+            return
+
+        # text rows stay columns of plain values, no SOFUser is built for them.
+        wanted = set(user_ids) if user_ids is not None else None
+        positions = [COLUMNS.index(name) for name in names]
+        for columns in self._text_columns(resolved_path, jobs):
+            rows = zip(*[columns[at] for at in positions])
+            if wanted is not None:
+                user_id_column = columns[COLUMNS.index("user_id")]
+                rows = (
+                    row
+                    for user_id, row in zip(user_id_column, rows)
+                    if user_id in wanted
+                )
+            yield from map(dict, map(zip, repeat(names), rows))
+
+    def query(
+        self,
+        file_path: str | None = None,
+        where: Iterable[str | Predicate] = (),
+        columns: Iterable[str] | None = None,
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> Iterator[dict]:
+        """
+        Filters, sorts and projects the users of a .sofusers file, as plain dicts.
+
+        Filters are pushed down to the raw rows: text lines are split only as far
+        as the columns needed and only those are converted, binary files read just
+        the filter columns and answer user_id=n from their index. No SOFUser is
+        built, rows stream out unless they have to be sorted.
+
+        Args:
+            file_path (str | None): path to the file, the latest file in the default
+            data folder when None.
+            where (Iterable[str | Predicate]): filters that all have to match, e.g.
+            "reputation>10000" or "location~germany".
+            columns (Iterable[str] | None): fields to return, every field when None.
+            order_by (str | None): field to sort by, file order when None.
+            descending (bool): sort from the highest value down.
+            limit (int | None): at most this many rows, with order_by only the top
+            limit rows are held in memory.
+
+        errors:
+            ValueError: if a filter, column or the limit is invalid.
+            FileNotFoundError: if the file does not exist.
+        """
+        predicates = [
+            (
+                sof_query.parse_predicate(predicate)
+                if isinstance(predicate, str)
+                else predicate
+            )
+            for predicate in where
+        ]
+        names = list(columns or COLUMNS)
+        if not set(names).issubset(COLUMNS) or order_by not in (None, *COLUMNS):
+            raise ValueError(f"Invalid column name, must be one of {COLUMNS}")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+
+        # the sort column is dropped again after sorting when not asked for.
+        scanned = names if order_by in (None, *names) else names + [order_by]
+        resolved_path = self._resolve_existing(file_path)
+
+        if is_columnar(resolved_path):
+            with SOFColumnarReader(resolved_path) as reader:
+                rows = sof_query.scan_columnar(reader, predicates, scanned)
+                yield from self._project(
+                    sof_query.order_rows(rows, order_by, descending, limit), names
+                )
+            return
+
+        with open_text(resolved_path) as sof_file:
+            self._read_header(sof_file, resolved_path)
+            rows = sof_query.scan_lines(sof_file, predicates, scanned)
+            yield from self._project(
+                sof_query.order_rows(rows, order_by, descending, limit), names
+            )
+
+    @staticmethod
+    def _project(rows: Iterable[dict], names: list[str]) -> Iterator[dict]:
+        for row in rows:
+            yield row if len(row) == len(names) else {name: row[name] for name in names}
+
+    @staticmethod
+    def _has_content(file_path: Path) -> bool:
+        return file_path.exists() and file_path.stat().st_size > 0
+
+    def _resolve_existing(self, file_path: str | None) -> Path:
+        resolved_path = self._resolve_path(file_path, mode="r")
+        if not resolved_path.exists():
+            raise FileNotFoundError(f"file not found: {resolved_path}")
+        return resolved_path
+
+    def _read_header(self, sof_file: TextIO, resolved_path: Path) -> dict:
+        total_users_fetched, total_pages = parse_header(sof_file.readline())
+        return {
+            "total_users_fetched": total_users_fetched,
+            "total_pages": total_pages,
+            "file_path": str(resolved_path),
+        }
+
     def _resolve_path(self, unresolved_path: str | None, mode: str) -> Path:
 
         if not unresolved_path:
             match mode:
                 case "w":
                     return self.default_data_folder / self._generate_filename()
-                case "r":
+                case "r" | "a":
                     return self._get_latest_default_file(pattern=self._PATTERN)
 
         file_path = Path(unresolved_path)
 
         if file_path.is_absolute():
-            if not file_path.exists():
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                file_path.touch()
+            # the writers create the file on close, an empty placeholder would be
+            # left behind by a failed save.
+            file_path.parent.mkdir(parents=True, exist_ok=True)
 
             return self._check_extention(file_path)
 
@@ -105,7 +637,13 @@ class SOFFileHandler:
     def _check_extention(self, file_path: Path) -> Path:
 
         if file_path.suffix:
-            if file_path.suffix != self._EXTENSION:
+            # .sofusers.gz and .sofusers.zst are compressed .sofusers files.
+            base_suffix = (
+                file_path.with_suffix("").suffix
+                if file_path.suffix in SUFFIXES
+                else file_path.suffix
+            )
+            if base_suffix != self._EXTENSION:
                 raise ValueError(f"file not a valid .sofusers: {file_path}")
             return file_path
         return self._add_suffix(file_path)
@@ -114,28 +652,18 @@ class SOFFileHandler:
         # after we check if the path is valid, we add the suffix to the given name
         return file_path.with_suffix(self._EXTENSION)
 
-    def _parse_users(self, serialized_strings: List[str]) -> List[SOFUser]:
-        sof_users = []
-        for sofuser_string in serialized_strings:
-
-            if sofuser_string == "\n":
-                continue
-            try:
-                sof_user = SOFUser.deserialize_sofuser(sofuser_string)
-            except Exception as e:
-                raise e
-            sof_users.append(sof_user)
-        return sof_users
-
-    def _format_users(self, data: List[SOFUser]) -> List[str]:
-        if not data:
-            raise ValueError("no valid users to format")
-
-        formatted_users = [user.serialize_sofuser() for user in data]
-        return formatted_users
+    def _parse_users(
+        self, serialized_strings: Iterable[str], strict: bool = False
+    ) -> List[SOFUser]:
+        return list(SOFUser.deserialize_many(serialized_strings, strict=strict))
 
     def _get_latest_default_file(self, pattern: str) -> Path:
-        files = self.default_data_folder.glob(pattern)
+        latest_file = self.catalog.latest(pattern)
+        if latest_file is not None:
+            return latest_file
+
+        # nothing catalogued yet, e.g. files saved before the catalog existed.
+        files = list(self.default_data_folder.glob(pattern))
         if not files:
             raise FileNotFoundError("No files found in default data folder")
 
@@ -144,14 +672,11 @@ class SOFFileHandler:
 
     @staticmethod
     def _get_file_birthtime(file: Path) -> float:
-        return file.stat().st_birthtime
+        # st_birthtime is missing on linux, the last modification is the closest.
+        file_stat = file.stat()
+        return getattr(file_stat, "st_birthtime", file_stat.st_mtime)
 
     @staticmethod
     def _generate_filename() -> str:
         return f"user_data_{get_epoch_time()}.sofusers"
 
-    def _get_sofheader(self, total_users_fetched: int, total_pages: int) -> str:
-        marker = "SOFFILE%"
-        header = f"{marker}{total_users_fetched}\t{total_pages}\n"
-        return header
-
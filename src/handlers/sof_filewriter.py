@@ -0,0 +1,325 @@
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterable, TextIO
+from models.sof_models import SOFUser
+from handlers.sof_compression import (
+    open_compressed_writer,
+    open_text,
+    compress_bytes,
+    require_compression,
+)
+
+try:
+    import fcntl
+except ImportError:  # windows, msvcrt locks instead.
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+MARKER = "SOFFILE"
+# counts are zero padded so the header keeps its size and can be rewritten in place.
+_COUNT_WIDTH = 10
+
+
+def format_header(total_users_fetched: int, total_pages: int) -> str:
+    return (
+        f"{MARKER}%{total_users_fetched:0{_COUNT_WIDTH}d}"
+        f"\t{total_pages:0{_COUNT_WIDTH}d}\n"
+    )
+
+
+def parse_header(header_line: str) -> tuple[int, int]:
+    """user and page counts of a header line, fixed width or not."""
+    marker, _, header = header_line.partition("%")
+    if marker != MARKER:
+        raise ValueError("invalid file format or bad header")
+
+    total_users_fetched, total_pages = header.split("\t")
+    return int(total_users_fetched), int(total_pages)
+
+
+def _lock(sof_file: TextIO) -> None:
+    """blocks until no other writer is appending to sof_file."""
+    if fcntl is not None:
+        fcntl.flock(sof_file.fileno(), fcntl.LOCK_EX)
+    else:
+        # locks the first byte, msvcrt retries for 10 seconds before raising.
+        sof_file.seek(0)
+        msvcrt.locking(sof_file.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(sof_file: TextIO) -> None:
+    if fcntl is not None:
+        fcntl.flock(sof_file.fileno(), fcntl.LOCK_UN)
+    else:
+        sof_file.seek(0)
+        msvcrt.locking(sof_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SOFFileWriter:
+    """
+    Streams users into a .sofusers file.
+
+    Users go to a temp file next to the target, buffered lines are written every
+    flush_every users. close fills in the header counts and atomically renames the
+    temp file over the target, so a crash or an exception mid export leaves the
+    previous file untouched.
+
+    Appending to a plain text file writes in place instead: the file is locked
+    for the lifetime of the writer, the users go after its last line and close
+    fsyncs them, then rewrites the fixed width header counts and fsyncs again.
+    The cost is the new users only. An exception truncates the file back to where
+    the append started; a hard crash mid append can leave uncounted users at the
+    end of it. Files with an older, variable width header are copied like below.
+
+    Compressed files cannot be rewritten in place, their users are compressed into
+    the temp file, optionally by a background thread, and close puts the header
+    in front as a gzip member or zstd frame of its own. Appending to one copies
+    the existing users into the temp file first, O(file size) per append, the
+    counts continue from its header.
+
+    Usage:
+        with handler.open_writer(path) as writer:
+            for page in pages:
+                writer.write_page(page)
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = "w",
+        flush_every: int = 1000,
+        compression: str | None = None,
+        background: bool = True,
+        on_close: Callable[["SOFFileWriter"], None] | None = None,
+    ) -> None:
+        if mode not in ("w", "a"):
+            raise ValueError(f"Invalid mode: {mode}")
+        if flush_every < 1:
+            raise ValueError("flush_every must be at least 1")
+
+        self.path = path
+        self.mode = mode
+        self.flush_every = flush_every
+        self.users_written = 0
+        self.pages_written = 0
+        # overrides the page count on close, e.g. with the total the API reported.
+        self.total_pages: int | None = None
+        # user_id range of the whole file, and its header counts once closed.
+        self.min_user_id: int | None = None
+        self.max_user_id: int | None = None
+        self.meta: dict | None = None
+        self._buffer: list[str] = []
+        self._closed = False
+        self._previous_users = 0
+        self._previous_pages = 0
+        self._compression = compression
+        self._on_close = on_close
+        # True when appending straight to the target, see _open_in_place.
+        self.in_place = False
+        self._append_from = 0
+
+        require_compression(compression)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if mode == "a" and compression is None and self._open_in_place():
+            return
+
+        fd, temp_path = tempfile.mkstemp(
+            prefix=f".{path.name}.", suffix=".tmp", dir=path.parent
+        )
+        self._temp_path = Path(temp_path)
+        if compression is None:
+            self._file: TextIO = os.fdopen(fd, "w")
+        else:
+            self._file = io.TextIOWrapper(
+                open_compressed_writer(
+                    os.fdopen(fd, "wb"), compression, background=background
+                )
+            )
+
+        try:
+            if compression is None:
+                self._file.write(format_header(0, 0))
+            if mode == "a":
+                self._copy_existing()
+        except BaseException:
+            self.abort()
+            raise
+
+    def _open_in_place(self) -> bool:
+        """locks the existing file for appending, False when it has to be copied."""
+        try:
+            sof_file = open(self.path, "r+")
+        except FileNotFoundError:
+            return False
+
+        try:
+            _lock(sof_file)
+            header_line = sof_file.readline()
+            counts = parse_header(header_line) if header_line else None
+            # only a fixed width header can be rewritten without moving the users.
+            if counts is None or header_line != format_header(*counts):
+                _unlock(sof_file)
+                sof_file.close()
+                return False
+            sof_file.seek(0, os.SEEK_END)
+            self._append_from = os.fstat(sof_file.fileno()).st_size
+        except BaseException:
+            sof_file.close()
+            raise
+
+        self._previous_users, self._previous_pages = counts
+        self._file = sof_file
+        self.in_place = True
+        return True
+
+    def _copy_existing(self) -> None:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+
+        with open_text(self.path) as sof_file:
+            self._previous_users, self._previous_pages = parse_header(
+                sof_file.readline()
+            )
+            for sofuser_string in sof_file:
+                if sofuser_string != "\n":
+                    self._track_user_id(int(sofuser_string.split("\t", 1)[0]))
+                self._file.write(sofuser_string)
+
+    def _track_user_id(self, user_id: int) -> None:
+        if self.min_user_id is None or user_id < self.min_user_id:
+            self.min_user_id = user_id
+        if self.max_user_id is None or user_id > self.max_user_id:
+            self.max_user_id = user_id
+
+    def write(self, sof_user: SOFUser) -> None:
+        if self._closed:
+            raise ValueError("write to a closed SOFFileWriter")
+
+        self._buffer.append(sof_user.serialize_sofuser())
+        self._track_user_id(sof_user.user_id)
+        self.users_written += 1
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def write_page(self, sof_users: Iterable[SOFUser]) -> int:
+        """writes one page of users, returns how many were written."""
+        written = self.users_written
+        for sof_user in sof_users:
+            self.write(sof_user)
+        self.pages_written += 1
+        return self.users_written - written
+
+    def flush(self) -> None:
+        self._file.writelines(self._buffer)
+        self._file.flush()
+        self._buffer = []
+
+    def close(self) -> None:
+        """finalizes the header and replaces the target file with the temp file."""
+        if self._closed:
+            return
+
+        try:
+            self.flush()
+            total_pages = (
+                self.total_pages if self.total_pages is not None else self.pages_written
+            )
+            self.meta = {
+                "total_users_fetched": self._previous_users + self.users_written,
+                "total_pages": self._previous_pages + total_pages,
+            }
+            header = format_header(
+                self.meta["total_users_fetched"], self.meta["total_pages"]
+            )
+            if self.in_place:
+                self._finish_in_place(header)
+            elif self._compression is None:
+                self._file.seek(0)
+                self._file.write(header)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+            else:
+                # closing finishes the compressed stream and waits for the worker.
+                self._file.close()
+                self._prepend_header(header)
+            if not self.in_place:
+                self._replace_target()
+        except BaseException:
+            self.abort()
+            raise
+        self._closed = True
+
+        if self._on_close is not None:
+            self._on_close(self)
+
+    def _finish_in_place(self, header: str) -> None:
+        # the users are on disk before the header counts them.
+        os.fsync(self._file.fileno())
+        self._file.seek(0)
+        self._file.write(header)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        _unlock(self._file)
+        self._file.close()
+
+    def _replace_target(self) -> None:
+        # mkstemp files are owner only, keep the mode a plain open would give.
+        if self.path.exists():
+            shutil.copymode(self.path, self._temp_path)
+        else:
+            self._temp_path.chmod(0o644)
+        os.replace(self._temp_path, self.path)
+
+    def _prepend_header(self, header: str) -> None:
+        fd, final_path = tempfile.mkstemp(
+            prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent
+        )
+        try:
+            with os.fdopen(fd, "wb") as sof_file:
+                sof_file.write(compress_bytes(header.encode(), self._compression))
+                with open(self._temp_path, "rb") as body:
+                    shutil.copyfileobj(body, sof_file)
+                sof_file.flush()
+                os.fsync(sof_file.fileno())
+        except BaseException:
+            Path(final_path).unlink(missing_ok=True)
+            raise
+        self._temp_path.unlink()
+        self._temp_path = Path(final_path)
+
+    def abort(self) -> None:
+        """drops everything written, the target file is left as it was."""
+        self._closed = True
+        self._buffer = []
+        if self.in_place:
+            self._abort_in_place()
+            return
+        try:
+            self._file.close()
+        finally:
+            self._temp_path.unlink(missing_ok=True)
+
+    def _abort_in_place(self) -> None:
+        if self._file.closed:
+            return
+        try:
+            self._file.truncate(self._append_from)
+            self._file.seek(0)
+            self._file.write(format_header(self._previous_users, self._previous_pages))
+            self._file.flush()
+        finally:
+            _unlock(self._file)
+            self._file.close()
+
+    def __enter__(self) -> "SOFFileWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
@@ -0,0 +1,126 @@
+import heapq
+import os
+import tempfile
+from itertools import groupby, islice
+from typing import Callable, Iterable, Iterator
+
+# a record is "<input index>\t<sequence>\t<serialized user>", the user fields
+# follow in SOFUser order, so user_id is field 2 and last_access_date field 9.
+_USER_ID = 2
+_LAST_ACCESS_DATE = 9
+_NULL = "__NULL__"
+# runs merged at once, more would mean as many open files.
+_MAX_FAN_IN = 64
+
+POLICIES = ("newest", "last", "first")
+
+
+def make_record(input_index: int, sequence: int, sofuser_string: str) -> str:
+    return f"{input_index}\t{sequence}\t{sofuser_string}"
+
+
+def record_user(record: str) -> str:
+    """the serialized user a record wraps."""
+    return record.split("\t", 2)[2]
+
+
+def sort_key(policy: str) -> Callable[[str], tuple]:
+    """
+    Sort key of a record, user_id first, then the policy rank.
+
+    Records are merged in ascending key order, so the last record of a user_id
+    is the one the policy keeps:
+        newest: latest last_access_date, ties go to the later input.
+        last: the later input, later lines within one input.
+        first: the earlier input, earlier lines within one input.
+
+    errors:
+        ValueError: if the policy is unknown.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Invalid policy: {policy}, must be one of {POLICIES}")
+
+    def key(record: str) -> tuple:
+        fields = record.split("\t", _LAST_ACCESS_DATE + 1)
+        input_index, sequence = int(fields[0]), int(fields[1])
+        user_id = int(fields[_USER_ID])
+        match policy:
+            case "newest":
+                last_access = fields[_LAST_ACCESS_DATE]
+                last_access_date = -1 if last_access == _NULL else int(last_access)
+                return user_id, last_access_date, input_index, sequence
+            case "last":
+                return user_id, input_index, sequence
+            case _:
+                return user_id, -input_index, -sequence
+
+    return key
+
+
+def sorted_runs(
+    records: Iterable[str],
+    key: Callable[[str], tuple],
+    run_size: int,
+    temp_dir: str,
+) -> list[Iterable[str]]:
+    """
+    Sorts records in runs of at most run_size records.
+
+    A single run stays in memory, otherwise every run is spilled to its own file
+    in temp_dir, so memory holds at most two runs whatever the input size.
+    """
+    records = iter(records)
+    runs: list[Iterable[str]] = []
+    spilled: list[str] = []
+
+    while run := list(islice(records, run_size)):
+        run.sort(key=key)
+        runs.append(run)
+        if len(runs) > 1 or spilled:
+            spilled.extend(_spill(sorted_run, temp_dir) for sorted_run in runs)
+            runs = []
+
+    if spilled:
+        return _reduce_runs(spilled, key, temp_dir)
+    return runs
+
+
+def merge_runs(runs: list[Iterable[str]], key: Callable[[str], tuple]) -> Iterator[str]:
+    """k-way merges sorted runs, yields the record the policy keeps per user_id."""
+    merged = heapq.merge(*runs, key=key)
+    for _, group in groupby(merged, key=_record_user_id):
+        *_, winner = group
+        yield winner
+
+
+def _record_user_id(record: str) -> int:
+    return int(record.split("\t", _USER_ID + 1)[_USER_ID])
+
+
+def _spill(run: list[str], temp_dir: str) -> str:
+    fd, run_path = tempfile.mkstemp(prefix="run.", dir=temp_dir)
+    with os.fdopen(fd, "w") as run_file:
+        run_file.writelines(run)
+    return run_path
+
+
+def _read_run(run_path: str) -> Iterator[str]:
+    with open(run_path, "r") as run_file:
+        yield from run_file
+
+
+def _reduce_runs(
+    run_paths: list[str], key: Callable[[str], tuple], temp_dir: str
+) -> list[Iterable[str]]:
+    # merge passes until the runs left can be opened at once.
+    while len(run_paths) > _MAX_FAN_IN:
+        batch, run_paths = run_paths[:_MAX_FAN_IN], run_paths[_MAX_FAN_IN:]
+        fd, merged_path = tempfile.mkstemp(prefix="run.", dir=temp_dir)
+        with os.fdopen(fd, "w") as run_file:
+            run_file.writelines(
+                heapq.merge(*(_read_run(path) for path in batch), key=key)
+            )
+        for path in batch:
+            os.remove(path)
+        run_paths.append(merged_path)
+    return [_read_run(path) for path in run_paths]
@@ -0,0 +1,104 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator, Sequence
+from models.sof_models import SOFUser
+
+# big enough that a chunk is mostly parsing, small enough to spread over workers.
+CHUNK_SIZE = 16 * 2**20
+# chunks each worker has queued, finished chunks waiting to be read stay bounded.
+_IN_FLIGHT_PER_JOB = 2
+
+
+def default_jobs() -> int:
+    """processes to use when not given, every core this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def byte_ranges(
+    path: Path, body_start: int, jobs: int, chunk_size: int = CHUNK_SIZE
+) -> list[tuple[int, int]]:
+    """
+    Splits the body of a text .sofusers file into (start, end) byte ranges.
+
+    Every range ends right after a newline, so each holds whole lines. Ranges are
+    at most chunk_size bytes before alignment, and at least one per job.
+    """
+    size = path.stat().st_size
+    if size <= body_start:
+        return []
+
+    step = max(min(chunk_size, -(-(size - body_start) // jobs)), 1)
+    ranges = []
+    start = body_start
+    with open(path, "rb") as sof_file:
+        while start < size:
+            # reading on from one byte before the cut, a cut right after a newline
+            # stays where it is.
+            sof_file.seek(min(start + step, size) - 1)
+            sof_file.readline()
+            end = sof_file.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _parse_range(path: Path, start: int, end: int) -> list[Sequence]:
+    with open(path, "rb") as sof_file:
+        sof_file.seek(start)
+        body = sof_file.read(end - start).decode()
+    # universal newlines, the lines match what the serial text mode reader sees.
+    return SOFUser.deserialize_columns(io.StringIO(body, newline=None))
+
+
+def parse_chunks(
+    path: Path,
+    body_start: int,
+    jobs: int,
+    ordered: bool = True,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[list[Sequence]]:
+    """
+    Parses the body of a text .sofusers file in jobs processes.
+
+    Yields the columns of one chunk at a time, see SOFUser.deserialize_columns.
+    Workers send columns of plain values back, users are built by the caller.
+
+    Args:
+        path (Path): an uncompressed text .sofusers file.
+        body_start (int): byte offset of the first line after the header.
+        jobs (int): number of worker processes.
+        ordered (bool): yield chunks in file order, otherwise as they finish.
+        chunk_size (int): bytes parsed by a worker at once.
+
+    errors:
+        ValueError: if a line does not have one column per field.
+    """
+    ranges = deque(byte_ranges(path, body_start, jobs, chunk_size))
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    pending: deque[Future] = deque()
+
+    def submit() -> None:
+        while ranges and len(pending) < jobs * _IN_FLIGHT_PER_JOB:
+            start, end = ranges.popleft()
+            pending.append(executor.submit(_parse_range, path, start, end))
+
+    try:
+        submit()
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+            columns = future.result()
+            submit()
+            yield columns
+    finally:
+        # a consumer that stops early does not wait for the chunks left.
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,205 @@
+import heapq
+import operator
+import re
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+from handlers.sof_columnar import SOFColumnarReader, COLUMNS, _INT_COLUMNS
+
+_NULL = "__NULL__"
+_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    # case insensitive substring, e.g. location~germany matches "Berlin, Germany".
+    "~": lambda val, part: part in val.casefold(),
+}
+# longer operators first, so >= is not read as > followed by "=...".
+_EXPRESSION = re.compile(r"\s*(\w+)\s*(!=|>=|<=|=|>|<|~)\s*(.*?)\s*")
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """
+    One filter of a query, column op value.
+
+    Nulls only match "= null" and "!= null", any other comparison with a null
+    is false, like SQL.
+    """
+
+    column: str
+    op: str
+    value: int | str | None
+
+    def __post_init__(self) -> None:
+        if self.column not in COLUMNS:
+            raise ValueError(f"Invalid column name, must be one of {COLUMNS}")
+        if self.op not in _OPERATORS:
+            raise ValueError(
+                f"Invalid operator: {self.op}, must be one of {_OPERATORS}"
+            )
+        if self.value is None and self.op not in ("=", "!="):
+            raise ValueError("null can only be compared with = and !=")
+        if self.op == "~" and self.column in _INT_COLUMNS:
+            raise ValueError(f"~ needs a text column, {self.column} is a number")
+
+    def matches(self, val: int | str | None) -> bool:
+        return self.matcher()(val)
+
+    def matcher(self) -> Callable[[int | str | None], bool]:
+        """matches with the operator and value bound once, for per row use."""
+        value, compare = self.value, _OPERATORS[self.op]
+        if value is None:
+            if self.op == "=":
+                return lambda val: val is None
+            return lambda val: val is not None
+        return lambda val: val is not None and compare(val, value)
+
+
+def parse_predicate(expression: str) -> Predicate:
+    """
+    Parses "column op value", e.g. "reputation>10000" or "location~germany".
+
+    Operators are = != > >= < <= and ~ (contains, case insensitive). The value is
+    converted to the column type, "null" compares against missing values.
+
+    errors:
+        ValueError: if the expression, column or value is invalid.
+    """
+    match = _EXPRESSION.fullmatch(expression)
+    if match is None:
+        raise ValueError(f"Invalid filter: {expression!r}, expected column op value")
+
+    column, op, raw_value = match.groups()
+    if column not in COLUMNS:
+        raise ValueError(f"Invalid column name, must be one of {COLUMNS}")
+
+    value: int | str | None
+    if raw_value.lower() == "null":
+        value = None
+    elif column in _INT_COLUMNS:
+        try:
+            value = int(raw_value)
+        except ValueError:
+            raise ValueError(f"{column} is a number, got {raw_value!r}") from None
+    else:
+        value = raw_value.casefold() if op == "~" else raw_value
+    return Predicate(column, op, value)
+
+
+def scan_lines(
+    sofuser_strings: Iterable[str],
+    predicates: list[Predicate],
+    columns: list[str],
+) -> Iterator[dict]:
+    """
+    Filters serialized users, yields the columns of the matching ones.
+
+    Lines are only split as far as the last column needed, and only the columns
+    a predicate or the output uses are converted.
+    """
+    positions = {name: COLUMNS.index(name) for name in COLUMNS}
+    needed = [predicate.column for predicate in predicates] + columns
+    last = max(positions[name] for name in needed)
+    converters = {name: _converter(name, last) for name in set(needed)}
+    tests = [
+        (positions[predicate.column], converters[predicate.column], predicate.matcher())
+        for predicate in predicates
+    ]
+    outputs = [(name, positions[name], converters[name]) for name in columns]
+
+    for sofuser_string in sofuser_strings:
+        if sofuser_string == "\n" or not sofuser_string:
+            continue
+        fields = sofuser_string.split("\t", last + 1)
+        for at, convert, matches in tests:
+            if not matches(convert(fields[at])):
+                break
+        else:
+            yield {name: convert(fields[at]) for name, at, convert in outputs}
+
+
+def _converter(name: str, last: int) -> Callable[[str], int | str | None]:
+    # the last column split off still ends with the newline.
+    strip = COLUMNS.index(name) == last
+    if name in _INT_COLUMNS:
+        return lambda val: None if val.startswith(_NULL) else int(val)
+    if strip:
+        return lambda val: None if val.rstrip("\n") == _NULL else val.rstrip("\n")
+    return lambda val: None if val == _NULL else val
+
+
+def scan_columnar(
+    reader: SOFColumnarReader,
+    predicates: list[Predicate],
+    columns: list[str],
+    batch_size: int = 65536,
+) -> Iterator[dict]:
+    """
+    Filters a binary file, yields the columns of the matching rows.
+
+    The predicate columns are read batch_size rows at a time, the output columns
+    only for batches with a match. An "user_id = n" filter is answered from the
+    user_id index without scanning.
+    """
+    for predicate in predicates:
+        if predicate.column == "user_id" and predicate.op == "=":
+            if predicate.value is None:
+                return
+            for row in sorted(reader.find(predicate.value)):  # type: ignore[arg-type]
+                values = reader.row(row, set(columns) | _columns_of(predicates))
+                if all(p.matches(values[p.column]) for p in predicates):
+                    yield {name: values[name] for name in columns}
+            return
+
+    for start in range(0, reader.rows, batch_size):
+        stop = start + batch_size
+        batch: dict[str, list] = {}
+        matched: Iterable[int] = range(min(stop, reader.rows) - start)
+        # each filter narrows the positions the next one looks at.
+        for predicate in predicates:
+            if predicate.column not in batch:
+                batch[predicate.column] = reader.column(predicate.column, start, stop)
+            cells, matches = batch[predicate.column], predicate.matcher()
+            matched = [position for position in matched if matches(cells[position])]
+        if not matched:
+            continue
+        for name in columns:
+            if name not in batch:
+                batch[name] = reader.column(name, start, stop)
+        for position in matched:
+            yield {name: batch[name][position] for name in columns}
+
+
+def _columns_of(predicates: list[Predicate]) -> set[str]:
+    return {predicate.column for predicate in predicates}
+
+
+def order_rows(
+    rows: Iterable[dict],
+    order_by: str | None = None,
+    descending: bool = False,
+    limit: int | None = None,
+) -> Iterator[dict]:
+    """
+    Sorts and limits rows, nulls sort last either way and ties keep file order.
+
+    With a limit only the top limit rows are kept in a heap while the rows stream
+    by, without one sorting holds every matching row. Without order_by the rows
+    stream through and reading stops at the limit.
+    """
+    if order_by is None:
+        return iter(rows) if limit is None else islice(rows, limit)
+
+    if descending:
+        key = lambda row: (row[order_by] is not None, row[order_by])  # noqa: E731
+    else:
+        key = lambda row: (row[order_by] is None, row[order_by])  # noqa: E731
+
+    if limit is None:
+        return iter(sorted(rows, key=key, reverse=descending))
+    top = heapq.nlargest if descending else heapq.nsmallest
+    return iter(top(limit, rows, key=key))
@@ -1,5 +1,26 @@
 from pydantic import BaseModel
-from typing import Any
+from typing import Any, Iterable, Iterator, Sequence, get_args
+from functools import cache, partial
+from itertools import islice, repeat
+
+_NULL = "__NULL__"
+
+
+@cache
+def _column_schema(
+    model: type[BaseModel],
+) -> tuple[tuple[str, ...], tuple[type, ...], tuple[bool, ...]]:
+    # field names, the type each column converts to and whether it may be null,
+    # in serialized order.
+    names, types, nullable = [], [], []
+    for name, field in model.model_fields.items():
+        args = get_args(field.annotation)
+        declared = [arg for arg in args if arg is not type(None)]
+        field_type = declared[0] if declared else field.annotation
+        names.append(name)
+        types.append(int if field_type is int else str)
+        nullable.append(type(None) in args)
+    return tuple(names), tuple(types), tuple(nullable)
 
 
 class SOFUser(BaseModel):
@@ -18,15 +39,18 @@ class SOFUser(BaseModel):
 
     @staticmethod
     def _null_marker(val: str | int | None) -> str:
-        if val:
+        # only None is null, 0 reputation or counts are real values.
+        if val is not None:
             return str(val)
         else:
-            return "__NULL__"
+            return _NULL
 
     @staticmethod
-    def _null_de_marker(val: str) -> str | int | None:
-        if val != "__NULL__":
-            return int(val) if val.isdigit() else val
+    def _null_de_marker(val: str) -> str | None:
+        # left as str, pydantic converts by the declared field type, so digit only
+        # display names stay strings.
+        if val != _NULL:
+            return val
         else:
             return None
 
@@ -65,6 +89,131 @@ class SOFUser(BaseModel):
         sof_user_data = dict(zip(model_keys, demarked_sof_user_data))
         return cls(**sof_user_data)  # type: ignore
 
+    @classmethod
+    def deserialize_many(
+        cls,
+        sofuser_strings: Iterable[str],
+        strict: bool = False,
+        batch_size: int = 4096,
+    ) -> Iterator["SOFUser"]:
+        """
+        Bulk parser for serialized users, blank lines are skipped.
+
+        The schema is resolved once per model and lines are converted batch_size at
+        a time, see deserialize_columns, and the converted values are validated by
+        construct_many. With strict pydantic converts the raw strings itself
+        instead. Building the users costs more than parsing the lines, readers that
+        only need the values should keep the columns, see deserialize_columns.
+
+        Args:
+            sofuser_strings (Iterable[str]): lines from serialize_sofuser.
+            strict (bool): run full pydantic validation on every user.
+            batch_size (int): lines converted at once, bounds the memory used.
+
+        errors:
+            ValueError: if a line does not have one column per field, a number
+            column does not hold a number or a required column is null.
+            ValidationError: if strict and a user does not validate.
+        """
+        sofuser_strings = iter(sofuser_strings)
+
+        while batch := list(islice(sofuser_strings, batch_size)):
+            if strict:
+                # pydantic converts the strings itself, converting first is waste.
+                yield from map(cls.model_validate, cls._raw_dicts(batch))
+                continue
+            users_data = cls.columns_to_dicts(cls.deserialize_columns(batch))
+            yield from cls.construct_many(users_data)
+
+    @classmethod
+    def _raw_dicts(cls, sofuser_strings: Iterable[str]) -> Iterator[dict]:
+        names, _, _ = _column_schema(cls)
+        for sofuser_string in sofuser_strings:
+            if sofuser_string == "\n" or not sofuser_string:
+                continue
+            values = sofuser_string.rstrip("\n").split("\t")
+            if len(values) != len(names):
+                raise ValueError(
+                    f"expected {len(names)} columns, got {len(values)}: {values!r}"
+                )
+            yield dict(zip(names, map(cls._null_de_marker, values)))
+
+    @classmethod
+    def deserialize_columns(cls, sofuser_strings: Iterable[str]) -> list[Sequence]:
+        """
+        Splits serialized users into one list per field, in field order, converted
+        to the declared field types. Blank lines are skipped.
+
+        The whole batch is joined and split once, every column is then a slice of
+        the fields, so no python level loop runs per line. Columns of plain values
+        are also far cheaper to pickle than users, parallel loading sends these
+        between processes.
+
+        errors:
+            ValueError: if a line does not have one column per field, a number
+            column does not hold a number or a required column is null.
+        """
+        names, types, nullable = _column_schema(cls)
+        lines = "".join(sofuser_strings).split("\n")
+        if "" in lines:
+            lines = list(filter(None, lines))
+        if not lines:
+            return [[] for _ in names]
+
+        # the slices below only line up if every line has one column per field.
+        if set(map(str.count, lines, repeat("\t"))) != {len(names) - 1}:
+            row = next(
+                row
+                for row in map(str.split, lines, repeat("\t"))
+                if len(row) != len(names)
+            )
+            raise ValueError(f"expected {len(names)} columns, got {len(row)}: {row!r}")
+
+        fields = "\t".join(lines).split("\t")
+        return [
+            cls._convert_column(name, fields[at :: len(names)], field_type, optional)
+            for at, (name, field_type, optional) in enumerate(
+                zip(names, types, nullable)
+            )
+        ]
+
+    @classmethod
+    def columns_to_dicts(cls, columns: Sequence[Sequence]) -> Iterator[dict]:
+        """one dict per user from deserialize_columns output."""
+        names, _, _ = _column_schema(cls)
+        # rows are zipped back into dicts by map, without a python level loop.
+        return map(dict, map(zip, repeat(names), zip(*columns)))
+
+    @classmethod
+    def construct_many(
+        cls, users_data: Iterable[dict], strict: bool = False
+    ) -> Iterator["SOFUser"]:
+        """
+        Builds users from dicts that already hold every field as its declared type.
+
+        Validating values that already have their type is cheaper in pydantic's core
+        than model_construct's per field python loop, so users are validated either
+        way and a broken row never becomes a user.
+
+        Args:
+            users_data (Iterable[dict]): one dict per user.
+            strict (bool): also refuse values pydantic would coerce, e.g. a str
+            number in an int field.
+        """
+        return map(partial(cls.model_validate, strict=strict or None), users_data)
+
+    @staticmethod
+    def _convert_column(
+        name: str, column: list[str], field_type: type, nullable: bool
+    ) -> Sequence:
+        if _NULL not in column:
+            return column if field_type is str else list(map(field_type, column))
+        if not nullable:
+            raise ValueError(f"{name} cannot be null")
+        if column.count(_NULL) == len(column):
+            return [None] * len(column)
+        return [None if val == _NULL else field_type(val) for val in column]
+
 
 class SOFFile(BaseModel):
     users: list[SOFUser]
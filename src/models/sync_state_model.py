@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class SyncState(BaseModel):
+    name: str
+    cutoff: datetime
+    completed: bool
+    last_completed_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
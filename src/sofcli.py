@@ -31,6 +31,7 @@ from cli import commands
 start_cli.add_command(commands.fetch)
 start_cli.add_command(commands.bookmark)
 start_cli.add_command(commands.sof_file)
+start_cli.add_command(commands.cache)
 if __name__ == "__main__":
 
     try:
@@ -69,7 +69,9 @@ def add_rich_row(
         )
 
 
-def build_rich_timer_bar(total_time: int, desc: str) -> None:
+def build_rich_timer_bar(
+    total_time: float, desc: str, refresh_interval: float = 0.1
+) -> None:
     console.clear()
     progress = Progress(
         "{task.description}",
@@ -82,6 +84,9 @@ def build_rich_timer_bar(total_time: int, desc: str) -> None:
         console=console,
         refresh_per_second=2,
     ):
-        for tick in range(total_time):
-            time.sleep(1)
-            progress.advance(task)
+        # sleep against a monotonic deadline so sub-second backoffs are honored.
+        deadline = time.monotonic() + total_time
+        while (remaining := deadline - time.monotonic()) > 0:
+            time.sleep(min(refresh_interval, remaining))
+            progress.update(task, completed=total_time - max(0, remaining))
+        progress.update(task, completed=total_time)
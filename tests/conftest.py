@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+import pytest
+
+# the app imports its modules relative to src, as when run from there.
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from api.stackoverflow_api import StackOverflowAPI  # noqa: E402
+from api.stub_api import ReplayStub, ReplayTransport, StubConfig  # noqa: E402
+from caching.redis_client import RedisClient  # noqa: E402
+from config.config_loader import APIConfig, APIParams, RetryConfig  # noqa: E402
+from handlers.sof_filehandler import SOFFileHandler  # noqa: E402
+from models.sof_models import SOFUser  # noqa: E402
+
+USERS_PARAMS = APIParams(
+    page=1,
+    pagesize=30,
+    order="desc",
+    sort="reputation",
+    site="stackoverflow",
+    filter="",
+)
+
+
+def _make_user(user_id: int) -> SOFUser:
+    return SOFUser(
+        user_id=user_id,
+        account_id=user_id * 7,
+        display_name=f"user {user_id}",
+        reputation=user_id % 5000,
+        location=None if user_id % 3 else "Berlin, Germany",
+        user_type="registered",
+        last_access_date=1_700_000_000 + user_id,
+        view_count=None if user_id % 2 else user_id,
+        # null in the last column, the one that ends with the line ending.
+        profile_image=None if user_id % 4 else f"https://example.com/{user_id}.png",
+    )
+
+
+@pytest.fixture
+def make_user() -> Callable[[int], SOFUser]:
+    """a valid user per user_id, with nulls in a few optional columns."""
+    return _make_user
+
+
+@pytest.fixture
+def handler(tmp_path) -> SOFFileHandler:
+    """a handler whose default data folder is the test's tmp_path."""
+    config = SimpleNamespace(sof_handler=SimpleNamespace(default_path=str(tmp_path)))
+    return SOFFileHandler(config)
+
+
+@pytest.fixture
+def make_api() -> Callable[..., StackOverflowAPI]:
+    """
+    StackOverflowAPI factory answering from a ReplayStub, with its cache on an in
+    memory DiskCache and retry delays shrunk to milliseconds.
+    """
+
+    def build(stub: ReplayStub | None = None, **retry) -> StackOverflowAPI:
+        cache = RedisClient()
+        cache.fallback_path = ":memory:"
+        cache.redis_available = lambda: False  # type: ignore[method-assign]
+        config = APIConfig(
+            params=USERS_PARAMS,
+            use_cache=True,
+            retry=RetryConfig(base_delay=0.001, max_delay=0.01, **retry),
+        )
+        return StackOverflowAPI(
+            config, transport=ReplayTransport(stub or ReplayStub()), cache=cache
+        )
+
+    return build
+
+
+@pytest.fixture
+def users_params() -> APIParams:
+    return USERS_PARAMS
+
+
+@pytest.fixture
+def no_timer_bar(monkeypatch) -> list[tuple[float, str]]:
+    """fails on any backoff timer bar instead of drawing it, returns the calls."""
+    calls: list[tuple[float, str]] = []
+
+    def record(backoff: float, desc: str) -> None:
+        calls.append((backoff, desc))
+        raise AssertionError(f"timer bar drawn: {desc} {backoff:.1f}s")
+
+    monkeypatch.setattr(StackOverflowAPI, "_backoff", staticmethod(record))
+    return calls
@@ -0,0 +1,48 @@
+import time
+from redis import Redis
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from caching.disk_cache import DiskCache
+from caching.redis_client import RedisClient
+
+
+def test_expired_keys_are_purged_on_open(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = DiskCache(path)
+    cache.set("old", b"x", px=1)
+    cache.set("kept", b"y")
+    time.sleep(0.01)
+    cache.close()
+
+    reopened = DiskCache(path)
+    rows = reopened._conn.execute("SELECT key FROM cache").fetchall()
+
+    assert rows == [("kept",)]
+
+
+def test_expired_keys_are_purged_every_n_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(DiskCache, "_PURGE_EVERY", 10)
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"))
+    for index in range(9):
+        cache.set(f"key{index}", b"x", px=1)
+    time.sleep(0.01)
+
+    def stored() -> int:
+        return cache._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    assert stored() == 9
+    cache.set("fresh", b"y", ex=60)
+    assert stored() == 1
+    assert cache.get("fresh") == b"y"
+
+
+def test_connect_timeout_falls_back_to_disk(tmp_path, monkeypatch):
+    def black_holed(self):
+        raise RedisTimeoutError("Timeout connecting to server")
+
+    monkeypatch.setattr(Redis, "ping", black_holed)
+    monkeypatch.setattr(RedisClient, "_reachable", {})
+    client = RedisClient()
+    client.fallback_path = str(tmp_path / "cache.sqlite3")
+
+    assert client.redis_available() is False
+    assert isinstance(client.api_cache, DiskCache)
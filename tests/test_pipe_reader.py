@@ -0,0 +1,68 @@
+import codecs
+import io
+import pytest
+from cli.utility import create_pipe_data, iter_users_from_stdin
+from codec.json_codec import codec
+
+
+class Trickle(io.RawIOBase):
+    """a pipe handing out a few bytes per read, like a fetch still running."""
+
+    def __init__(self, payload: bytes, size: int) -> None:
+        self.chunks = [payload[at : at + size] for at in range(0, len(payload), size)]
+        self.reads = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read1(self, size: int = -1) -> bytes:
+        self.reads += 1
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+def payload(users, meta, source="fetch") -> bytes:
+    return codec.dumps(create_pipe_data(source, {"users": users, "meta": meta}))
+
+
+def test_users_are_yielded_as_they_arrive(make_user):
+    users = [make_user(user_id).model_dump() for user_id in range(50)]
+    users[1]["display_name"] = "Jürgen ✓"
+    pipe = Trickle(payload(users, {"total_pages": 2}), 5)
+    meta = {}
+
+    rows = iter_users_from_stdin("fetch", meta, pipe, chunk_size=5)
+    assert next(rows) == users[0]
+    assert pipe.chunks and meta == {}
+    assert [users[0], *rows] == users
+    assert meta == {"total_pages": 2}
+
+
+def test_bom_whitespace_and_extra_keys_are_skipped(make_user):
+    user = make_user(1).model_dump()
+    text = (
+        '{ "source" : "fetch", "version": [1, 2],\r\n "data": {"meta": {"page": 12},'
+        f' "users": [ {codec.dumps(user).decode()} ] }} }}\n'
+    )
+    meta = {}
+
+    rows = iter_users_from_stdin(
+        "fetch", meta, io.BytesIO(codecs.BOM_UTF8 + text.encode())
+    )
+
+    assert list(rows) == [user]
+    assert meta == {"page": 12}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        payload([], {}, source="bookmark"),
+        payload([{"user_id": 1}], {})[:-5],
+        b'{"source": "fetch", "data": {"users": {}}}',
+        b'{"source": "fetch", "data": {"users": []}} trailing',
+        b"",
+    ],
+)
+def test_invalid_payloads_raise(data):
+    with pytest.raises(ValueError, match="Invalid"):
+        list(iter_users_from_stdin("fetch", {}, io.BytesIO(data), chunk_size=3))
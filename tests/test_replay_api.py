@@ -0,0 +1,78 @@
+import pytest
+from api.api_core import APIError
+from api.stub_api import ReplayStub, StubConfig
+from config.config_loader import byIDParams
+
+BY_ID_PARAMS = byIDParams(filter="", site="stackoverflow")
+
+
+def pages(api, users_params, count: int) -> list[tuple[list[dict], dict]]:
+    return api.users.get_users_pages(users_params, range(1, count + 1))
+
+
+def test_throttled_requests_are_retried(make_api, users_params, no_timer_bar):
+    # a 0 second throttle, the retry goes out without a timer bar.
+    stub = ReplayStub(config=StubConfig(throttle_every=2, throttle_seconds=0))
+    expected = pages(make_api(ReplayStub()), users_params, 3)
+
+    got = pages(make_api(stub), users_params, 3)
+
+    assert [users for users, _ in got] == [users for users, _ in expected]
+    # pages 2 and 3 were throttled once each.
+    assert stub.request_count == 5
+
+
+def test_server_errors_are_retried(make_api, users_params, no_timer_bar):
+    stub = ReplayStub(config=StubConfig(error_every=2))
+    expected = pages(make_api(ReplayStub()), users_params, 3)
+
+    got = pages(make_api(stub), users_params, 3)
+
+    assert [users for users, _ in got] == [users for users, _ in expected]
+    assert stub.request_count == 5
+
+
+def test_throttle_retries_are_bounded(make_api, users_params, no_timer_bar):
+    stub = ReplayStub(config=StubConfig(throttle_every=1, throttle_seconds=0))
+    api = make_api(stub, max_throttle_retries=3)
+
+    with pytest.raises(APIError) as error:
+        api.users.get_users(users_params)
+
+    assert error.value.error_name == "throttle_violation"
+    assert stub.request_count == 4
+
+
+def test_server_error_retries_are_bounded(make_api, users_params, no_timer_bar):
+    stub = ReplayStub(config=StubConfig(error_every=1))
+    api = make_api(stub, max_retries=2)
+
+    with pytest.raises(APIError) as error:
+        api.users.get_users(users_params)
+
+    assert error.value.status_code == 503
+    assert stub.request_count == 3
+
+
+def test_meta_is_merged_across_id_chunks(make_api, no_timer_bar):
+    # the third chunk carries a backoff, nothing is requested after it.
+    stub = ReplayStub(config=StubConfig(backoff_every=3, backoff_seconds=5))
+    api = make_api(stub)
+    user_ids = list(range(250, 0, -1))
+
+    users, meta = api.users.get_users_by_ids(user_ids, BY_ID_PARAMS)
+
+    assert [user["user_id"] for user in users] == user_ids
+    assert stub.request_count == 3
+    assert meta["requests"] == 3
+    assert meta["has_more"] is False
+    assert meta["cached"] is False
+    assert meta["quota_remaining"] == stub.config.quota_max - 3
+    assert meta["backoff"] == 5
+
+    # every user is in the entity cache now, so nothing waits on the backoff.
+    users, meta = api.users.get_users_by_ids(user_ids, BY_ID_PARAMS)
+
+    assert [user["user_id"] for user in users] == user_ids
+    assert stub.request_count == 3
+    assert meta["entity_cache_hits"] == 250
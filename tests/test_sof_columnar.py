@@ -0,0 +1,108 @@
+import pytest
+from handlers.sof_columnar import SOFColumnarReader, SOFColumnarWriter, is_columnar
+
+
+@pytest.fixture
+def users(make_user):
+    users = [make_user(user_id) for user_id in range(0, 300, 3)]
+    # a real 0 and an empty string are values, not nulls.
+    users[0] = users[0].model_copy(update={"reputation": 0, "location": ""})
+    users[1] = users[1].model_copy(update={"display_name": "Jürgen ✓"})
+    # user_ids are not unique in a file, find returns every row.
+    users.append(users[5].model_copy(update={"reputation": 1}))
+    return users
+
+
+@pytest.fixture
+def binary_file(users, tmp_path):
+    path = tmp_path / "users.sofusers"
+    with SOFColumnarWriter(path) as writer:
+        writer.write_page(users)
+        writer.total_pages = 4
+    return path
+
+
+def test_rows_round_trip(users, binary_file):
+    assert is_columnar(binary_file)
+    with SOFColumnarReader(binary_file) as reader:
+        assert reader.meta["total_users_fetched"] == len(users) == len(reader)
+        assert reader.meta["total_pages"] == 4
+        assert list(reader.iter_rows(batch_size=7)) == [
+            user.model_dump() for user in users
+        ]
+
+
+def test_columns_keep_nulls_apart_from_values(users, binary_file):
+    with SOFColumnarReader(binary_file) as reader:
+        assert reader.column("view_count") == [user.view_count for user in users]
+        assert reader.column("user_age") == [None] * len(users)
+        assert reader.column("reputation", 0, 2) == [0, users[1].reputation]
+        assert reader.column("location", 0, 2) == ["", "Berlin, Germany"]
+        assert reader.column("profile_image", 0, 3) == [
+            "https://example.com/0.png",
+            None,
+            None,
+        ]
+        assert reader.column("profile_image", 98, 1_000) == [
+            user.profile_image for user in users[98:]
+        ]
+        with pytest.raises(ValueError, match="Invalid column name"):
+            reader.column("email")
+
+
+def test_row_reads_only_the_requested_columns(users, binary_file):
+    with SOFColumnarReader(binary_file) as reader:
+        assert reader.row(1, ["display_name", "user_id"]) == {
+            "display_name": "Jürgen ✓",
+            "user_id": 3,
+        }
+        assert reader.row(0) == users[0].model_dump()
+
+
+def test_find_uses_the_index(binary_file):
+    with SOFColumnarReader(binary_file) as reader:
+        assert reader.find(0) == [0]
+        assert reader.find(297) == [99]
+        assert sorted(reader.find(15)) == [5, 100]
+        for missing in (-1, 1, 298, 10_000):
+            assert reader.find(missing) == []
+
+
+def test_compressed_file_round_trips(users, tmp_path):
+    path = tmp_path / "users.sofusers.gz"
+    with SOFColumnarWriter(path, compression="gzip") as writer:
+        writer.write_page(users)
+
+    assert is_columnar(path)
+    with SOFColumnarReader(path) as reader:
+        assert list(reader.iter_rows()) == [user.model_dump() for user in users]
+        assert sorted(reader.find(15)) == [5, 100]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.sofusers"
+    with SOFColumnarWriter(path):
+        pass
+
+    with SOFColumnarReader(path) as reader:
+        assert reader.rows == 0
+        assert reader.column("user_id") == []
+        assert reader.find(1) == []
+
+
+def test_binary_files_cannot_be_appended_to(handler, users, binary_file, tmp_path):
+    with pytest.raises(ValueError, match="cannot append"):
+        handler.open_writer(str(binary_file), mode="a")
+    with pytest.raises(ValueError, match="cannot append"):
+        handler.open_writer(str(tmp_path / "new.sofusers"), mode="a", binary=True)
+    with pytest.raises(ValueError):
+        SOFColumnarWriter(binary_file, mode="a")
+
+
+def test_text_files_are_not_read_as_binary(handler, users, tmp_path):
+    path = tmp_path / "users.sofusers"
+    handler.save(users, {"total_pages": 1}, str(path))
+
+    assert not is_columnar(path)
+    with pytest.raises(ValueError, match="invalid file format"):
+        SOFColumnarReader(path)
@@ -0,0 +1,122 @@
+import threading
+import pytest
+from handlers.sof_filewriter import SOFFileWriter, format_header, parse_header
+
+
+def write_users(path, users, mode="w", **kwargs):
+    with SOFFileWriter(path, mode=mode, **kwargs) as writer:
+        writer.write_page(users)
+    return writer
+
+
+def read_user_ids(handler, path):
+    return [row["user_id"] for row in handler.iter_rows(path, ["user_id"])]
+
+
+def test_append_writes_in_place(make_user, handler, tmp_path):
+    path = tmp_path / "users.sofusers"
+    write_users(path, [make_user(user_id) for user_id in range(5)])
+    inode = path.stat().st_ino
+
+    writer = write_users(path, [make_user(user_id) for user_id in range(5, 8)], "a")
+
+    assert writer.in_place
+    assert path.stat().st_ino == inode
+    assert read_user_ids(handler, path) == list(range(8))
+    with open(path) as sof_file:
+        header_line = sof_file.readline()
+    assert header_line == format_header(8, 2)
+    assert list(tmp_path.glob(".*.tmp")) == []
+
+
+def test_failed_append_leaves_the_file_as_it_was(make_user, tmp_path):
+    path = tmp_path / "users.sofusers"
+    write_users(path, [make_user(user_id) for user_id in range(5)])
+    before = path.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with SOFFileWriter(path, mode="a", flush_every=1) as writer:
+            writer.write_page([make_user(5), make_user(6)])
+            raise RuntimeError("export failed")
+
+    assert path.read_bytes() == before
+
+
+def test_variable_width_header_is_copied(make_user, handler, tmp_path):
+    path = tmp_path / "users.sofusers"
+    write_users(path, [make_user(user_id) for user_id in range(3)])
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("SOFFILE%3\t1\n" + "".join(lines[1:]))
+
+    writer = write_users(path, [make_user(3)], "a")
+
+    assert not writer.in_place
+    assert read_user_ids(handler, path) == [0, 1, 2, 3]
+    with open(path) as sof_file:
+        assert sof_file.readline() == format_header(4, 2)
+
+
+def test_compressed_append_copies_the_file(make_user, handler, tmp_path):
+    path = tmp_path / "users.sofusers.gz"
+    write_users(path, [make_user(user_id) for user_id in range(4)], compression="gzip")
+
+    writer = write_users(
+        path, [make_user(user_id) for user_id in range(4, 6)], "a", compression="gzip"
+    )
+
+    assert not writer.in_place
+    assert read_user_ids(handler, path) == list(range(6))
+    assert handler.read_meta(str(path))["total_users_fetched"] == 6
+
+
+def test_appends_wait_for_each_other(make_user, handler, tmp_path):
+    path = tmp_path / "users.sofusers"
+    write_users(path, [make_user(0)])
+
+    first = SOFFileWriter(path, mode="a")
+    second = threading.Thread(target=write_users, args=(path, [make_user(2)], "a"))
+    second.start()
+    second.join(0.2)
+    # the second append is blocked on the lock until the first one closes.
+    assert second.is_alive()
+    first.write(make_user(1))
+    first.close()
+    second.join(5)
+
+    assert read_user_ids(handler, path) == [0, 1, 2]
+    with open(path) as sof_file:
+        assert parse_header(sof_file.readline())[0] == 3
+
+
+def test_in_place_append_widens_the_catalog_range(make_user, handler, tmp_path):
+    path = tmp_path / "user_data_1.sofusers"
+    handler.save([make_user(user_id) for user_id in range(10, 20)], {}, str(path))
+    handler.save([make_user(3), make_user(40)], {}, str(path), mode="a")
+
+    entry = handler.catalog.get(path)
+    assert (entry["min_user_id"], entry["max_user_id"]) == (3, 40)
+    assert entry["users"] == 12
+    assert [found["path"] for found in handler.find_files(15)] == [str(path)]
+
+    # a file the catalog has not seen yet is scanned for its old range.
+    handler.catalog.remove(path.name)
+    handler.save([make_user(25)], {}, str(path), mode="a")
+    entry = handler.catalog.get(path)
+    assert (entry["min_user_id"], entry["max_user_id"]) == (3, 40)
+
+
+def test_save_streams_a_generator(make_user, handler, tmp_path):
+    meta = {}
+
+    def users():
+        yield from (make_user(user_id) for user_id in range(3))
+        # like a pipe, the meta only arrives after the last user.
+        meta["total_pages"] = 7
+
+    path = tmp_path / "users.sofusers"
+    assert handler.save(users(), meta, str(path)) == 3
+    assert handler.read_meta(str(path))["total_pages"] == 7
+
+    with pytest.raises(ValueError, match="No users to save"):
+        handler.save(iter([]), {}, str(tmp_path / "empty.sofusers"))
+    assert not (tmp_path / "empty.sofusers").exists()
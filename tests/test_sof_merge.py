@@ -0,0 +1,64 @@
+import random
+import tracemalloc
+from handlers.sof_columnar import SOFColumnarReader, SOFColumnarWriter
+
+
+def write_inputs(handler, make_user, folder, users: int, files: int = 2) -> list[str]:
+    paths = []
+    for index in range(files):
+        path = folder / f"in_{users}_{index}.sofusers"
+        with handler.open_writer(str(path)) as writer:
+            writer.write_page(map(make_user, range(index, users, files)))
+        paths.append(str(path))
+    return paths
+
+
+def merge_peak(handler, make_user, folder, users: int) -> int:
+    inputs = write_inputs(handler, make_user, folder, users)
+    tracemalloc.start()
+    try:
+        handler.merge(
+            inputs, str(folder / f"out_{users}.sofusers"), run_size=100, binary=True
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def test_binary_merge_memory_does_not_grow_with_output(handler, make_user, tmp_path):
+    # both merges open the most runs at once, so only the output size differs.
+    small = merge_peak(handler, make_user, tmp_path, 10_000)
+    large = merge_peak(handler, make_user, tmp_path, 40_000)
+
+    output = tmp_path / "out_40000.sofusers"
+    # the columns spill to disk, a 4x larger output barely moves the peak, which
+    # is the open runs. buffered columns alone would add about the file size.
+    assert large - small < output.stat().st_size / 4
+
+    reader = SOFColumnarReader(output)
+    try:
+        assert reader.rows == 40_000
+        assert reader.column("user_id", 0, 40_000) == list(range(40_000))
+        assert list(reader.find(12_345)) == [12_345]
+    finally:
+        reader.close()
+
+
+def test_columnar_writer_indexes_unsorted_users(make_user, tmp_path):
+    user_ids = list(range(2_000))
+    random.Random(0).shuffle(user_ids)
+    path = tmp_path / "shuffled.sofusers"
+
+    with SOFColumnarWriter(path) as writer:
+        writer.write_page(map(make_user, user_ids))
+
+    reader = SOFColumnarReader(path)
+    try:
+        assert reader.column("user_id", 0, reader.rows) == user_ids
+        for user_id in (0, 999, 1_999):
+            assert list(reader.find(user_id)) == [user_ids.index(user_id)]
+    finally:
+        reader.close()
+    assert (writer.min_user_id, writer.max_user_id) == (0, 1_999)
+    assert [entry.name for entry in tmp_path.iterdir()] == ["shuffled.sofusers"]
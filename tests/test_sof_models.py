@@ -0,0 +1,58 @@
+import pytest
+from models.sof_models import SOFUser
+
+_REQUIRED_NULL = (
+    "1\t2\t__NULL__\t__NULL__\t__NULL__\t__NULL__\tregistered"
+    "\t__NULL__\t__NULL__\t__NULL__\t__NULL__\t__NULL__\n"
+)
+
+
+def test_deserialize_many_matches_the_per_line_parser(make_user):
+    lines = [make_user(user_id).serialize_sofuser() for user_id in range(10_000)]
+    expected = [SOFUser.deserialize_sofuser(line) for line in lines]
+
+    assert list(SOFUser.deserialize_many(lines, batch_size=999)) == expected
+    assert list(SOFUser.deserialize_many(lines, strict=True)) == expected
+
+
+def test_deserialize_many_keeps_digit_only_display_names(make_user):
+    line = make_user(1).model_copy(update={"display_name": "1234"}).serialize_sofuser()
+
+    (sof_user,) = SOFUser.deserialize_many(["\n", line, "\n"])
+
+    assert sof_user.display_name == "1234"
+
+
+def test_deserialize_columns_rejects_null_in_required_columns(make_user):
+    lines = [make_user(0).serialize_sofuser(), _REQUIRED_NULL]
+
+    with pytest.raises(ValueError, match="display_name cannot be null"):
+        SOFUser.deserialize_columns(lines)
+    with pytest.raises(ValueError, match="display_name cannot be null"):
+        list(SOFUser.deserialize_many(lines))
+
+
+def test_deserialize_columns_rejects_a_wrong_column_count(make_user):
+    lines = [
+        make_user(0).serialize_sofuser(),
+        "1\t2\n",
+        make_user(1).serialize_sofuser(),
+    ]
+
+    with pytest.raises(ValueError, match="expected 12 columns, got 2"):
+        SOFUser.deserialize_columns(lines)
+
+
+def test_iter_rows_matches_iter_users_on_text_files(handler, make_user, tmp_path):
+    path = str(tmp_path / "users.sofusers")
+    with handler.open_writer(path) as writer:
+        writer.write_page(map(make_user, range(10_000)))
+
+    users = list(handler.iter_users(path))
+    columns = ["profile_image", "user_id", "display_name"]
+
+    assert list(handler.iter_rows(path)) == [user.model_dump() for user in users]
+    assert list(handler.iter_rows(path, columns, user_ids=[9_999, 4])) == [
+        {name: getattr(users[user_id], name) for name in columns}
+        for user_id in (4, 9_999)
+    ]
@@ -0,0 +1,33 @@
+import pytest
+from handlers import sof_parallel
+
+
+@pytest.fixture
+def crlf_file(handler, make_user, tmp_path):
+    path = tmp_path / "crlf.sofusers"
+    with handler.open_writer(str(path)) as writer:
+        writer.write_page(map(make_user, range(5_000)))
+    # as left by an editor or a checkout on windows.
+    path.write_bytes(path.read_bytes().replace(b"\n", b"\r\n"))
+    return path
+
+
+def test_parallel_load_matches_serial_on_crlf_lines(handler, make_user, crlf_file):
+    serial = handler.load(str(crlf_file), jobs=1).users
+    parallel = handler.load(str(crlf_file), jobs=2).users
+
+    assert parallel == serial == [make_user(user_id) for user_id in range(5_000)]
+    assert parallel[1].profile_image is None
+
+
+def test_parse_chunks_strips_crlf_at_every_chunk_edge(crlf_file):
+    with open(crlf_file, "rb") as sof_file:
+        body_start = len(sof_file.readline())
+
+    chunks = list(sof_parallel.parse_chunks(crlf_file, body_start, 2, chunk_size=4096))
+
+    assert len(chunks) > 2
+    user_ids = [user_id for columns in chunks for user_id in columns[0]]
+    images = [image for columns in chunks for image in columns[-1]]
+    assert user_ids == list(range(5_000))
+    assert not any(image and image.endswith("\r") for image in images)
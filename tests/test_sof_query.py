@@ -0,0 +1,173 @@
+import pytest
+from handlers.sof_columnar import SOFColumnarReader, SOFColumnarWriter
+from handlers.sof_query import (
+    Predicate,
+    order_rows,
+    parse_predicate,
+    scan_columnar,
+    scan_lines,
+)
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("reputation>=100", Predicate("reputation", ">=", 100)),
+        ("reputation>100", Predicate("reputation", ">", 100)),
+        ("reputation<=100", Predicate("reputation", "<=", 100)),
+        ("reputation<100", Predicate("reputation", "<", 100)),
+        ("user_type!=moderator", Predicate("user_type", "!=", "moderator")),
+        (" user_id = 7 ", Predicate("user_id", "=", 7)),
+        ("location~GerMany", Predicate("location", "~", "germany")),
+        ("display_name=1234", Predicate("display_name", "=", "1234")),
+        ("location=null", Predicate("location", "=", None)),
+        ("view_count!=NULL", Predicate("view_count", "!=", None)),
+        ("location=a>b", Predicate("location", "=", "a>b")),
+    ],
+)
+def test_parse_predicate(expression, expected):
+    assert parse_predicate(expression) == expected
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("reputation", "expected column op value"),
+        ("email=a", "Invalid column name"),
+        ("reputation>lots", "reputation is a number"),
+        ("reputation~1", "~ needs a text column"),
+        ("location>null", "null can only be compared"),
+    ],
+)
+def test_parse_predicate_rejects(expression, message):
+    with pytest.raises(ValueError, match=message):
+        parse_predicate(expression)
+
+
+def test_nulls_only_match_null_comparisons():
+    assert parse_predicate("view_count=null").matches(None)
+    assert not parse_predicate("view_count!=null").matches(None)
+    for expression in ("view_count>0", "view_count<0", "view_count!=5"):
+        assert not parse_predicate(expression).matches(None)
+    assert parse_predicate("location~berlin").matches("Berlin, Germany")
+
+
+ROWS = [
+    {"user_id": 1, "view_count": 5},
+    {"user_id": 2, "view_count": None},
+    {"user_id": 3, "view_count": 9},
+    {"user_id": 4, "view_count": 5},
+    {"user_id": 5, "view_count": None},
+]
+
+
+def ids(rows) -> list[int]:
+    return [row["user_id"] for row in rows]
+
+
+@pytest.mark.parametrize("limit", [None, 3, 10])
+def test_order_rows_puts_nulls_last_and_keeps_ties_in_order(limit):
+    ascending = ids(order_rows(ROWS, "view_count", limit=limit))
+    descending = ids(order_rows(ROWS, "view_count", descending=True, limit=limit))
+
+    assert ascending == [1, 4, 3, 2, 5][:limit]
+    assert descending == [3, 1, 4, 2, 5][:limit]
+
+
+def test_order_rows_without_order_by_streams_in_file_order():
+    assert ids(order_rows(iter(ROWS), limit=2)) == [1, 2]
+    assert ids(order_rows(ROWS)) == [1, 2, 3, 4, 5]
+
+
+@pytest.fixture
+def users(make_user):
+    return [make_user(user_id) for user_id in range(1_000)]
+
+
+def expected(users, test, columns) -> list[dict]:
+    return [
+        {name: getattr(user, name) for name in columns} for user in users if test(user)
+    ]
+
+
+def test_scan_lines_matches_a_plain_filter(users):
+    lines = [user.serialize_sofuser() for user in users] + ["\n"]
+    predicates = [parse_predicate("view_count>=500"), parse_predicate("location=null")]
+    columns = ["profile_image", "user_id"]
+
+    got = list(scan_lines(lines, predicates, columns))
+
+    assert got == expected(
+        users,
+        lambda user: user.view_count is not None
+        and user.view_count >= 500
+        and user.location is None,
+        columns,
+    )
+
+
+def test_scan_columnar_matches_a_plain_filter(users, tmp_path):
+    path = tmp_path / "users.sofusers"
+    with SOFColumnarWriter(path) as writer:
+        writer.write_page(users)
+    predicates = [
+        parse_predicate("reputation<100"),
+        parse_predicate("view_count!=null"),
+    ]
+
+    with SOFColumnarReader(path) as reader:
+        got = list(scan_columnar(reader, predicates, ["user_id"], batch_size=64))
+
+    assert got == expected(
+        users,
+        lambda user: user.reputation < 100 and user.view_count is not None,
+        ["user_id"],
+    )
+
+
+def test_scan_columnar_answers_user_id_from_the_index(users, tmp_path):
+    path = tmp_path / "users.sofusers"
+    with SOFColumnarWriter(path) as writer:
+        writer.write_page(users + [users[42].model_copy(update={"reputation": 7})])
+
+    with SOFColumnarReader(path) as reader:
+        column = reader.column
+
+        def single_rows_only(name, start=0, stop=None):
+            assert stop == start + 1, "user_id= scanned a column"
+            return column(name, start, stop)
+
+        reader.column = single_rows_only  # type: ignore[method-assign]
+        where = [parse_predicate("user_id=42")]
+
+        assert list(scan_columnar(reader, where, ["reputation"])) == [
+            {"reputation": 42},
+            {"reputation": 7},
+        ]
+        where.append(parse_predicate("reputation>10"))
+        assert list(scan_columnar(reader, where, ["reputation"])) == [
+            {"reputation": 42}
+        ]
+        assert list(scan_columnar(reader, [parse_predicate("user_id=5000")], [])) == []
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_query_filters_sorts_and_limits(handler, users, tmp_path, binary):
+    path = str(tmp_path / "users.sofusers")
+    handler.save(users, {"total_pages": 1}, path, binary=binary)
+
+    got = list(
+        handler.query(
+            path,
+            where=["location~germany", "view_count>=100"],
+            columns=["user_id", "view_count"],
+            order_by="view_count",
+            descending=True,
+            limit=5,
+        )
+    )
+
+    assert got == [
+        {"user_id": user_id, "view_count": user_id}
+        for user_id in (996, 990, 984, 978, 972)
+    ]
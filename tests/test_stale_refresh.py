@@ -0,0 +1,53 @@
+import time
+from api.stub_api import ReplayStub, StubConfig
+
+
+def refresh(api, users_params) -> str:
+    # what _revalidate hands to the refresh worker, run in the calling thread.
+    params = users_params.model_dump()
+    cache_key = api._build_cache_key(api._build_url("/users"), params)
+    lock_token = api._cache.acquire_fetch_lock(cache_key, api._FLIGHT_LOCK_TTL)
+    assert lock_token is not None
+    api._refresh("/users", params, cache_key, lock_token)
+    assert not api._cache.fetch_locked(cache_key)
+    return cache_key
+
+
+def test_refresh_stores_the_fresh_response(make_api, users_params, no_timer_bar):
+    api = make_api()
+
+    cache_key = refresh(api, users_params)
+
+    assert len(api._check_cache(cache_key)["items"]) == 30
+
+
+def test_refresh_skips_while_the_limiter_reports_backoff(
+    make_api, users_params, no_timer_bar
+):
+    stub = ReplayStub()
+    api = make_api(stub)
+    api._limiter.set_backoff(30)
+
+    started = time.monotonic()
+    cache_key = refresh(api, users_params)
+
+    assert time.monotonic() - started < 1
+    assert no_timer_bar == []
+    assert stub.request_count == 0
+    assert api._check_cache(cache_key) is None
+
+
+def test_refresh_aborts_on_a_throttle(make_api, users_params, no_timer_bar):
+    stub = ReplayStub(config=StubConfig(throttle_every=1, throttle_seconds=30))
+    api = make_api(stub)
+
+    started = time.monotonic()
+    cache_key = refresh(api, users_params)
+
+    assert time.monotonic() - started < 1
+    assert no_timer_bar == []
+    # one attempt, no retry, and the throttle is kept for the foreground.
+    assert stub.request_count == 1
+    assert api._check_cache(cache_key) is None
+    assert 28 < api._backoff_remaining() <= 30
+    assert api._limiter.acquire()[0] == "backoff"